@@ -0,0 +1,13 @@
+"""
+Benchmarks of the e-SparX API on synthetic registries.
+
+Run them from the backend directory, e.g., on a registry of 10k pipelines and 1M artifacts:
+
+```bash
+python -m benchmarks --pipelines 10000 --artifacts 1000000 --output results.json
+```
+
+Every route is requested through the ASGI app of the API against the configured databases (or the ones given via
+`--dagdb` and `--documentdb`), or, with `--storage embedded`, against the embedded SQLite storage, which needs no
+database servers. Pass the results of an earlier run as `--baseline` to fail on regressions.
+"""
@@ -0,0 +1,139 @@
+# executed when the benchmarks are run via `python -m benchmarks` from the backend directory
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from .workload import WorkloadShape, generate_registry
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Benchmark all routes of the e-SparX API on a synthetic registry.",
+    )
+    shape = parser.add_argument_group("registry")
+    shape.add_argument("--pipelines", type=int, default=WorkloadShape.pipelines)
+    shape.add_argument("--artifacts", type=int, default=WorkloadShape.artifacts)
+    shape.add_argument("--hub-datasets", type=int, default=WorkloadShape.hub_datasets)
+    shape.add_argument("--hubs-per-pipeline", type=int, default=WorkloadShape.hubs_per_pipeline)
+    shape.add_argument("--deep-share", type=float, default=WorkloadShape.deep_share)
+    shape.add_argument("--fanout-roots", type=int, default=WorkloadShape.fanout_roots)
+    shape.add_argument("--prefix", type=str, default=WorkloadShape.prefix, help="Prefix of all synthetic names")
+    shape.add_argument("--seed", type=int, default=WorkloadShape.seed)
+
+    storage = parser.add_argument_group("storage", "Defaults to the databases configured for the API, see settings.py")
+    storage.add_argument(
+        "--storage",
+        choices=["server", "embedded"],
+        help="Storage of the API (STORAGE). The embedded storage defaults to a temporary directory.",
+    )
+    storage.add_argument("--data-dir", type=Path, help="Directory of the embedded storage (EMBEDDED_STORAGE_PATH)")
+    storage.add_argument("--dagdb", type=str, help="Connect string of the DAG database (DAGDB_CONNECTSTRING)")
+    storage.add_argument("--documentdb", type=str, help="Endpoint of the document database (ARTIFACTDB_ENDPOINT)")
+    storage.add_argument("--migrate", action="store_true", help="Run the database migrations before loading")
+    storage.add_argument("--skip-load", action="store_true", help="Reuse a registry loaded with --keep before")
+    storage.add_argument("--keep", action="store_true", help="Keep the registry in the databases after the run")
+
+    run = parser.add_argument_group("run")
+    run.add_argument("-n", "--requests", type=int, default=50, help="Number of requests per route")
+    run.add_argument("-c", "--concurrency", type=int, default=8, help="Number of requests in flight")
+    run.add_argument("--no-writes", action="store_true", help="Only benchmark the read routes")
+    run.add_argument("--trace-memory", action="store_true", help="Report the peak Python allocations per route")
+    run.add_argument("-o", "--output", type=Path, help="Write the results to this JSON file")
+    run.add_argument("--baseline", type=Path, help="Compare with the results of an earlier run and fail on regressions")
+    run.add_argument("--tolerance", type=float, default=0.25, help="Relative regression tolerated by --baseline")
+    return parser.parse_args()
+
+
+async def benchmark(args: argparse.Namespace, shape: WorkloadShape) -> list:
+    # imported after the storage is configured via the environment, which the settings read on import
+    from esparx_api import app
+    from esparx_api.dagdb import create_tables, dispose_engine
+    from esparx_api.documentdb import close_client
+
+    from .loader import load_registry, unload_registry
+    from .runner import print_header, run_benchmark
+
+    start = time.perf_counter()
+    registry = generate_registry(shape)
+    print(
+        f"Generated {len(registry.pipelines)} pipelines, {len(registry.artifacts)} artifacts and "
+        f"{len(registry.connections)} connections in {time.perf_counter() - start:.1f}s."
+    )
+
+    if not args.skip_load:
+        await create_tables()
+        await unload_registry(shape.prefix)
+        await load_registry(registry)
+    try:
+        if args.trace_memory:
+            tracemalloc.start()
+        print_header()
+        return await run_benchmark(
+            app, registry, args.requests, args.concurrency, writes=not args.no_writes, seed=shape.seed
+        )
+    finally:
+        if not args.keep:
+            await unload_registry(shape.prefix)
+        # the lifespan of the app closed the connections already, but unloading opened new ones
+        await dispose_engine()
+        await close_client()
+
+
+def main():
+    args = parse_args()
+    if args.storage:
+        os.environ["STORAGE"] = args.storage
+    if args.storage == "embedded" or args.data_dir:
+        os.environ["EMBEDDED_STORAGE_PATH"] = str(args.data_dir or tempfile.mkdtemp(prefix="esparx-benchmark-"))
+    if args.dagdb:
+        os.environ["DAGDB_CONNECTSTRING"] = args.dagdb
+    if args.documentdb:
+        os.environ["ARTIFACTDB_ENDPOINT"] = args.documentdb
+    if args.migrate:
+        from alembic import command
+        from alembic.config import Config
+
+        backend = Path(__file__).parents[1]
+        config = Config(backend / "alembic.ini")
+        config.set_main_option("script_location", str(backend / "migrations"))
+        command.upgrade(config, "head")
+
+    shape = WorkloadShape(
+        pipelines=args.pipelines,
+        artifacts=args.artifacts,
+        hub_datasets=args.hub_datasets,
+        hubs_per_pipeline=args.hubs_per_pipeline,
+        deep_share=args.deep_share,
+        fanout_roots=args.fanout_roots,
+        prefix=args.prefix,
+        seed=args.seed,
+    )
+    results = asyncio.run(benchmark(args, shape))
+
+    if args.output:
+        args.output.write_text(json.dumps({"shape": vars(shape), "results": results}, indent=2))
+        print(f"Results written to {args.output}.")
+
+    if args.baseline:
+        from .runner import compare
+
+        baseline = json.loads(args.baseline.read_text())
+        if baseline["shape"] != vars(shape):
+            sys.exit("The baseline was measured on a registry of a different shape.")
+        regressions = compare(results, baseline["results"], args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            sys.exit(f"{len(regressions)} regressions compared to {args.baseline}.")
+        print(f"No regressions compared to {args.baseline}.")
+
+
+main()
@@ -0,0 +1,113 @@
+"""
+This module writes a synthetic registry directly into the databases configured for the API, Postgres and MongoDB
+or the embedded SQLite storage.
+Registering a million artifacts through the API would take hours, so the rows and documents are inserted
+in bulk, exactly as the registration routes would have left them.
+"""
+
+import time
+from typing import List
+
+from sqlalchemy import delete, insert, select
+
+from esparx_api.dagdb import LocalSession
+from esparx_api.documentdb import REVISION_FIELD, bump_artifacts_version, get_collection
+from esparx_api.schemas import Artifact, Connection, GraphVersion, Pipeline
+from esparx_api.schemas.dag import artifact_pipelines
+
+from .workload import SyntheticRegistry
+
+CHUNK_SIZE = 10_000
+"""Number of rows or documents inserted at once"""
+
+OWNER_ID = "benchmark"
+"""Owner of the synthetic artifacts and pipelines"""
+
+
+def chunks(items: list, size: int = CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+async def insert_returning_ids(session, model, rows: List[dict]) -> List[int]:
+    """Insert rows in chunks and get their ids in the order of the rows"""
+
+    ids = []
+    for chunk in chunks(rows):
+        stmt = insert(model).returning(model.id, sort_by_parameter_order=True)
+        ids.extend(await session.scalars(stmt, chunk))
+    return ids
+
+
+async def load_registry(registry: SyntheticRegistry):
+    """Write a synthetic registry into the DAG database and the document database"""
+
+    start = time.perf_counter()
+    async with LocalSession.begin() as s:
+        pipeline_ids = await insert_returning_ids(
+            s, Pipeline, [{"name": name, "owner_id": OWNER_ID} for name in registry.pipelines]
+        )
+        artifact_ids = await insert_returning_ids(
+            s,
+            Artifact,
+            [{"name": name, "artifact_type": t, "owner_id": OWNER_ID} for name, t in registry.artifacts],
+        )
+        for chunk in chunks(registry.memberships):
+            await s.execute(
+                insert(artifact_pipelines),
+                [{"left_id": artifact_ids[a], "right_id": pipeline_ids[p]} for a, p in chunk],
+            )
+        for chunk in chunks(registry.connections):
+            await s.execute(
+                insert(Connection),
+                [
+                    {
+                        "source_id": artifact_ids[source],
+                        "target_id": artifact_ids[target],
+                        "pipeline_id": pipeline_ids[p],
+                    }
+                    for source, target, p in chunk
+                ],
+            )
+        await GraphVersion.bump(s)
+    print(f"Wrote {len(registry.artifacts)} artifacts to dagdb in {time.perf_counter() - start:.1f}s.")
+
+    start = time.perf_counter()
+    collection = get_collection("artifacts")
+    for chunk in chunks(list(range(len(registry.artifacts)))):
+        await collection.insert_many(
+            [{**registry.document(index), REVISION_FIELD: 1} for index in chunk], ordered=False
+        )
+    await bump_artifacts_version()
+    print(f"Wrote {len(registry.artifacts)} artifacts to artifactdb in {time.perf_counter() - start:.1f}s.")
+
+
+async def unload_registry(prefix: str):
+    """Remove all artifacts and pipelines whose name starts with `prefix` from both databases"""
+
+    pattern = f"{prefix}-%"
+    async with LocalSession.begin() as s:
+        names = (await s.scalars(select(Artifact.name).where(Artifact.name.like(pattern)))).all()
+        artifact_ids = select(Artifact.id).where(Artifact.name.like(pattern))
+        pipeline_ids = select(Pipeline.id).where(Pipeline.name.like(pattern))
+        await s.execute(
+            delete(artifact_pipelines).where(
+                artifact_pipelines.c.left_id.in_(artifact_ids) | artifact_pipelines.c.right_id.in_(pipeline_ids)
+            )
+        )
+        await s.execute(
+            delete(Connection).where(
+                Connection.source_id.in_(artifact_ids)
+                | Connection.target_id.in_(artifact_ids)
+                | Connection.pipeline_id.in_(pipeline_ids)
+            )
+        )
+        await s.execute(delete(Artifact).where(Artifact.name.like(pattern)))
+        await s.execute(delete(Pipeline).where(Pipeline.name.like(pattern)))
+        await GraphVersion.bump(s)
+
+    # the documents are deleted by the names of their artifacts, as the embedded document database has no $regex
+    for chunk in chunks(names):
+        await get_collection("artifacts").delete_many({"name": {"$in": chunk}})
+    await bump_artifacts_version()
+    print(f"Removed the synthetic registry with prefix {prefix}.")
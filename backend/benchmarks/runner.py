@@ -0,0 +1,304 @@
+"""
+This module drives every route of the API through its ASGI app, i.e., in-process and without a server or network
+in between, and records the throughput, latency percentiles and memory usage per route.
+
+The read routes are requested first, on the synthetic registry as loaded. The write routes then register new
+artifacts into separate pipelines, register some of them again without changes, connect them and delete them again,
+such that the registry is left unchanged.
+"""
+
+import asyncio
+import random
+import resource
+import statistics
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+from fastapi import FastAPI
+
+from .loader import OWNER_ID
+from .workload import ARTIFACT_TYPES, WORDS, SyntheticRegistry, make_document
+
+RequestFactory = Callable[[int], dict]
+"""Builds the keyword arguments of `httpx.AsyncClient.request` for the n-th request to a route"""
+
+WRITE_PIPELINES = 10
+"""Number of pipelines the write routes register artifacts into"""
+
+BATCH_SIZE = 10
+"""Number of chained artifacts registered per request to the batch route"""
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Get the q-th percentile (0 <= q <= 100) of a list of values"""
+
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def get_rss_mb() -> Optional[float]:
+    """Get the resident memory of this process in MiB, or None where /proc is not available"""
+
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize() / 2**20
+    except OSError:
+        return None
+
+
+def get_peak_rss_mb() -> float:
+    # reported in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def run_route(
+    client: httpx.AsyncClient, label: str, make_request: RequestFactory, requests: int, concurrency: int
+) -> dict:
+    """
+    Send `requests` requests to a route with at most `concurrency` requests in flight. The first request is sent
+    on its own beforehand and reported as `cold`, as it fills the caches (e.g., the graph cache) of the API.
+    """
+
+    start = time.perf_counter()
+    response = await client.request(**make_request(0))
+    cold = time.perf_counter() - start
+    errors = int(response.status_code >= 400)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def request(n: int):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.request(**make_request(n))
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+    start = time.perf_counter()
+    await asyncio.gather(*(request(n) for n in range(1, requests + 1)))
+    duration = time.perf_counter() - start
+
+    result = {
+        "route": label,
+        "requests": requests,
+        "errors": errors,
+        "cold": cold,
+        "throughput": requests / duration,
+        "mean": statistics.mean(latencies),
+        "p50": percentile(latencies, 50),
+        "p90": percentile(latencies, 90),
+        "p99": percentile(latencies, 99),
+        "rss_mb": get_rss_mb(),
+        "peak_rss_mb": get_peak_rss_mb(),
+    }
+    if tracemalloc.is_tracing():
+        result["peak_traced_mb"] = tracemalloc.get_traced_memory()[1] / 2**20
+    return result
+
+
+def read_routes(registry: SyntheticRegistry, seed: int) -> Dict[str, RequestFactory]:
+    """Requests to all read routes, each for a random artifact or pipeline of the registry"""
+
+    rng = random.Random(seed)
+    prefix = registry.shape.prefix
+
+    def artifact(n: int) -> str:
+        return registry.artifacts[rng.randrange(len(registry.artifacts))][0]
+
+    def pipeline(n: int) -> str:
+        return registry.pipelines[rng.randrange(len(registry.pipelines))]
+
+    def get(url: str, **params) -> dict:
+        return {"method": "GET", "url": url, "params": params}
+
+    return {
+        "GET /graph": lambda n: get("/graph"),
+        "GET /graph/layout": lambda n: get("/graph/layout"),
+        "GET /autocomplete": lambda n: get(
+            "/autocomplete", prefix=f"{prefix}-{rng.choice(ARTIFACT_TYPES)}-{rng.choice(WORDS)}"[: rng.randint(1, 30)]
+        ),
+        "GET /artifacts/": lambda n: get("/artifacts/", after=artifact(n), limit=100),
+        "GET /artifacts/search": lambda n: get("/artifacts/search", q=" ".join(rng.sample(WORDS, 2))),
+        "GET /artifacts/global": lambda n: get("/artifacts/global", limit=1000),
+        "GET /artifacts/pipeline/{pipeline_name}": lambda n: get(f"/artifacts/pipeline/{pipeline(n)}"),
+        "GET /artifacts/neighbors/{name}": lambda n: get(f"/artifacts/neighbors/{artifact(n)}"),
+        "GET /artifacts/lineage/{name}": lambda n: get(f"/artifacts/lineage/{artifact(n)}"),
+        "GET /artifacts/name/{name}": lambda n: get(f"/artifacts/name/{artifact(n)}"),
+        "GET /pipelines/": lambda n: get("/pipelines/", limit=1000),
+        "GET /pipelines/artifact/{artifact_name}": lambda n: get(f"/pipelines/artifact/{artifact(n)}"),
+        "GET /pipelines/results/{pipeline_name}": lambda n: get(f"/pipelines/results/{pipeline(n)}"),
+        "GET /pipelines/{pipeline_name}/layout": lambda n: get(f"/pipelines/{pipeline(n)}/layout"),
+        "GET /connections/": lambda n: get("/connections/", limit=1000),
+        "GET /connections/pipeline/{pipeline_name}": lambda n: get(f"/connections/pipeline/{pipeline(n)}"),
+        "GET /metrics": lambda n: get("/metrics"),
+    }
+
+
+def write_entry(prefix: str, name: str, artifact_type: str, n: int) -> dict:
+    """Get the body registering an artifact into one of the write pipelines, with the root of the pipeline as source"""
+
+    pipeline = n % WRITE_PIPELINES
+    created_at = datetime.now(timezone.utc)
+    return {
+        **make_document(name, artifact_type, random.Random(name), created_at),
+        "created_at": created_at.isoformat(),
+        "pipeline_name": f"{prefix}-write-pipeline-{pipeline}",
+        "source_name": f"{prefix}-write-root-{pipeline}",
+    }
+
+
+def write_routes(registry: SyntheticRegistry) -> Tuple[Dict[str, RequestFactory], List[str]]:
+    """Requests to all write routes and the names of the artifacts they register"""
+
+    prefix = registry.shape.prefix
+    written = []
+
+    def register(artifact_type: str) -> RequestFactory:
+        def make_request(n: int) -> dict:
+            name = f"{prefix}-write-{artifact_type}-{n}"
+            written.append(name)
+            return {
+                "method": "POST",
+                "url": f"/register/{artifact_type}",
+                "json": write_entry(prefix, name, artifact_type, n),
+            }
+
+        return make_request
+
+    def register_batch(n: int) -> dict:
+        artifacts = []
+        for i in range(BATCH_SIZE):
+            name = f"{prefix}-write-batch-{n}-{i}"
+            written.append(name)
+            entry = write_entry(prefix, name, ARTIFACT_TYPES[i % len(ARTIFACT_TYPES)], n)
+            if i > 0:
+                entry["source_name"] = artifacts[-1]["name"]
+            artifacts.append(entry)
+        return {"method": "POST", "url": "/register/batch", "json": {"artifacts": artifacts}}
+
+    def connect(n: int) -> dict:
+        connection = {
+            "source": f"{prefix}-write-code-{n}",
+            "target": f"{prefix}-write-model-{n}",
+            "pipeline": f"{prefix}-write-pipeline-{n % WRITE_PIPELINES}",
+        }
+        return {"method": "POST", "url": "/connections/create", "json": connection}
+
+    def register_unchanged(n: int) -> dict:
+        # repeats the registration of the n-th code artifact, like training scripts do at the start of every run
+        name = f"{prefix}-write-code-{n}"
+        return {"method": "POST", "url": "/register/code", "json": write_entry(prefix, name, "code", n)}
+
+    routes = {f"POST /register/{artifact_type}": register(artifact_type) for artifact_type in ARTIFACT_TYPES}
+    routes["POST /register/code (unchanged)"] = register_unchanged
+    routes["POST /register/batch"] = register_batch
+    routes["POST /connections/create"] = connect
+    return routes, written
+
+
+async def run_benchmark(
+    app: FastAPI, registry: SyntheticRegistry, requests: int, concurrency: int, writes: bool = True, seed: int = 0
+) -> List[dict]:
+    """Benchmark all routes one after another, the read routes first"""
+
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    # the transport does not run the lifespan of the app, which prepares the databases and warms up the caches
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://benchmark", headers={"X-User-ID": OWNER_ID}, timeout=None
+        ) as client:
+            for label, make_request in read_routes(registry, seed).items():
+                results.append(await run_route(client, label, make_request, requests, concurrency))
+                print_result(results[-1])
+
+            if not writes:
+                return results
+
+            # the roots of the write pipelines are the sources of all registered artifacts
+            prefix = registry.shape.prefix
+            roots = [f"{prefix}-write-root-{p}" for p in range(WRITE_PIPELINES)]
+            for p, root in enumerate(roots):
+                body = {**write_entry(prefix, root, "dataset", p), "source_name": None}
+                (await client.post("/register/dataset", json=body)).raise_for_status()
+
+            routes, written = write_routes(registry)
+            for label, make_request in routes.items():
+                results.append(await run_route(client, label, make_request, requests, concurrency))
+                print_result(results[-1])
+
+            names = iter(written + roots)
+            results.append(
+                await run_route(
+                    client,
+                    "DELETE /artifacts/name/{name}",
+                    lambda n: {"method": "DELETE", "url": f"/artifacts/name/{next(names)}"},
+                    len(written) + len(roots) - 1,
+                    concurrency,
+                )
+            )
+            print_result(results[-1])
+            pipelines = iter(range(WRITE_PIPELINES))
+            results.append(
+                await run_route(
+                    client,
+                    "DELETE /pipelines/name/{name}",
+                    lambda n: {
+                        "method": "DELETE",
+                        "url": f"/pipelines/name/{prefix}-write-pipeline-{next(pipelines)}",
+                    },
+                    WRITE_PIPELINES - 1,
+                    concurrency,
+                )
+            )
+            print_result(results[-1])
+
+    return results
+
+
+def print_header():
+    print(
+        f"{'route':<44} {'req/s':>9} {'cold ms':>9} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} "
+        f"{'errors':>7} {'rss MiB':>8}"
+    )
+
+
+def print_result(result: dict):
+    rss = f"{result['rss_mb']:.0f}" if result["rss_mb"] is not None else "-"
+    print(
+        f"{result['route']:<44} {result['throughput']:>9.1f} {result['cold'] * 1000:>9.1f} "
+        f"{result['p50'] * 1000:>8.1f} {result['p90'] * 1000:>8.1f} {result['p99'] * 1000:>8.1f} "
+        f"{result['errors']:>7} {rss:>8}"
+    )
+
+
+def compare(results: List[dict], baseline: List[dict], tolerance: float) -> List[str]:
+    """Get the routes which got slower (p99, throughput) or need more memory than in the baseline"""
+
+    baseline_by_route = {result["route"]: result for result in baseline}
+    regressions = []
+    for result in results:
+        before = baseline_by_route.get(result["route"])
+        if before is None:
+            continue
+        if result["p99"] > before["p99"] * (1 + tolerance):
+            regressions.append(f"{result['route']}: p99 {before['p99'] * 1000:.1f}ms -> {result['p99'] * 1000:.1f}ms")
+        if result["throughput"] < before["throughput"] * (1 - tolerance):
+            regressions.append(
+                f"{result['route']}: throughput {before['throughput']:.1f}/s -> {result['throughput']:.1f}/s"
+            )
+        if result["peak_rss_mb"] > before["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(
+                f"{result['route']}: peak memory {before['peak_rss_mb']:.0f}MiB -> {result['peak_rss_mb']:.0f}MiB"
+            )
+        if result["errors"] > before["errors"]:
+            regressions.append(f"{result['route']}: errors {before['errors']} -> {result['errors']}")
+    return regressions
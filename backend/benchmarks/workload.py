@@ -0,0 +1,151 @@
+"""
+This module generates synthetic registries shaped like the ones e-SparX serves in production:
+many pipelines, a few hub datasets shared by a large part of the pipelines, pipelines forming deep chains
+(every artifact feeds the next one) and pipelines with wide fan-outs (a few artifacts feed many others,
+e.g., one training script producing many models and results).
+
+The registry is generated from a seed, so two runs with the same shape benchmark the same graph.
+"""
+
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import List, Tuple
+
+ARTIFACT_TYPES = ["code", "dataset", "model", "hyperparameters", "parameters", "results"]
+"""Types of the artifacts within pipelines, drawn with the weights `ARTIFACT_TYPE_WEIGHTS`"""
+
+ARTIFACT_TYPE_WEIGHTS = [35, 15, 15, 10, 10, 15]
+
+FILE_TYPES = {
+    "code": "PY",
+    "dataset": "CSV",
+    "model": "PT",
+    "hyperparameters": "JSON",
+    "parameters": "JSON",
+    "results": "JSON",
+}
+
+METRICS = ["rmse", "mae", "mape", "r2", "pinball_loss", "crps", "skill_score", "coverage"]
+
+WORDS = ["weather", "forecast", "wind", "solar", "load", "grid", "price", "train", "test", "feature", "clean", "merge"]
+"""Words of the synthetic names and descriptions, such that searches and prefix lookups match many artifacts"""
+
+CREATED_AT = datetime(2024, 1, 1, tzinfo=timezone.utc)
+"""Creation time of the first synthetic artifact, the following ones are created one minute apart"""
+
+
+@dataclass
+class WorkloadShape:
+    """Size and shape of a synthetic registry"""
+
+    pipelines: int = 100
+    artifacts: int = 10_000
+    """Number of artifacts, including the hub datasets"""
+
+    hub_datasets: int = 50
+    """Datasets shared between pipelines. A few hubs are used by most pipelines, the rest by a few."""
+
+    hubs_per_pipeline: int = 3
+    """Maximum number of hub datasets a pipeline reads from"""
+
+    deep_share: float = 0.3
+    """Share of the pipelines forming deep chains, the remaining pipelines fan out widely"""
+
+    fanout_roots: int = 3
+    """Number of artifacts at the start of a wide pipeline that all later artifacts are connected to"""
+
+    prefix: str = "bench"
+    """Prefix of all names, such that the synthetic registry can be told apart from (and removed without) real data"""
+
+    seed: int = 0
+
+
+@dataclass
+class SyntheticRegistry:
+    """
+    Pipelines, artifacts, memberships and connections of a synthetic registry.
+    Artifacts and pipelines are referenced by their index in `artifacts` and `pipelines`.
+    """
+
+    shape: WorkloadShape
+    pipelines: List[str] = field(default_factory=list)
+    artifacts: List[Tuple[str, str]] = field(default_factory=list)
+    """(name, artifact type) of all artifacts, hub datasets first"""
+
+    memberships: List[Tuple[int, int]] = field(default_factory=list)
+    """(artifact index, pipeline index)"""
+
+    connections: List[Tuple[int, int, int]] = field(default_factory=list)
+    """(source artifact index, target artifact index, pipeline index)"""
+
+    def document(self, index: int) -> dict:
+        """Get the document database entry of an artifact, as written by the registration routes"""
+
+        name, artifact_type = self.artifacts[index]
+        rng = random.Random(f"{self.shape.seed}-{index}")
+        return make_document(name, artifact_type, rng, CREATED_AT + timedelta(minutes=index))
+
+
+def make_document(name: str, artifact_type: str, rng: random.Random, created_at: datetime) -> dict:
+    """Get a document database entry with the fields of the given artifact type"""
+
+    entry = {
+        "name": name,
+        "description": f"synthetic {artifact_type} for {' '.join(rng.sample(WORDS, 3))}",
+        "artifact_type": artifact_type,
+        "file_type": FILE_TYPES[artifact_type],
+        "created_at": created_at,
+    }
+    if artifact_type == "dataset":
+        entry.update(artifact_subtype="pandas", num_rows=rng.randint(100, 10**6), num_columns=rng.randint(2, 50))
+    elif artifact_type == "model":
+        entry.update(flavor="pytorch")
+    elif artifact_type == "hyperparameters":
+        entry["hyperparameters"] = [
+            {"name": "learning_rate", "value": rng.choice([1e-2, 1e-3, 1e-4])},
+            {"name": "epochs", "value": rng.randint(10, 500)},
+        ]
+    elif artifact_type == "results":
+        entry["results"] = [{"metric": metric, "value": rng.random()} for metric in rng.sample(METRICS, 4)]
+    return entry
+
+
+def generate_registry(shape: WorkloadShape) -> SyntheticRegistry:
+    """Generate a registry of the given shape. Every pipeline contains at least one artifact besides its hubs."""
+
+    if shape.artifacts < shape.hub_datasets + shape.pipelines:
+        raise ValueError("The registry needs at least one artifact per pipeline in addition to the hub datasets.")
+
+    rng = random.Random(shape.seed)
+    registry = SyntheticRegistry(shape)
+    registry.pipelines = [f"{shape.prefix}-pipeline-{p}" for p in range(shape.pipelines)]
+    registry.artifacts = [(f"{shape.prefix}-hub-{h}-{rng.choice(WORDS)}", "dataset") for h in range(shape.hub_datasets)]
+
+    per_pipeline, remainder = divmod(shape.artifacts - shape.hub_datasets, shape.pipelines)
+    for p in range(shape.pipelines):
+        members = []
+        # skewed towards the first hubs, such that a few hubs are part of most pipelines
+        if shape.hub_datasets:
+            hubs = {int(shape.hub_datasets * rng.random() ** 3) for _ in range(rng.randint(1, shape.hubs_per_pipeline))}
+            members.extend(sorted(hubs))
+
+        deep = rng.random() < shape.deep_share
+        first = len(registry.artifacts)
+        for i in range(per_pipeline + (p < remainder)):
+            index = len(registry.artifacts)
+            artifact_type = rng.choices(ARTIFACT_TYPES, ARTIFACT_TYPE_WEIGHTS)[0]
+            registry.artifacts.append((f"{shape.prefix}-{artifact_type}-{rng.choice(WORDS)}-{index}", artifact_type))
+            members.append(index)
+
+            if i == 0:
+                sources = members[:-1]  # the hubs feed the first artifact of the pipeline
+            elif deep:
+                sources = [index - 1]
+            else:
+                sources = [first + rng.randrange(min(i, shape.fanout_roots))]
+            registry.connections.extend((source, index, p) for source in sources)
+
+        registry.memberships.extend((index, p) for index in members)
+
+    return registry
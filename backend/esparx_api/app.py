@@ -1,74 +1,174 @@
+import asyncio
+import os
+import time
 from argparse import ArgumentParser
+from contextlib import asynccontextmanager, suppress
 
-import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from esparx_api.dagdb import LocalGraphCache, create_tables, dispose_engine
+from esparx_api.dependencies import NEXT_CURSOR_HEADER
+from esparx_api.documentdb import ArtifactSearchIndex, close_client, create_indexes
+from esparx_api.metrics import (
+    CACHE_WARM_UP_DURATION,
+    STARTUP_DURATION,
+    mark_worker_stopped,
+    prepare_multiprocess_directory,
+)
+from esparx_api.middleware import (
+    CompressionMiddleware,
+    MetricsMiddleware,
+    add_timeout_handlers,
+)
 from esparx_api.routes import (
     ArtifactRegisterRouter,
     ArtifactRouter,
+    AutocompleteRouter,
     ConnectionRouter,
+    GraphRouter,
+    MetricsRouter,
     PipelineRouter,
 )
+from esparx_api.settings import settings
+
+
+async def warm_up_caches():
+    start = time.perf_counter()
+    try:
+        await LocalGraphCache.warm_up()
+    except Exception as err:
+        # the cache is loaded by the first request instead
+        print(f"Warming up the graph cache failed ({err!r}).")
+        return
+    CACHE_WARM_UP_DURATION.set(time.perf_counter() - start)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Prepare the databases on startup and close all connections on shutdown"""
+
+    start = time.perf_counter()
+    # the databases are independent, so they are prepared concurrently
+    await asyncio.gather(create_tables(), create_indexes(), ArtifactSearchIndex.create_text_index())
+    # loading the DAG takes long for large registries and does not delay the startup. Requests arriving before
+    # it finished wait for it, see `GraphCache.refresh`.
+    warm_up = asyncio.create_task(warm_up_caches())
+    duration = time.perf_counter() - start
+    STARTUP_DURATION.set(duration)
+    print(f"API started in {duration:.3f}s.")
+    yield
+    warm_up.cancel()
+    with suppress(asyncio.CancelledError):
+        await warm_up
+    await dispose_engine()
+    await close_client()
+    mark_worker_stopped()
+
 
 app = FastAPI(
     title="e-SparX API",
+    lifespan=lifespan,
+)
+
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    max_request_size=settings.MAX_DECOMPRESSED_REQUEST_SIZE,
 )
 
+# added after the compression, so that the measured latency includes it
+app.add_middleware(MetricsMiddleware, query_debug=settings.QUERY_DEBUG)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 
+# fail fast with 503 Service Unavailable while a connection pool is saturated or a database is unreachable
+add_timeout_handlers(app)
+
 app.include_router(ArtifactRegisterRouter, prefix="/register")
 app.include_router(ArtifactRouter, prefix="/artifacts")
 app.include_router(PipelineRouter, prefix="/pipelines")
 app.include_router(ConnectionRouter, prefix="/connections")
+app.include_router(GraphRouter, prefix="/graph")
+app.include_router(AutocompleteRouter, prefix="/autocomplete")
+app.include_router(MetricsRouter, prefix="/metrics")
 
 
-@app.get(
-    "/", tags=["Welcome"]
-)  # tags are used to group the endpoints in the documentation
+@app.get("/", tags=["Welcome"])  # tags are used to group the endpoints in the documentation
 async def root():
     """Base route with welcome message."""
 
-    return {
-        "message": "Welcome to the e-SparX API. Go to /docs for the API documentation."
-    }
+    return {"message": "Welcome to the e-SparX API. Go to /docs for the API documentation."}
+
+
+def get_cpu_count() -> int:
+    # the CPUs this process may run on, which can be fewer than the CPUs of the machine, e.g., in a container
+    return len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
 
 
 def main():
     """Start FastAPI server"""
 
     parser = ArgumentParser(description="e-SparX API")
-    parser.add_argument(
-        "-r", "--reload", action="store_true", help="Enables auto-reload"
-    )
-    parser.add_argument(
-        "-p", "--port", type=int, help="Port on which the API will listen", default=8080
-    )
-    parser.add_argument(
-        "-s", "--share", action="store_true", help="Allow API access from other devices"
-    )
+    parser.add_argument("-r", "--reload", action="store_true", help="Enables auto-reload")
+    parser.add_argument("-p", "--port", type=int, help="Port on which the API will listen", default=8080)
+    parser.add_argument("-s", "--share", action="store_true", help="Allow API access from other devices")
     parser.add_argument(
         "--root-path",
         type=str,
         help="API root path for example, if it is hosted behind a proxy",
         default="/",
     )
+    parser.add_argument(
+        "--production",
+        action="store_true",
+        help="Serve with several worker processes, uvloop and httptools, configured by the server settings",
+    )
+    parser.add_argument("-w", "--workers", type=int, help="Number of worker processes, overrides WORKERS")
     # store true means that argument will be set to True when the flag
     # is given and to False otherwise
 
     args = parser.parse_args()
+    if args.reload and (args.production or args.workers):
+        parser.error("--reload runs a single process and cannot be combined with --production or --workers")
+
+    # only needed to run the server, not to import the app
+    import uvicorn
 
     # App must listen on 0.0.0.0, which binds the server to all network interfaces
     # inside the container. If the app is only listening on localhost or 127.0.0.1,
     # it will not be accessible from outside the container.
-    uvicorn.run(
-        "esparx_api:app",
+    options = dict(
         host="0.0.0.0" if args.share else "127.0.0.1",
         reload=args.reload,
         port=args.port,
         root_path=args.root_path,
     )
+    if args.production:
+        options.update(
+            # fail if the fast implementations are not installed, instead of silently falling back to asyncio and h11
+            loop="uvloop",
+            http="httptools",
+            backlog=settings.BACKLOG,
+            timeout_keep_alive=settings.KEEP_ALIVE_TIMEOUT,
+            limit_max_requests=settings.MAX_REQUESTS_PER_WORKER,
+            limit_max_requests_jitter=settings.MAX_REQUESTS_JITTER,
+            timeout_graceful_shutdown=settings.GRACEFUL_SHUTDOWN_TIMEOUT,
+            access_log=settings.ACCESS_LOG,
+        )
+    workers = args.workers or (settings.WORKERS or get_cpu_count() if args.production else 1)
+    if workers > 1:
+        # every worker has its own metrics, which are aggregated through files
+        prepare_multiprocess_directory()
+        options["workers"] = workers
+        print(
+            f"Starting {workers} workers with up to {settings.DAGDB_POOL_SIZE + settings.DAGDB_MAX_OVERFLOW} "
+            f"connections to the DAG database each."
+        )
+
+    uvicorn.run("esparx_api:app", **options)
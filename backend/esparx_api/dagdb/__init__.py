@@ -1 +1,2 @@
-from .session import Session, LocalSession, Engine
+from .session import Session, LocalSession, READ_OPTIONS, SNAPSHOT_OPTIONS, create_tables, dispose_engine, get_engine
+from .cache import CachedGraph, GraphCache, GraphSnapshot, LocalGraphCache, NameKind
@@ -0,0 +1,407 @@
+"""
+This module keeps an in-process copy of the DAG (pipelines, artifacts, pipeline memberships and connections),
+from which the read routes are served.
+The copy is tagged with the graph version persisted in the DAG database. Every write bumps that version,
+so each request only checks the version and the DAG is loaded again only after a write.
+As the version lives in the database, every uvicorn worker notices writes made by the other workers.
+"""
+
+import asyncio
+from bisect import bisect_right
+from collections import defaultdict
+from dataclasses import dataclass, field
+from functools import cached_property
+from itertools import islice
+from typing import (
+    Annotated,
+    Any,
+    Callable,
+    Dict,
+    List,
+    Literal,
+    Optional,
+    Sequence,
+    Tuple,
+    get_args,
+)
+
+from fastapi import Depends, Request, Response
+from sqlalchemy import Row, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from esparx_api import settings
+from esparx_api.dependencies.etag import check_etag, make_etag, representation_etag
+from esparx_api.dependencies.serialization import encode
+from esparx_api.metrics import exempt_from_budget
+from esparx_api.schemas import Artifact, Connection, GraphVersion, Pipeline
+from esparx_api.schemas.dag import artifact_pipelines
+
+from .layout import compute_layout
+from .names import NameIndex
+from .session import SNAPSHOT_OPTIONS, LocalSession
+
+
+def paginate(
+    rows: Sequence[Row], keys: List[Any], after: Any, limit: Optional[int], where: Optional[Callable] = None
+) -> List[Row]:
+    """Keyset pagination over rows ordered by `keys`, optionally keeping only rows matching `where`"""
+
+    start = 0 if after is None else bisect_right(keys, after)
+    selected = (rows[i] for i in range(start, len(rows)))
+    if where is not None:
+        selected = filter(where, selected)
+    return list(islice(selected, limit))
+
+
+NameKind = Literal["artifact", "pipeline"]
+
+
+def diff_names(previous: Sequence[Row], rows: Sequence[Row]) -> Tuple[List[str], List[str]]:
+    """Get the names of the rows removed from and added to `previous`, both ordered by id"""
+
+    # ids only increase, so if nothing was removed, the previous rows are a prefix of the current ones
+    if rows[: len(previous)] == previous:
+        return [], [row.name for row in rows[len(previous) :]]
+
+    removed, added = [], []
+    i = j = 0
+    while i < len(previous) and j < len(rows):
+        if previous[i] == rows[j]:
+            i, j = i + 1, j + 1
+        elif previous[i].id <= rows[j].id:
+            # SQLite reuses the largest id after it was deleted, so a row with the same id may differ
+            removed.append(previous[i].name)
+            i += 1
+        else:
+            added.append(rows[j].name)
+            j += 1
+    removed += [row.name for row in previous[i:]]
+    added += [row.name for row in rows[j:]]
+    return removed, added
+
+
+@dataclass
+class GraphSnapshot:
+    """Immutable copy of the DAG at a given graph version"""
+
+    version: int
+
+    pipelines: Sequence[Row]
+    """(id, name, owner_id) of all pipelines ordered by id"""
+
+    artifacts: Sequence[Row]
+    """(id, name, artifact_type, owner_id) of all artifacts ordered by id"""
+
+    memberships: Sequence[Row]
+    """(artifact id, pipeline id) of all links between artifacts and pipelines"""
+
+    connections: Sequence[Row]
+    """(id, source_id, target_id, pipeline_id) of all connections ordered by id"""
+
+    artifact_by_id: Dict[int, Row] = field(init=False)
+    artifact_by_name: Dict[str, Row] = field(init=False)
+    pipeline_by_name: Dict[str, Row] = field(init=False)
+    pipeline_ids_by_artifact: Dict[int, List[int]] = field(init=False)
+    artifact_ids_by_pipeline: Dict[int, List[int]] = field(init=False)
+    connections_by_pipeline: Dict[int, List[Row]] = field(init=False)
+    connections_by_source: Dict[int, List[Row]] = field(init=False)
+    connections_by_target: Dict[int, List[Row]] = field(init=False)
+    layouts: Dict[Optional[str], dict] = field(init=False)
+    """Layouts of the DAG (key None) and of pipelines, computed on first request"""
+    name_indexes: Dict[NameKind, NameIndex] = field(init=False)
+    """Prefix indexes over artifact and pipeline names for autocompletion"""
+    encoded: Dict[Tuple[Any, str], bytes] = field(init=False)
+    """Encoded responses by key and media type, see `get_encoded`"""
+
+    def __post_init__(self):
+        self.layouts = {}
+        self.name_indexes = {}
+        self.encoded = {}
+        self.artifact_by_id = {artifact.id: artifact for artifact in self.artifacts}
+        self.artifact_by_name = {artifact.name: artifact for artifact in self.artifacts}
+        self.pipeline_by_name = {pipeline.name: pipeline for pipeline in self.pipelines}
+
+        self.pipeline_ids_by_artifact = defaultdict(list)
+        self.artifact_ids_by_pipeline = defaultdict(list)
+        for artifact_id, pipeline_id in sorted(self.memberships):
+            self.pipeline_ids_by_artifact[artifact_id].append(pipeline_id)
+            self.artifact_ids_by_pipeline[pipeline_id].append(artifact_id)
+        for artifact_ids in self.artifact_ids_by_pipeline.values():
+            artifact_ids.sort()
+
+        self.connections_by_pipeline = defaultdict(list)
+        self.connections_by_source = defaultdict(list)
+        self.connections_by_target = defaultdict(list)
+        for connection in self.connections:
+            self.connections_by_pipeline[connection.pipeline_id].append(connection)
+            self.connections_by_source[connection.source_id].append(connection)
+            self.connections_by_target[connection.target_id].append(connection)
+
+    @cached_property
+    def artifact_ids(self) -> List[int]:
+        return [artifact.id for artifact in self.artifacts]
+
+    @cached_property
+    def pipeline_ids(self) -> List[int]:
+        return [pipeline.id for pipeline in self.pipelines]
+
+    @cached_property
+    def connection_ids(self) -> List[int]:
+        return [connection.id for connection in self.connections]
+
+    def get_all_artifacts(
+        self,
+        after: Optional[int] = None,
+        limit: Optional[int] = None,
+        artifact_type: Optional[str] = None,
+        owner_id: Optional[str] = None,
+    ) -> List[Row]:
+        """Get all artifacts ordered by id. Supports keyset pagination via `after` (last id) and `limit`."""
+
+        def where(artifact: Row) -> bool:
+            return (artifact_type is None or artifact.artifact_type == artifact_type) and (
+                owner_id is None or artifact.owner_id == owner_id
+            )
+
+        return paginate(self.artifacts, self.artifact_ids, after, limit, where)
+
+    def get_all_pipelines(
+        self, after: Optional[int] = None, limit: Optional[int] = None, owner_id: Optional[str] = None
+    ) -> List[Row]:
+        """Get all pipelines ordered by id. Supports keyset pagination via `after` (last id) and `limit`."""
+
+        where = None if owner_id is None else lambda pipeline: pipeline.owner_id == owner_id
+        return paginate(self.pipelines, self.pipeline_ids, after, limit, where)
+
+    def get_all_connections(self, after: Optional[int] = None, limit: Optional[int] = None) -> List[Row]:
+        """Get all connections ordered by id. Supports keyset pagination via `after` (last id) and `limit`."""
+
+        return paginate(self.connections, self.connection_ids, after, limit)
+
+    def get_artifacts_by_pipeline(self, pipeline_name: str) -> List[Row]:
+        """Get all artifacts in a pipeline"""
+
+        pipeline = self.pipeline_by_name.get(pipeline_name)
+        if not pipeline:
+            return []
+        return [self.artifact_by_id[artifact_id] for artifact_id in self.artifact_ids_by_pipeline.get(pipeline.id, [])]
+
+    def get_pipelines_by_artifact(self, artifact_name: str) -> List[Row]:
+        """Get all pipelines that contain a specific artifact"""
+
+        artifact = self.artifact_by_name.get(artifact_name)
+        if not artifact:
+            return []
+        pipeline_ids = set(self.pipeline_ids_by_artifact.get(artifact.id, []))
+        return [pipeline for pipeline in self.pipelines if pipeline.id in pipeline_ids]
+
+    def get_neighbors(self, artifact_name: str) -> List[Row]:
+        """Get all direct neighbors (in any pipeline) of an artifact"""
+
+        artifact = self.artifact_by_name.get(artifact_name)
+        if not artifact:
+            raise ValueError("Oh no! The artifact could not be found!")
+
+        target_neighbors = [self.artifact_by_id[c.target_id] for c in self.connections_by_source.get(artifact.id, [])]
+        source_neighbors = [self.artifact_by_id[c.source_id] for c in self.connections_by_target.get(artifact.id, [])]
+        return target_neighbors + source_neighbors
+
+    def get_connections_by_pipeline(self, pipeline_name: str) -> List[Row]:
+        """Get all connections in a pipeline"""
+
+        pipeline = self.pipeline_by_name.get(pipeline_name)
+        if not pipeline:
+            return []
+        return self.connections_by_pipeline.get(pipeline.id, [])
+
+    def get_layout(self, pipeline_name: Optional[str] = None) -> dict:
+        """Get the layout of the DAG or of the artifacts and connections of a pipeline"""
+
+        if pipeline_name not in self.layouts:
+            if pipeline_name is None:
+                layout = compute_layout(self.artifacts, self.connections)
+            else:
+                pipeline = self.pipeline_by_name.get(pipeline_name)
+                if not pipeline:
+                    raise ValueError("Oh no! The pipeline could not be found!")
+                layout = compute_layout(
+                    self.get_artifacts_by_pipeline(pipeline_name), self.connections_by_pipeline.get(pipeline.id, [])
+                )
+            self.layouts[pipeline_name] = layout
+        return self.layouts[pipeline_name]
+
+    def get_rows(self, kind: NameKind) -> Sequence[Row]:
+        return self.artifacts if kind == "artifact" else self.pipelines
+
+    def get_ids(self, kind: NameKind) -> List[int]:
+        return self.artifact_ids if kind == "artifact" else self.pipeline_ids
+
+    def get_name_index(self, kind: NameKind) -> NameIndex:
+        """Get the prefix index over the names of all artifacts or all pipelines"""
+
+        if kind not in self.name_indexes:
+            self.name_indexes[kind] = NameIndex(row.name for row in self.get_rows(kind))
+        return self.name_indexes[kind]
+
+    def update_name_indexes(self, previous: "GraphSnapshot"):
+        """
+        Take over the name indexes of a previous snapshot and remove and add the names of the rows deleted and
+        created since, instead of building the indexes from scratch. The previous snapshot is no longer served,
+        and builds its indexes again if it is asked for them anyway.
+        """
+
+        for kind in list(previous.name_indexes):
+            removed, added = diff_names(previous.get_rows(kind), self.get_rows(kind))
+            index = previous.name_indexes.pop(kind)
+            index.update(removed, added)
+            self.name_indexes[kind] = index
+
+    def get_encoded(self, key: Any, build: Callable[[], Any], media_type: str) -> bytes:
+        """
+        Get the content returned by `build` encoded in `media_type`.
+        It is built and encoded once per version, `key` and media type.
+        """
+
+        if (key, media_type) not in self.encoded:
+            self.encoded[key, media_type] = encode(build(), media_type)
+        return self.encoded[key, media_type]
+
+    @property
+    def graph(self) -> dict:
+        """The complete DAG in the format of `GraphResponse`"""
+
+        return {
+            "pipelines": [{"id": pipeline.id, "name": pipeline.name} for pipeline in self.pipelines],
+            "artifacts": [
+                {
+                    "id": artifact.id,
+                    "name": artifact.name,
+                    "artifact_type": artifact.artifact_type,
+                    "pipelines": self.pipeline_ids_by_artifact.get(artifact.id, []),
+                }
+                for artifact in self.artifacts
+            ],
+            "connections": [
+                {"source": connection.source_id, "target": connection.target_id, "pipeline": connection.pipeline_id}
+                for connection in self.connections
+            ],
+        }
+
+
+class GraphCache:
+    """Serves the latest `GraphSnapshot` and loads a new one whenever the graph version has changed"""
+
+    def __init__(self, sessionmaker: async_sessionmaker[AsyncSession], serve_stale: bool = False):
+        self.sessionmaker = sessionmaker
+        self.serve_stale = serve_stale
+        """If set, an outdated snapshot is served while the new one is loaded in the background"""
+
+        self.snapshot: Optional[GraphSnapshot] = None
+        self._lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    async def get_version(self) -> int:
+        """Get the current graph version from the database"""
+
+        async with self.sessionmaker() as s:
+            # reading from a snapshot does not wait for writes to the embedded storage
+            await s.connection(execution_options=SNAPSHOT_OPTIONS)
+            return await GraphVersion.get_version(s)
+
+    async def load(self) -> GraphSnapshot:
+        """Load the complete DAG from the database"""
+
+        with exempt_from_budget():
+            return await self._load()
+
+    async def _load(self) -> GraphSnapshot:
+        async with self.sessionmaker() as s:
+            # read the version and all tables from the same database snapshot
+            await s.connection(execution_options=SNAPSHOT_OPTIONS)
+            version = await GraphVersion.get_version(s)
+            pipelines = await s.execute(select(Pipeline.id, Pipeline.name, Pipeline.owner_id).order_by(Pipeline.id))
+            artifacts = await s.execute(
+                select(Artifact.id, Artifact.name, Artifact.artifact_type, Artifact.owner_id).order_by(Artifact.id)
+            )
+            memberships = await s.execute(select(artifact_pipelines.c.left_id, artifact_pipelines.c.right_id))
+            connections = await s.execute(
+                select(Connection.id, Connection.source_id, Connection.target_id, Connection.pipeline_id).order_by(
+                    Connection.id
+                )
+            )
+            return GraphSnapshot(version, pipelines.all(), artifacts.all(), memberships.all(), connections.all())
+
+    async def refresh(self, version: int) -> GraphSnapshot:
+        """Load a new snapshot unless another request already loaded one at least as recent as `version`"""
+
+        async with self._lock:
+            if self.snapshot is None or self.snapshot.version < version:
+                snapshot = await self.load()
+                if self.snapshot is not None:
+                    snapshot.update_name_indexes(self.snapshot)
+                self.snapshot = snapshot
+                print(f"Graph cache loaded version {self.snapshot.version}.")
+            return self.snapshot
+
+    async def warm_up(self):
+        """Load the DAG and build the name indexes ahead of the first request"""
+
+        snapshot = await self.get()
+        for kind in get_args(NameKind):
+            snapshot.get_name_index(kind)
+
+    async def get(self, version: Optional[int] = None) -> GraphSnapshot:
+        """
+        Get a snapshot of the DAG that includes all writes up to `version` (unless stale snapshots are served).
+        Without `version`, the current version is looked up.
+        """
+
+        if version is None:
+            version = await self.get_version()
+        snapshot = self.snapshot
+        if snapshot is not None and snapshot.version >= version:
+            return snapshot
+
+        if snapshot is not None and self.serve_stale:
+            if self._refresh_task is None or self._refresh_task.done():
+                self._refresh_task = asyncio.create_task(self.refresh(version))
+            return snapshot
+
+        return await self.refresh(version)
+
+
+LocalGraphCache = GraphCache(LocalSession, serve_stale=settings.GRAPH_CACHE_SERVE_STALE)
+"""Graph cache of this worker process.
+
+Should not be used directly in most cases. Use `dagdb.CachedGraph` instead.
+"""
+
+
+async def get_graph(request: Request, response: Response):
+    """Get the cached DAG. Answers conditional requests with `304 Not Modified` without loading the DAG."""
+
+    version = await LocalGraphCache.get_version()
+    check_etag(request, response, make_etag("dag", version))
+
+    graph = await LocalGraphCache.get(version)
+    if graph.version != version:  # a stale snapshot is served
+        response.headers["ETag"] = representation_etag(request, make_etag("dag", graph.version))
+    return graph
+
+
+CachedGraph = Annotated[GraphSnapshot, Depends(get_graph)]
+"""Cached copy of the DAG predefined for FastAPI Dependency injection.
+
+Read routes should use it instead of querying the database.
+The response is tagged with the version of the DAG as ETag, which answers requests with a matching
+`If-None-Match` header with `304 Not Modified`.
+```python
+@app.get("/route")
+async def route(graph: CachedGraph):
+    return graph.get_all_artifacts()
+```
+
+The rows of the snapshot are shared between requests and must not be modified.
+
+---
+"""
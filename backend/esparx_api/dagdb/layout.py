@@ -0,0 +1,89 @@
+"""
+This module computes the positions at which the frontend draws the artifacts of a DAG.
+Artifacts are placed in levels (columns) from left to right, such that every connection points to the right
+and sinks (e.g., results) end up in the rightmost level. Within a level, artifacts are stacked in order of their id.
+The computation runs in linear time in the number of artifacts and connections.
+"""
+
+from typing import List, Sequence
+
+from sqlalchemy import Row
+
+LEVEL_SPACING = 250
+"""Horizontal distance between two levels"""
+
+ROW_SPACING = 100
+"""Vertical distance between two artifacts of the same level"""
+
+
+def get_heights(num_nodes: int, successors: List[List[int]]) -> List[int]:
+    """
+    Get the length of the longest path from every node to a sink with an iterative depth-first search.
+    Connections closing a cycle are ignored.
+    """
+
+    heights = [0] * num_nodes
+    state = [0] * num_nodes  # 0: not visited, 1: on the stack, 2: done
+    for root in range(num_nodes):
+        if state[root]:
+            continue
+        state[root] = 1
+        stack = [(root, 0)]  # node and index of the next successor to visit
+        while stack:
+            node, index = stack[-1]
+            if index < len(successors[node]):
+                stack[-1] = (node, index + 1)
+                successor = successors[node][index]
+                if state[successor] == 0:
+                    state[successor] = 1
+                    stack.append((successor, 0))
+                elif state[successor] == 2:
+                    heights[node] = max(heights[node], heights[successor] + 1)
+            else:
+                stack.pop()
+                state[node] = 2
+                if stack:
+                    parent = stack[-1][0]
+                    heights[parent] = max(heights[parent], heights[node] + 1)
+    return heights
+
+
+def compute_layout(artifacts: Sequence[Row], connections: Sequence[Row]) -> dict:
+    """
+    Compute the level and position of every artifact in the format of `LayoutResponse`.
+    `artifacts` are (id, name, artifact_type) rows, `connections` are (source_id, target_id, pipeline_id) rows.
+    Connections to artifacts outside of `artifacts` are left out.
+    """
+
+    index_by_id = {artifact.id: index for index, artifact in enumerate(artifacts)}
+    successors = [[] for _ in artifacts]
+    layout_connections = []
+    for connection in connections:
+        source = index_by_id.get(connection.source_id)
+        target = index_by_id.get(connection.target_id)
+        if source is not None and target is not None:
+            successors[source].append(target)
+            layout_connections.append(
+                {"source": connection.source_id, "target": connection.target_id, "pipeline": connection.pipeline_id}
+            )
+
+    heights = get_heights(len(artifacts), successors)
+    max_height = max(heights, default=0)
+
+    rows = [0] * (max_height + 1)
+    layout_artifacts = []
+    for artifact, height in zip(artifacts, heights):
+        level = max_height - height
+        layout_artifacts.append(
+            {
+                "id": artifact.id,
+                "name": artifact.name,
+                "artifact_type": artifact.artifact_type,
+                "level": level,
+                "x": level * LEVEL_SPACING,
+                "y": rows[level] * ROW_SPACING,
+            }
+        )
+        rows[level] += 1
+
+    return {"artifacts": layout_artifacts, "connections": layout_connections}
@@ -0,0 +1,55 @@
+"""
+This module implements the prefix index used to autocomplete artifact and pipeline names.
+Names are kept in a sorted array, so that all names starting with a prefix form a contiguous range,
+which starts at the position found by a binary search. A lookup takes O(log n + k) for the top k matches.
+"""
+
+from bisect import bisect_left, insort
+from typing import Iterable, List, Optional
+
+UPDATE_LIMIT = 64
+"""Up to this number of changed names, names are inserted and removed one by one instead of rebuilding the array"""
+
+
+class NameIndex:
+    """Sorted array of unique names supporting prefix lookups"""
+
+    def __init__(self, names: Iterable[str]):
+        self.names: List[str] = sorted(names)
+
+    def update(self, removed: List[str], added: List[str]):
+        """
+        Remove and add names in place. A single name costs a binary search and a shift of the names behind it
+        within the array, instead of copying or sorting it.
+        """
+
+        if len(removed) <= UPDATE_LIMIT:
+            for name in removed:
+                position = bisect_left(self.names, name)
+                if position < len(self.names) and self.names[position] == name:
+                    del self.names[position]
+        else:
+            removed_names = set(removed)
+            self.names[:] = [name for name in self.names if name not in removed_names]
+
+        if len(added) <= UPDATE_LIMIT:
+            for name in added:
+                insort(self.names, name)
+        else:
+            # timsort detects both sorted runs and merges them in linear time
+            self.names += sorted(added)
+            self.names.sort()
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def search(self, prefix: str, limit: Optional[int] = None) -> List[str]:
+        """Get the first `limit` names (in lexicographic order) starting with `prefix`"""
+
+        start = bisect_left(self.names, prefix)
+        # all names starting with the prefix follow each other, beginning at `start`
+        candidates = self.names[start:] if limit is None else self.names[start : start + limit]
+        for count, name in enumerate(candidates):
+            if not name.startswith(prefix):
+                return candidates[:count]
+        return candidates
@@ -1,42 +1,158 @@
+from functools import cache
 from typing import Annotated
 
 from fastapi import Depends
-from sqlalchemy import create_engine
-from sqlalchemy.orm import Session as SQLSession
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import URL, event, make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 
 from esparx_api import settings
+from esparx_api.metrics import (
+    DAGDB_POOL_MAX_SIZE,
+    exempt_from_budget,
+    instrument_engine,
+)
+from esparx_api.schemas import Base
 
 
 def get_session():
     return LocalSession
 
 
-Engine = create_engine(settings.DAGDB_CONNECTSTRING)
-"""Database engine.
+def get_async_url(connectstring: str):
+    """Make sure the psycopg driver is used, which supports both sync and async connections"""
+
+    url = make_url(connectstring)
+    if url.drivername == "postgresql":
+        url = url.set(drivername="postgresql+psycopg")
+    return url
+
+
+def get_connect_args() -> dict:
+    """Get the options of new connections to Postgres, see `Settings`"""
+
+    connect_args = {"prepare_threshold": settings.DAGDB_PREPARE_THRESHOLD}
+    if settings.DAGDB_STATEMENT_TIMEOUT:
+        # set when connecting, so that it costs no extra round trip. Overrides options of the connect string.
+        connect_args["options"] = f"-c statement_timeout={round(settings.DAGDB_STATEMENT_TIMEOUT * 1000)}"
+    return connect_args
+
+
+def get_embedded_url() -> URL:
+    """Get the URL of the SQLite file of the embedded storage"""
+
+    settings.EMBEDDED_STORAGE_PATH.mkdir(parents=True, exist_ok=True)
+    return URL.create("sqlite+aiosqlite", database=str(settings.EMBEDDED_STORAGE_PATH / "dagdb.sqlite"))
+
+
+def configure_sqlite_connection(dbapi_connection, connection_record):
+    # WAL lets reads run concurrently to the single writer, and SQLite only enforces foreign keys (and therefore
+    # the ON DELETE CASCADE of connections) if asked to
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode = WAL")
+    cursor.execute("PRAGMA synchronous = NORMAL")
+    cursor.execute("PRAGMA foreign_keys = ON")
+    cursor.execute("PRAGMA busy_timeout = 5000")
+    cursor.close()
+    # the driver would start transactions only before the first write, transactions are started in `begin_sqlite`
+    dbapi_connection.isolation_level = None
+
+
+def begin_sqlite(connection):
+    # transactions take the write lock right away, such that a transaction reading before it writes cannot fail
+    # when another connection wrote in between. Transactions which only read must be opened with `READ_OPTIONS`
+    # or `SNAPSHOT_OPTIONS`, so that they neither wait for nor block writers. The BEGIN is not counted against the
+    # query budget, so that the budgets hold for both storages, as psycopg begins transactions without a statement.
+    with exempt_from_budget():
+        connection.exec_driver_sql(f"BEGIN {connection.get_execution_options().get('sqlite_begin', 'IMMEDIATE')}")
+
+
+@cache
+def get_engine() -> AsyncEngine:
+    """
+    Get the async database engine, which is created on first use, so that importing the API needs no database.
+    The engine connects on its first statement.
+
+    Should not be used directly in most cases. Use `database.Session` instead.
+    """
+
+    if settings.STORAGE == "embedded":
+        engine = create_async_engine(get_embedded_url())
+        event.listen(engine.sync_engine, "connect", configure_sqlite_connection)
+        event.listen(engine.sync_engine, "begin", begin_sqlite)
+    elif settings.DAGDB_CONNECTSTRING:
+        engine = create_async_engine(
+            get_async_url(settings.DAGDB_CONNECTSTRING),
+            pool_size=settings.DAGDB_POOL_SIZE,
+            max_overflow=settings.DAGDB_MAX_OVERFLOW,
+            # raises a TimeoutError, which is answered with 503 Service Unavailable, see `middleware.timeouts`
+            pool_timeout=settings.DAGDB_POOL_TIMEOUT,
+            pool_recycle=settings.DAGDB_POOL_RECYCLE,
+            pool_pre_ping=settings.DAGDB_POOL_PRE_PING,
+            connect_args=get_connect_args(),
+        )
+        DAGDB_POOL_MAX_SIZE.set(settings.DAGDB_POOL_SIZE + settings.DAGDB_MAX_OVERFLOW)
+    else:
+        raise ValueError("DAGDB_CONNECTSTRING is required unless STORAGE is embedded.")
+    instrument_engine(engine)
+    return engine
+
+
+async def dispose_engine():
+    """Close all connections of the engine, if it was created. Called once on API shutdown."""
+
+    # a disposed engine remains usable and connects again on its next statement
+    if get_engine.cache_info().currsize:
+        await get_engine().dispose()
+
+
+READ_OPTIONS = {"sqlite_begin": "DEFERRED"}
+"""Execution options of a transaction which only reads, such that it does not wait for writes to the embedded storage"""
+
+SNAPSHOT_OPTIONS = READ_OPTIONS if settings.STORAGE == "embedded" else {"isolation_level": "REPEATABLE READ"}
+"""Execution options of a transaction reading several tables from the same database snapshot"""
+
+
+async def create_tables():
+    """Create the tables of the embedded storage. Called once on API startup. Postgres is set up via migrations."""
+
+    if settings.STORAGE == "embedded":
+        async with get_engine().begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+
+
+class LazySessionmaker(async_sessionmaker[AsyncSession]):
+    """Session factory binding its sessions to the engine on first use, see `get_engine`"""
+
+    def __call__(self, **local_kw) -> AsyncSession:
+        local_kw.setdefault("bind", get_engine())
+        return super().__call__(**local_kw)
 
-Should not be used directly in most cases. Use `database.Session` instead.
-"""
 
-LocalSession = sessionmaker(bind=Engine)
-"""Database session used for all database operations.
+LocalSession = LazySessionmaker(expire_on_commit=False)
+"""Async database session used for all database operations.
 
 Should not be used directly in most cases. Use `database.Session` instead.
 """
 
-Session = Annotated[sessionmaker[SQLSession], Depends(get_session)]
+Session = Annotated[async_sessionmaker[AsyncSession], Depends(get_session)]
 """Database session predefined for FastAPI Dependencie injection.
 
 Can automatically be injected in FastAPI routes and used to interact with the database.
 ```python
 @app.get("/route")
-def route(session: Session):
-    with session.begin() as s:
-         # do something
+async def route(session: Session):
+    async with session.begin() as s:
+         # do something, e.g. await s.execute(...)
     ...
 ```
 
-Note: use Session.begin() if you want changes to be commited automatically
+Note: use Session.begin() if you want changes to be commited automatically.
+Relationships are not loaded lazily in async sessions. Load them eagerly, e.g. via `selectinload`.
 
 ---
 """
@@ -1 +1,4 @@
 from .auth import IdentifiedUser, get_user_id
+from .etag import check_etag, make_etag, representation_etag
+from .pagination import IdPage, NamePage, NEXT_CURSOR_HEADER
+from .serialization import Encoder, ResponseEncoder, encode
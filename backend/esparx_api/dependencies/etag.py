@@ -0,0 +1,53 @@
+from fastapi import HTTPException, Request, Response, status
+
+from .serialization import JSON_MEDIA_TYPE, get_media_type
+
+
+def make_etag(*versions) -> str:
+    """Build a strong ETag from the versions a response depends on"""
+
+    return '"' + "-".join(str(version) for version in versions) + '"'
+
+
+def representation_etag(request: Request, etag: str) -> str:
+    """
+    Get the ETag of the representation negotiated with the client (see `serialization.negotiate`).
+    JSON keeps the ETag, other media types get their own, e.g., `"dag-3-msgpack"`.
+    """
+
+    media_type = get_media_type(request)
+    if media_type == JSON_MEDIA_TYPE:
+        return etag
+    return etag[:-1] + "-" + media_type.rsplit("/", 1)[-1] + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check whether the `If-None-Match` header of a request matches an ETag"""
+
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison, i.e., a W/ prefix is ignored
+    return etag in (candidate.strip().removeprefix("W/") for candidate in if_none_match.split(","))
+
+
+def check_etag(request: Request, response: Response, etag: str):
+    """
+    Answer with `304 Not Modified` if the client already has the representation with this ETag.
+    Otherwise, add the ETag to the response. Call it before running the queries of the route.
+    The ETag is adapted to the media type of the response, see `representation_etag`.
+
+    ```python
+    @app.get("/route")
+    async def my_route(request: Request, response: Response):
+        check_etag(request, response, make_etag("dag", version))
+        ...  # only runs if the client's copy is outdated
+    ```
+    """
+
+    etag = representation_etag(request, etag)
+    if etag_matches(request, etag):
+        raise HTTPException(status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Vary": "Accept"})
+    response.headers["ETag"] = etag
@@ -0,0 +1,58 @@
+from typing import Annotated, Any, List, Optional
+
+from fastapi import Depends, Query, Response
+from pydantic import BaseModel
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+"""Response header carrying the cursor of the next page. It is missing on the last page."""
+
+MAX_PAGE_SIZE = 1000
+
+
+class Page(BaseModel):
+    after: Optional[Any] = None
+    """Key (id or name) of the last item of the previous page"""
+
+    limit: Optional[int] = None
+    """Maximum number of items on the page. None returns all remaining items."""
+
+    def set_next_cursor(self, response: Response, keys: List[Any]):
+        """Add the cursor of the next page to the response, if the page is full"""
+
+        if self.limit is not None and len(keys) == self.limit:
+            response.headers[NEXT_CURSOR_HEADER] = str(keys[-1])
+
+
+def get_id_page(
+    after: Optional[int] = Query(None, description="Return only items with an id greater than this cursor"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of items"),
+):
+    """Keyset pagination over the ids of dagdb rows"""
+
+    return Page(after=after, limit=limit)
+
+
+def get_name_page(
+    after: Optional[str] = Query(None, description="Return only items with a name greater than this cursor"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of items"),
+):
+    """Keyset pagination over the names of artifactdb documents"""
+
+    return Page(after=after, limit=limit)
+
+
+IdPage = Annotated[Page, Depends(get_id_page)]
+"""Keyset pagination by id
+
+The next cursor is returned in the `X-Next-Cursor` header.
+
+```python
+@app.get("/route")
+async def my_route(page: IdPage, response: Response):
+    items = ...  # items with id > page.after, ordered by id, at most page.limit
+    page.set_next_cursor(response, [item.id for item in items])
+```
+"""
+
+NamePage = Annotated[Page, Depends(get_name_page)]
+"""Keyset pagination by name, see `IdPage`"""
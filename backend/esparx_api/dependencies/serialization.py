@@ -0,0 +1,128 @@
+"""
+This module encodes the responses of the read routes, which are built from database rows as plain dicts and lists.
+Returning them directly would make FastAPI validate every item against the response model of the route and
+encode it with the json module, which dominates the time of large responses. The routes keep declaring their
+`response_model` for the API documentation, but encode the content themselves with the `Encoder` dependency.
+
+Responses are JSON by default and MessagePack if the client asks for it via `Accept: application/msgpack`.
+Datetimes are sent as ISO 8601 strings in JSON and as timestamps (extension type -1) in MessagePack.
+"""
+
+import time
+from datetime import datetime
+from typing import Annotated, Any, Callable, Dict, Optional
+
+import msgpack
+import orjson
+from fastapi import Depends, Request, Response
+
+from esparx_api.metrics import record_serialization
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+MEDIA_TYPE_ALIASES = {"application/x-msgpack": MSGPACK_MEDIA_TYPE}
+"""Media types that some clients send for MessagePack"""
+
+
+def encode_default(value: Any) -> Any:
+    """Convert values the encoders can not handle natively, e.g., datetimes for MessagePack"""
+
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def encode_json(content: Any) -> bytes:
+    return orjson.dumps(content, default=encode_default)
+
+
+def encode_msgpack(content: Any) -> bytes:
+    # timezone-aware datetimes are packed natively, which is much faster than converting them in `encode_default`
+    return msgpack.packb(content, default=encode_default, datetime=True)
+
+
+ENCODERS: Dict[str, Callable[[Any], bytes]] = {
+    JSON_MEDIA_TYPE: encode_json,
+    MSGPACK_MEDIA_TYPE: encode_msgpack,
+}
+
+
+def encode(content: Any, media_type: str = JSON_MEDIA_TYPE) -> bytes:
+    """Encode content consisting of dicts, lists, strings, numbers, datetimes and None in the given media type"""
+
+    return ENCODERS[media_type](content)
+
+
+def negotiate(accept: Optional[str]) -> str:
+    """
+    Pick the media type of the response from the `Accept` header of a request.
+    MessagePack is only sent if the client ranks it at least as high as JSON, everything else gets JSON.
+    """
+
+    if not accept:
+        return JSON_MEDIA_TYPE
+
+    quality = {}
+    for entry in accept.split(","):
+        media_type, *params = (part.strip() for part in entry.split(";"))
+        media_type = MEDIA_TYPE_ALIASES.get(media_type.lower(), media_type.lower())
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        quality[media_type] = max(q, quality.get(media_type, 0.0))
+
+    msgpack_quality = quality.get(MSGPACK_MEDIA_TYPE, 0.0)
+    json_quality = max(quality.get(JSON_MEDIA_TYPE, 0.0), quality.get("*/*", 0.0), quality.get("application/*", 0.0))
+    return MSGPACK_MEDIA_TYPE if msgpack_quality > 0 and msgpack_quality >= json_quality else JSON_MEDIA_TYPE
+
+
+def get_media_type(request: Request) -> str:
+    return negotiate(request.headers.get("accept"))
+
+
+class ResponseEncoder:
+    """Encodes the content of a route in the media type negotiated with the client"""
+
+    def __init__(self, media_type: str, response: Response):
+        self.media_type = media_type
+        self.response = response
+
+    def encode(self, content: Any) -> bytes:
+        return encode(content, self.media_type)
+
+    def respond(self, content: Any) -> Response:
+        """
+        Send content without validating it. Content encoded beforehand in `media_type` (bytes) is sent as is.
+        Headers set on the `response` of the route (e.g., ETag and X-Next-Cursor) are kept.
+        """
+
+        start = time.perf_counter()
+        body = content if isinstance(content, bytes) else self.encode(content)
+        record_serialization(time.perf_counter() - start)
+        encoded = Response(body, media_type=self.media_type)
+        encoded.headers.raw.extend(self.response.headers.raw)
+        encoded.headers["Vary"] = "Accept"
+        return encoded
+
+
+def get_encoder(request: Request, response: Response) -> ResponseEncoder:
+    return ResponseEncoder(get_media_type(request), response)
+
+
+Encoder = Annotated[ResponseEncoder, Depends(get_encoder)]
+"""Encoder of the response predefined for FastAPI Dependency injection.
+
+```python
+@app.get("/route", response_model=List[ArtifactResponse])
+async def route(encoder: Encoder):
+    return encoder.respond([{"id": 1, "name": "a", "artifact_type": "code"}])
+```
+
+---
+"""
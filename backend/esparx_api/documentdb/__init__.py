@@ -1 +1,10 @@
-from .client import DocumentDBClient
+from .client import close_client, create_indexes, get_client, get_collection
+from .search import ArtifactSearchIndex
+from .versions import (
+    CONTENT_HASH_FIELD,
+    RESPONSE_PROJECTION,
+    REVISION_FIELD,
+    bump_artifacts_version,
+    get_artifacts_version,
+    get_content_hash,
+)
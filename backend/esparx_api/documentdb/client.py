@@ -1,11 +1,75 @@
 """
 This module defines the client responsible for managing the connection to the document database
 and executing database operations (create, read, update, delete).
-When an instance of the client is created, it establishes a connection to the document database.
+The client is created on first use and connects on its first operation, so importing the API needs no database.
+The client is asynchronous, so all database operations must be awaited.
+With the embedded storage, the client is an `EmbeddedDocumentDB` offering the same operations on a SQLite file.
 """
 
+from functools import cache
+from typing import Union
+
 import pymongo
+from pymongo import IndexModel
+from pymongo.asynchronous.collection import AsyncCollection
 
 from esparx_api import settings
+from esparx_api.metrics import DOCUMENTDB_POOL_MAX_SIZE, CommandTimer, PoolMonitor
+
+from .embedded import EmbeddedCollection, EmbeddedDocumentDB
+
+
+@cache
+def get_client() -> Union[pymongo.AsyncMongoClient, EmbeddedDocumentDB]:
+    """Get the client of the document database, which is created on first use"""
+
+    if settings.STORAGE == "embedded":
+        return EmbeddedDocumentDB(settings.EMBEDDED_STORAGE_PATH / "artifactdb.sqlite")
+    if not settings.ARTIFACTDB_ENDPOINT:
+        raise ValueError("ARTIFACTDB_ENDPOINT is required unless STORAGE is embedded.")
+    client = pymongo.AsyncMongoClient(
+        f"mongodb://{settings.ARTIFACTDB_ENDPOINT}",
+        tz_aware=True,
+        maxPoolSize=settings.DOCUMENTDB_MAX_POOL_SIZE,
+        # the timeouts raise errors which are answered with 503 Service Unavailable, see `middleware.timeouts`
+        waitQueueTimeoutMS=settings.DOCUMENTDB_WAIT_QUEUE_TIMEOUT * 1000,
+        serverSelectionTimeoutMS=settings.DOCUMENTDB_SERVER_SELECTION_TIMEOUT * 1000,
+        timeoutMS=(
+            None if settings.DOCUMENTDB_OPERATION_TIMEOUT is None else settings.DOCUMENTDB_OPERATION_TIMEOUT * 1000
+        ),
+        event_listeners=[CommandTimer(), PoolMonitor()],
+    )
+    DOCUMENTDB_POOL_MAX_SIZE.set(client.options.pool_options.max_pool_size)
+    return client
+
+
+@cache
+def get_collection(name: str) -> Union[AsyncCollection, EmbeddedCollection]:
+    """Get a collection of the artifactdb, e.g., `get_collection("artifacts")`"""
+
+    return get_client().artifactdb[name]
+
+
+async def close_client():
+    """Close the client, if it was created. Called once on API shutdown."""
+
+    # a closed client cannot be used again, so the next use creates a new one
+    if get_client.cache_info().currsize:
+        await get_client().close()
+        get_client.cache_clear()
+        get_collection.cache_clear()
+
+
+async def create_indexes():
+    """Create the indexes of the document database in one command. Called once on API startup."""
 
-DocumentDBClient = pymongo.MongoClient(f"mongodb://{settings.ARTIFACTDB_ENDPOINT}", tz_aware=True)
+    await get_collection("artifacts").create_indexes(
+        [
+            IndexModel("name", unique=True),
+            # indexes for filtered listing, which is ordered and paginated by name (equality, sort, range)
+            IndexModel([("artifact_type", pymongo.ASCENDING), ("name", pymongo.ASCENDING)]),
+            IndexModel([("name", pymongo.ASCENDING), ("created_at", pymongo.ASCENDING)]),
+            # covers the revision lookup of conditional requests, which therefore does not read the document
+            IndexModel([("name", pymongo.ASCENDING), ("revision", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)]),
+        ]
+    )
@@ -0,0 +1,477 @@
+"""
+This module implements the embedded document database, which keeps the documents of every collection as JSON
+in a table of a local SQLite file. It is used instead of MongoDB if STORAGE is "embedded".
+
+The client mirrors the part of the asynchronous pymongo API used by the API, i.e., `client.<database>.<collection>`
+with `find`, `find_one`, `insert_one`, `insert_many`, `update_one`, `bulk_write`, `delete_one`, `delete_many`,
+`create_index` and `create_indexes`. Queries support equality and the `$eq`, `$ne`, `$gt`, `$gte`, `$lt`, `$lte`
+and `$in` operators on (dotted) fields, and updates support `$set`, `$setOnInsert`, `$unset` and `$inc`. Anything
+else, e.g., text indexes, raises an `OperationFailure`, just as a MongoDB deployment without the feature would.
+
+Fields are read with `json_extract`, and `create_index` creates SQLite indexes on these expressions, so the
+queries of the API are answered from indexes as in MongoDB. Datetimes are stored as milliseconds since the epoch,
+which keeps them comparable, and are returned timezone-aware in UTC like the pymongo client of the API does.
+"""
+
+import asyncio
+import json
+import re
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+import aiosqlite
+from bson import ObjectId
+from pymongo import DeleteOne, IndexModel, InsertOne, UpdateOne
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+from esparx_api.metrics import time_command
+
+FIELD_PATTERN = re.compile(r"^\w+(\.\w+)*$")
+
+COMPARISONS = {"$eq": "=", "$ne": "IS NOT", "$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}
+
+
+def encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        # like BSON, naive datetimes are read as UTC, not as the local time of the server
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return {"$date": round(value.timestamp() * 1000)}
+    if isinstance(value, ObjectId):
+        return {"$oid": str(value)}
+    raise TypeError(f"Object of type {type(value).__name__} cannot be stored in the embedded document database")
+
+
+def decode_object(entry: dict) -> Any:
+    if len(entry) == 1:
+        if "$date" in entry:
+            return datetime.fromtimestamp(entry["$date"] / 1000, timezone.utc)
+        if "$oid" in entry:
+            return ObjectId(entry["$oid"])
+    return entry
+
+
+def dumps(document: Mapping[str, Any]) -> str:
+    return json.dumps(document, default=encode_value, separators=(",", ":"))
+
+
+def loads(text: str) -> dict:
+    return json.loads(text, object_hook=decode_object)
+
+
+def field_expression(field: str, value: Any = None) -> str:
+    """Get the SQL expression reading a field, e.g., `json_extract(document, '$."name"')`"""
+
+    if not FIELD_PATTERN.match(field):
+        raise OperationFailure(f"Field '{field}' is not supported by the embedded document database.")
+    path = "$" + "".join(f'."{key}"' for key in field.split("."))
+    # datetimes and object ids are stored as objects, which are compared by their only value
+    if isinstance(value, datetime):
+        path += '."$date"'
+    elif isinstance(value, ObjectId):
+        path += '."$oid"'
+    return f"json_extract(document, '{path}')"
+
+
+def sql_value(value: Any) -> Any:
+    if isinstance(value, (datetime, ObjectId)):
+        return next(iter(encode_value(value).values()))
+    if isinstance(value, (dict, list)):
+        raise OperationFailure(
+            "Comparisons with documents or arrays are not supported by the embedded document database."
+        )
+    return value
+
+
+def to_where(query: Optional[Mapping[str, Any]]) -> Tuple[str, List[Any]]:
+    """Translate a query into an SQL condition and its parameters"""
+
+    clauses, parameters = [], []
+    for field, condition in (query or {}).items():
+        if field.startswith("$"):
+            raise OperationFailure(f"Operator {field} is not supported by the embedded document database.")
+        if not (isinstance(condition, Mapping) and condition and all(key.startswith("$") for key in condition)):
+            condition = {"$eq": condition}
+
+        for operator, value in condition.items():
+            if operator == "$in":
+                values = list(value)
+                if not values:
+                    clauses.append("0")
+                    continue
+                # values of different types are read from different paths, e.g., datetimes from `$date`
+                alternatives = []
+                for expression in {field_expression(field, v) for v in values}:
+                    matching = [sql_value(v) for v in values if field_expression(field, v) == expression]
+                    alternatives.append(f"{expression} IN ({', '.join('?' * len(matching))})")
+                    parameters.extend(matching)
+                clauses.append(f"({' OR '.join(alternatives)})")
+            elif operator in COMPARISONS:
+                sql_operator = COMPARISONS[operator]
+                if value is None and operator == "$eq":
+                    sql_operator = "IS"
+                clauses.append(f"{field_expression(field, value)} {sql_operator} ?")
+                parameters.append(sql_value(value))
+            else:
+                raise OperationFailure(f"Operator {operator} is not supported by the embedded document database.")
+
+    return " AND ".join(clauses) or "1", parameters
+
+
+def project(document: dict, projection: Optional[Mapping[str, Any]]) -> dict:
+    """Apply an inclusion (`{"name": 1}`) or exclusion (`{"_id": 0}`) projection to a document"""
+
+    if not projection:
+        return document
+    if any(isinstance(value, Mapping) for value in projection.values()):
+        raise OperationFailure("Projection operators are not supported by the embedded document database.")
+    included = {field for field, value in projection.items() if value and field != "_id"}
+    if included:
+        keep_id = projection.get("_id", 1)
+        return {field: value for field, value in document.items() if field in included or (field == "_id" and keep_id)}
+    return {field: value for field, value in document.items() if projection.get(field, 1)}
+
+
+def set_field(document: dict, field: str, value: Any):
+    *parents, key = field.split(".")
+    for parent in parents:
+        document = document.setdefault(parent, {})
+    document[key] = value
+
+
+def get_field(document: dict, field: str, default: Any = None) -> Any:
+    for key in field.split("."):
+        if not isinstance(document, dict) or key not in document:
+            return default
+        document = document[key]
+    return document
+
+
+def apply_update(document: dict, update: Mapping[str, Any], inserting: bool = False) -> dict:
+    """Get the document with the update applied"""
+
+    document = dict(document)
+    for operator, fields in update.items():
+        if operator == "$setOnInsert" and not inserting:
+            continue
+        for field, value in fields.items():
+            if operator in ("$set", "$setOnInsert"):
+                set_field(document, field, value)
+            elif operator == "$unset":
+                parent, _, key = field.rpartition(".")
+                container = get_field(document, parent) if parent else document
+                if isinstance(container, dict):
+                    container.pop(key, None)
+            elif operator == "$inc":
+                set_field(document, field, get_field(document, field, 0) + value)
+            else:
+                raise OperationFailure(
+                    f"Update operator {operator} is not supported by the embedded document database."
+                )
+    return document
+
+
+def upserted_document(query: Mapping[str, Any], update: Mapping[str, Any]) -> dict:
+    """Get the document inserted by an upsert, which contains the equality conditions of the query"""
+
+    document = {"_id": query["_id"] if "_id" in query else ObjectId()}
+    for field, condition in query.items():
+        if not (isinstance(condition, Mapping) and any(key.startswith("$") for key in condition)):
+            set_field(document, field, condition)
+    return apply_update(document, update, inserting=True)
+
+
+class EmbeddedCursor:
+    """Cursor over the documents matching a query. The query runs when the cursor is iterated."""
+
+    def __init__(self, collection: "EmbeddedCollection", query: Mapping[str, Any], projection: Optional[Mapping]):
+        self.collection = collection
+        self.query = query
+        self.projection = projection
+        self._sort: List[Tuple[str, int]] = []
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, key, direction: Optional[int] = None) -> "EmbeddedCursor":
+        self._sort = [(key, direction or 1)] if isinstance(key, str) else list(key)
+        return self
+
+    def skip(self, skip: int) -> "EmbeddedCursor":
+        self._skip = skip
+        return self
+
+    def limit(self, limit: int) -> "EmbeddedCursor":
+        self._limit = limit
+        return self
+
+    def batch_size(self, batch_size: int) -> "EmbeddedCursor":
+        # all documents are read at once
+        return self
+
+    async def to_list(self, length: Optional[int] = None) -> List[dict]:
+        where, parameters = to_where(self.query)
+        sql = f'SELECT document FROM "{self.collection.name}" WHERE {where}'
+        order = []
+        for field, direction in self._sort:
+            if isinstance(direction, Mapping):
+                raise OperationFailure("Sorting by text score is not supported by the embedded document database.")
+            order.append(f"{field_expression(field)} {'DESC' if direction == -1 else 'ASC'}")
+        sql += f" ORDER BY {', '.join(order + ['id'])}"
+        limit = min(filter(None, [self._limit, length]), default=-1)
+        sql += f" LIMIT {int(limit)} OFFSET {int(self._skip)}"
+
+        command = {"find": self.collection.name, "filter": self.query}
+        with time_command("find", command):
+            rows = await self.collection.client.fetch(self.collection.name, sql, parameters)
+        return [project(loads(document), self.projection) for (document,) in rows]
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for document in await self.to_list():
+            yield document
+
+
+class EmbeddedCollection:
+    def __init__(self, client: "EmbeddedDocumentDB", name: str):
+        self.client = client
+        self.name = name
+
+    def find(self, query: Optional[Mapping[str, Any]] = None, projection: Optional[Mapping] = None) -> EmbeddedCursor:
+        return EmbeddedCursor(self, query or {}, projection)
+
+    async def find_one(self, query: Optional[Mapping[str, Any]] = None, projection: Optional[Mapping] = None):
+        documents = await self.find(query, projection).limit(1).to_list()
+        return documents[0] if documents else None
+
+    async def insert_one(self, document: dict):
+        with time_command("insert", {"insert": self.name}):
+            async with self.client.transaction(self.name) as connection:
+                await self._insert(connection, document)
+
+    async def insert_many(self, documents: Iterable[dict], ordered: bool = True):
+        with time_command("insert", {"insert": self.name}):
+            async with self.client.transaction(self.name) as connection:
+                for document in documents:
+                    await self._insert(connection, document)
+
+    async def update_one(self, query: Mapping[str, Any], update: Mapping[str, Any], upsert: bool = False):
+        command = {"update": self.name, "updates": [{"q": query}]}
+        with time_command("update", command):
+            async with self.client.transaction(self.name) as connection:
+                await self._update(connection, query, update, upsert)
+
+    async def bulk_write(self, operations: List[InsertOne | UpdateOne | DeleteOne], ordered: bool = True):
+        # the operations are applied in one transaction, in order
+        with time_command("bulkWrite", {"bulkWrite": self.name}):
+            async with self.client.transaction(self.name) as connection:
+                for operation in operations:
+                    # pymongo keeps the arguments of the operations in private attributes
+                    if isinstance(operation, InsertOne):
+                        await self._insert(connection, operation._doc)
+                    elif isinstance(operation, UpdateOne):
+                        await self._update(connection, operation._filter, operation._doc, operation._upsert)
+                    elif isinstance(operation, DeleteOne):
+                        await self._delete(connection, operation._filter, limit=1)
+                    else:
+                        raise OperationFailure(
+                            f"{type(operation).__name__} is not supported by the embedded document database."
+                        )
+
+    async def delete_one(self, query: Mapping[str, Any]):
+        with time_command("delete", {"delete": self.name, "deletes": [{"q": query}]}):
+            async with self.client.transaction(self.name) as connection:
+                await self._delete(connection, query, limit=1)
+
+    async def delete_many(self, query: Mapping[str, Any]):
+        with time_command("delete", {"delete": self.name, "deletes": [{"q": query}]}):
+            async with self.client.transaction(self.name) as connection:
+                await self._delete(connection, query)
+
+    async def create_index(self, keys, unique: bool = False, name: Optional[str] = None, **kwargs) -> str:
+        keys = [(keys, 1)] if isinstance(keys, str) else list(keys)
+        if any(direction not in (1, -1) for _, direction in keys):
+            raise OperationFailure(
+                "Only ascending and descending indexes are supported by the embedded document database."
+            )
+        name = name or "_".join(f"{field}_{direction}" for field, direction in keys)
+        expressions = ", ".join(f"{field_expression(field)} {'DESC' if d == -1 else 'ASC'}" for field, d in keys)
+        async with self.client.transaction(self.name) as connection:
+            await connection.execute(
+                f'CREATE {"UNIQUE " if unique else ""}INDEX IF NOT EXISTS "{self.name}.{name}" '
+                f'ON "{self.name}" ({expressions})'
+            )
+        return name
+
+    async def create_indexes(self, indexes: List[IndexModel]) -> List[str]:
+        return [
+            await self.create_index(
+                list(index.document["key"].items()),
+                unique=index.document.get("unique", False),
+                name=index.document["name"],
+            )
+            for index in indexes
+        ]
+
+    async def _insert(self, connection: aiosqlite.Connection, document: dict):
+        document.setdefault("_id", ObjectId())
+        # the _id comes first, as in MongoDB
+        document = {"_id": document["_id"], **document}
+        try:
+            await connection.execute(f'INSERT INTO "{self.name}" (document) VALUES (?)', (dumps(document),))
+        except sqlite3.IntegrityError as err:
+            raise DuplicateKeyError(f"Duplicate key in collection {self.name}: {err}") from err
+
+    async def _update(self, connection: aiosqlite.Connection, query: Mapping, update: Mapping, upsert: bool):
+        where, parameters = to_where(query)
+        cursor = await connection.execute(
+            f'SELECT id, document FROM "{self.name}" WHERE {where} ORDER BY id LIMIT 1', parameters
+        )
+        row = await cursor.fetchone()
+        if row is None:
+            if upsert:
+                await self._insert(connection, upserted_document(query, update))
+            return
+        document = apply_update(loads(row[1]), update)
+        try:
+            await connection.execute(f'UPDATE "{self.name}" SET document = ? WHERE id = ?', (dumps(document), row[0]))
+        except sqlite3.IntegrityError as err:
+            raise DuplicateKeyError(f"Duplicate key in collection {self.name}: {err}") from err
+
+    async def _delete(self, connection: aiosqlite.Connection, query: Mapping, limit: Optional[int] = None):
+        where, parameters = to_where(query)
+        selected = f'SELECT id FROM "{self.name}" WHERE {where} ORDER BY id' + (f" LIMIT {limit}" if limit else "")
+        await connection.execute(f'DELETE FROM "{self.name}" WHERE id IN ({selected})', parameters)
+
+
+class EmbeddedDatabase:
+    def __init__(self, client: "EmbeddedDocumentDB"):
+        self.client = client
+        self.collections: Dict[str, EmbeddedCollection] = {}
+
+    def __getattr__(self, name: str) -> EmbeddedCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if name not in self.collections:
+            self.collections[name] = EmbeddedCollection(self.client, name)
+        return self.collections[name]
+
+    __getitem__ = __getattr__
+
+
+class EmbeddedDocumentDB:
+    """
+    Client of the embedded document database. All databases share one SQLite file with a table per collection.
+    The connections are opened on first use. Writes are serialized on one connection, while reads run on a second
+    one, which only sees committed writes and, in WAL mode, does not wait for the writer.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.databases: Dict[str, EmbeddedDatabase] = {}
+        self.tables = set()
+        self._connection: Optional[aiosqlite.Connection] = None
+        self._read_connection: Optional[aiosqlite.Connection] = None
+        self._connect_lock = asyncio.Lock()
+        self._write_lock = asyncio.Lock()
+
+    def __getattr__(self, name: str) -> EmbeddedDatabase:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if name not in self.databases:
+            self.databases[name] = EmbeddedDatabase(self)
+        return self.databases[name]
+
+    __getitem__ = __getattr__
+
+    async def connect(self) -> aiosqlite.Connection:
+        connection = await aiosqlite.connect(self.path, isolation_level=None)
+        await connection.execute("PRAGMA busy_timeout = 5000")
+        return connection
+
+    async def connection(self) -> aiosqlite.Connection:
+        """Get the connection of the writes, use it within a `transaction` only"""
+
+        async with self._connect_lock:
+            if self._connection is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                # transactions are started explicitly, see `transaction`
+                connection = await self.connect()
+                await connection.execute("PRAGMA journal_mode = WAL")
+                await connection.execute("PRAGMA synchronous = NORMAL")
+                self._connection = connection
+                self.tables = set()
+            return self._connection
+
+    async def read_connection(self) -> aiosqlite.Connection:
+        """Get the connection of the reads, on which every statement reads the last committed state"""
+
+        # the connection of the writes switches the file to WAL mode first
+        await self.connection()
+        async with self._connect_lock:
+            if self._read_connection is None:
+                connection = await self.connect()
+                await connection.execute("PRAGMA query_only = ON")
+                self._read_connection = connection
+            return self._read_connection
+
+    async def create_table(self, name: str):
+        """Create the table of a collection if it does not exist yet, holding the write lock"""
+
+        if name in self.tables:
+            return
+        connection = await self.connection()
+        await connection.execute(
+            f'CREATE TABLE IF NOT EXISTS "{name}" (id INTEGER PRIMARY KEY AUTOINCREMENT, document TEXT NOT NULL)'
+        )
+        # the _id of a document is unique, as in MongoDB
+        await connection.execute(
+            f'CREATE UNIQUE INDEX IF NOT EXISTS "{name}._id_" ON "{name}" ({field_expression("_id")})'
+        )
+        self.tables.add(name)
+
+    async def fetch(self, table: str, sql: str, parameters: List[Any]) -> List[tuple]:
+        """Run a query on the table of a collection, which is created if it does not exist yet"""
+
+        if table not in self.tables:
+            async with self._write_lock:
+                await self.create_table(table)
+        async with (await self.read_connection()).execute(sql, parameters) as cursor:
+            return await cursor.fetchall()
+
+    def transaction(self, table: str) -> "Transaction":
+        return Transaction(self, table)
+
+    async def close(self):
+        for connection in (self._read_connection, self._connection):
+            if connection is not None:
+                await connection.close()
+        self._connection = self._read_connection = None
+
+
+class Transaction:
+    """Write transaction, which takes the write lock of the database file right away (`BEGIN IMMEDIATE`)"""
+
+    def __init__(self, client: EmbeddedDocumentDB, table: str):
+        self.client = client
+        self.table = table
+
+    async def __aenter__(self) -> aiosqlite.Connection:
+        await self.client._write_lock.acquire()
+        try:
+            await self.client.create_table(self.table)
+            self.connection = await self.client.connection()
+            await self.connection.execute("BEGIN IMMEDIATE")
+        except BaseException:
+            self.client._write_lock.release()
+            raise
+        return self.connection
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            await self.connection.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.client._write_lock.release()
@@ -0,0 +1,207 @@
+"""
+This module implements the full-text search over the names and descriptions of artifacts.
+By default, the search runs on a text index of the document database. Deployments without text index
+support (or with ARTIFACT_SEARCH set to "memory") use an inverted index kept in-process instead,
+which is built from the document database once. Whenever the artifact collection version changes, only the
+documents added, updated or removed since are applied to it, which are found by their `_id` and revision.
+"""
+
+import asyncio
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+import pymongo
+from pymongo.errors import OperationFailure
+
+from esparx_api import settings
+from esparx_api.metrics import exempt_from_budget
+
+from .client import get_collection
+from .versions import RESPONSE_PROJECTION, REVISION_FIELD, get_artifacts_version
+
+TEXT_INDEX_NAME = "artifacts_text"
+
+FIELD_WEIGHTS = {"name": 10, "description": 1}
+"""Relevance of a match per field, shared by the text index and the in-process index"""
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+INDEX_PROJECTION = {"_id": 1, REVISION_FIELD: 1, "name": 1, "artifact_type": 1, "description": 1}
+"""Projection of artifact documents to the fields needed by the in-process index"""
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower()) if text else []
+
+
+class InvertedIndex:
+    """In-process inverted index over the names and descriptions of all artifacts at a given collection version"""
+
+    def __init__(self, version: int, entries: List[dict]):
+        self.version = version
+        self.revisions: Dict[str, Tuple[Any, int]] = {}
+        """`_id` and revision of the indexed document of every artifact"""
+        self.artifact_types: Dict[str, Optional[str]] = {}
+        self.terms: Dict[str, Counter] = {}
+        """weighted term frequency of every artifact, by which it is removed from the postings"""
+        self.postings: Dict[str, Dict[str, float]] = defaultdict(dict)
+        """weighted term frequency per artifact for every term"""
+
+        self.update(version, [], entries)
+
+    def update(self, version: int, removed: List[str], entries: List[dict]):
+        """Remove the artifacts with the given names, and add (or replace) the artifacts of the given documents"""
+
+        for name in removed + [entry["name"] for entry in entries]:
+            self.revisions.pop(name, None)
+            self.artifact_types.pop(name, None)
+            for token in self.terms.pop(name, {}):
+                postings = self.postings[token]
+                del postings[name]
+                if not postings:
+                    del self.postings[token]
+
+        for entry in entries:
+            name = entry["name"]
+            self.revisions[name] = get_revision(entry)
+            self.artifact_types[name] = entry.get("artifact_type")
+            weights = Counter()
+            for field, weight in FIELD_WEIGHTS.items():
+                tokens = tokenize(entry.get(field))
+                for token in tokens:
+                    weights[token] += weight / len(tokens)
+            self.terms[name] = weights
+            for token, weight in weights.items():
+                self.postings[token][name] = weight
+
+        self.version = version
+
+    def search(self, q: str, artifact_type: Optional[str] = None) -> List[Tuple[str, float]]:
+        """Get the names and scores of all artifacts matching any term of the query, best match first"""
+
+        scores = defaultdict(float)
+        for token in set(tokenize(q)):
+            postings = self.postings.get(token, {})
+            if not postings:
+                continue
+            # rare terms are more relevant than terms contained in many artifacts
+            idf = math.log(1 + len(self.revisions) / len(postings))
+            for name, weight in postings.items():
+                scores[name] += weight * idf
+
+        matches = [
+            (name, score)
+            for name, score in scores.items()
+            if artifact_type is None or self.artifact_types[name] == artifact_type
+        ]
+        matches.sort(key=lambda match: (-match[1], match[0]))
+        return matches
+
+
+def get_revision(entry: dict) -> Tuple[Any, int]:
+    """
+    Get the `_id` and revision of an artifact document. A document deleted and registered again gets a new `_id`,
+    while its revision starts over.
+    """
+
+    return entry["_id"], entry.get(REVISION_FIELD, 0)
+
+
+class ArtifactSearch:
+    """Full-text search over artifacts, using the text index of the document database if possible"""
+
+    def __init__(self, mode: str = "auto"):
+        self.use_text_index = mode != "memory"
+        self.fallback_on_failure = mode == "auto"
+        self.index: Optional[InvertedIndex] = None
+        self._lock = asyncio.Lock()
+
+    async def create_text_index(self):
+        """Create the text index of the document database. Called once on API startup."""
+
+        if not self.use_text_index:
+            return
+        try:
+            await get_collection("artifacts").create_index(
+                [(field, pymongo.TEXT) for field in FIELD_WEIGHTS], name=TEXT_INDEX_NAME, weights=FIELD_WEIGHTS
+            )
+        except OperationFailure as err:
+            if not self.fallback_on_failure:
+                raise
+            print(f"Text index could not be created ({err}). Artifacts are searched in-process instead.")
+            self.use_text_index = False
+
+    async def search(self, q: str, artifact_type: Optional[str], offset: int, limit: int) -> List[dict]:
+        """Get a page of the artifacts matching the query, ordered by relevance. Each artifact gets a `score`."""
+
+        if self.use_text_index:
+            try:
+                return await self.search_text_index(q, artifact_type, offset, limit)
+            except OperationFailure as err:
+                if not self.fallback_on_failure:
+                    raise
+                print(f"Text search failed ({err}). Falling back to the in-process search index.")
+                self.use_text_index = False
+
+        return await self.search_inverted_index(q, artifact_type, offset, limit)
+
+    async def search_text_index(self, q: str, artifact_type: Optional[str], offset: int, limit: int) -> List[dict]:
+        query = {"$text": {"$search": q}}
+        if artifact_type is not None:
+            query["artifact_type"] = artifact_type
+        score = {"$meta": "textScore"}
+        cursor = (
+            get_collection("artifacts")
+            .find(query, {**RESPONSE_PROJECTION, "score": score})
+            .sort([("score", score), ("name", 1)])
+            .skip(offset)
+            .limit(limit)
+        )
+        return await cursor.to_list()
+
+    async def search_inverted_index(self, q: str, artifact_type: Optional[str], offset: int, limit: int) -> List[dict]:
+        version = await get_artifacts_version()
+        if self.index is None or self.index.version < version:
+            with exempt_from_budget():
+                await self.update_inverted_index(version)
+
+        page = self.index.search(q, artifact_type)[offset : offset + limit]
+        scores = dict(page)
+        cursor = get_collection("artifacts").find({"name": {"$in": list(scores)}}, RESPONSE_PROJECTION)
+        entries = await cursor.to_list()
+        entries = [{**entry, "score": scores[entry["name"]]} for entry in entries]
+        entries.sort(key=lambda entry: (-entry["score"], entry["name"]))
+        return entries
+
+    async def update_inverted_index(self, version: int):
+        """
+        Bring the in-process index up to `version` unless another request already did. Only the documents whose `_id`
+        or revision differ from the indexed ones are read completely.
+        """
+
+        async with self._lock:
+            if self.index is not None and self.index.version >= version:
+                return
+
+            collection = get_collection("artifacts")
+            if self.index is None:
+                self.index = InvertedIndex(version, await collection.find({}, INDEX_PROJECTION).to_list())
+                print(f"Search index built for version {version} of the artifactdb.")
+                return
+
+            cursor = collection.find({}, {"_id": 1, "name": 1, REVISION_FIELD: 1})
+            revisions = {entry["name"]: get_revision(entry) async for entry in cursor}
+            removed = [name for name, revision in self.index.revisions.items() if revisions.get(name) != revision]
+            changed = [name for name, revision in revisions.items() if self.index.revisions.get(name) != revision]
+            entries = await collection.find({"name": {"$in": changed}}, INDEX_PROJECTION).to_list() if changed else []
+            self.index.update(version, removed, entries)
+            print(
+                f"Search index updated to version {version} of the artifactdb "
+                f"({len(removed)} artifacts removed or changed, {len(entries)} added or changed)."
+            )
+
+
+ArtifactSearchIndex = ArtifactSearch(settings.ARTIFACT_SEARCH)
+"""Full-text search of this worker process, configured by the ARTIFACT_SEARCH setting"""
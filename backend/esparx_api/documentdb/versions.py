@@ -0,0 +1,49 @@
+"""
+This module maintains the version of the artifact collection in the document database.
+Every write to the collection bumps the version after the write, such that responses tagged with
+the version (see `dependencies.etag`) are never newer than the data they were built from.
+In addition, every artifact document carries its own `revision`, which is incremented on every update,
+and the hash of its content, by which repeated registrations of the same content are detected.
+"""
+
+import hashlib
+import json
+from typing import Any, Mapping
+
+from .client import get_collection
+
+ARTIFACTS_VERSION_ID = "artifacts"
+
+REVISION_FIELD = "revision"
+"""Field of the artifact documents holding the revision of the document. It is not part of API responses."""
+
+CONTENT_HASH_FIELD = "content_hash"
+"""Field of the artifact documents holding the hash of their content, see `get_content_hash`. It is not part of API
+responses."""
+
+RESPONSE_PROJECTION = {"_id": 0, REVISION_FIELD: 0, CONTENT_HASH_FIELD: 0}
+"""Projection of artifact documents to the fields returned by the API"""
+
+# the time of registration differs between registrations of the same content
+VOLATILE_FIELDS = {"created_at"}
+
+
+async def get_artifacts_version() -> int:
+    """Get the current version of the artifact collection"""
+
+    entry = await get_collection("versions").find_one({"_id": ARTIFACTS_VERSION_ID})
+    return entry["version"] if entry else 0
+
+
+async def bump_artifacts_version():
+    """Increment the version of the artifact collection. Call it after writing to the collection."""
+
+    await get_collection("versions").update_one({"_id": ARTIFACTS_VERSION_ID}, {"$inc": {"version": 1}}, upsert=True)
+
+
+def get_content_hash(entry: Mapping[str, Any]) -> str:
+    """Get the hash of the content of an artifact document, which does not depend on the order of its fields"""
+
+    content = {field: value for field, value in entry.items() if field not in VOLATILE_FIELDS}
+    canonical = json.dumps(content, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
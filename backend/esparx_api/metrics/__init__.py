@@ -0,0 +1,27 @@
+from .collectors import (
+    BACKGROUND_ROUTE,
+    CACHE_WARM_UP_DURATION,
+    DAGDB_POOL_MAX_SIZE,
+    DATABASE_TIMEOUTS,
+    DOCUMENTDB_POOL_MAX_SIZE,
+    REQUEST_DURATION,
+    REQUESTS_IN_PROGRESS,
+    STARTUP_DURATION,
+    UNMATCHED_ROUTE,
+    RequestMetrics,
+    current_request,
+    exempt_from_budget,
+    record_serialization,
+)
+from .dagdb import instrument_engine
+from .documentdb import CommandTimer, PoolMonitor, time_command
+from .queries import (
+    DAGDB_STATEMENTS_HEADER,
+    DOCUMENTDB_COMMANDS_HEADER,
+    QUERY_BUDGETS,
+    REPEATED_STATEMENTS_HEADER,
+    QueryBudget,
+    find_problems,
+    get_repeated,
+)
+from .registry import get_registry, is_multiprocess, mark_worker_stopped, prepare_multiprocess_directory
@@ -0,0 +1,194 @@
+"""
+This module defines the Prometheus metrics of the API, which are exposed at /metrics.
+
+Besides the latency of every request, the time spent in Postgres, in the document database and in serializing
+the response is recorded per route, which shows where the time of a slow route goes. The database events
+happen deep inside the drivers, so they are collected in the `RequestMetrics` of the current request, which is held
+in a context variable, and observed with the route once the request is finished. Events without a request,
+e.g., on startup, are observed right away with the route `background`.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+
+from prometheus_client import Counter, Gauge, Histogram
+
+BACKGROUND_ROUTE = "background"
+UNMATCHED_ROUTE = "unmatched"
+"""Route label of requests to paths without a route, so that arbitrary paths do not create new time series"""
+
+# database operations are much faster than requests, so they get finer buckets
+DATABASE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250, 1000)
+
+REQUESTS_IN_PROGRESS = Gauge(
+    "esparx_http_requests_in_progress", "Requests currently being handled", ["method"], multiprocess_mode="livesum"
+)
+REQUEST_DURATION = Histogram(
+    "esparx_http_request_duration_seconds", "Latency of requests", ["method", "route", "status"]
+)
+REQUEST_TIME_SPENT = Histogram(
+    "esparx_http_request_time_spent_seconds",
+    "Time a request spent in a component: dagdb (Postgres), documentdb (MongoDB) or serialization",
+    ["route", "component"],
+    buckets=DATABASE_BUCKETS,
+)
+
+DAGDB_QUERY_DURATION = Histogram(
+    "esparx_dagdb_query_duration_seconds", "Duration of SQL statements", ["route"], buckets=DATABASE_BUCKETS
+)
+DAGDB_QUERIES_PER_REQUEST = Histogram(
+    "esparx_dagdb_queries_per_request", "Number of SQL statements per request", ["route"], buckets=QUERY_COUNT_BUCKETS
+)
+DAGDB_POOL_CHECKED_OUT = Gauge(
+    "esparx_dagdb_pool_checked_out", "Connections to Postgres currently in use", multiprocess_mode="livesum"
+)
+DAGDB_POOL_MAX_SIZE = Gauge(
+    "esparx_dagdb_pool_max_size",
+    "Maximum number of connections to Postgres, including the overflow",
+    multiprocess_mode="livesum",
+)
+
+DOCUMENTDB_OPERATION_DURATION = Histogram(
+    "esparx_documentdb_operation_duration_seconds",
+    "Duration of document database commands",
+    ["route", "command"],
+    buckets=DATABASE_BUCKETS,
+)
+DOCUMENTDB_OPERATION_FAILURES = Counter(
+    "esparx_documentdb_operation_failures_total", "Failed document database commands", ["command"]
+)
+DOCUMENTDB_POOL_CHECKED_OUT = Gauge(
+    "esparx_documentdb_pool_checked_out",
+    "Connections to the document database currently in use",
+    ["address"],
+    multiprocess_mode="livesum",
+)
+DOCUMENTDB_POOL_MAX_SIZE = Gauge(
+    "esparx_documentdb_pool_max_size",
+    "Maximum number of connections per server of the document database client",
+    multiprocess_mode="livesum",
+)
+DOCUMENTDB_POOL_CHECKOUT_DURATION = Histogram(
+    "esparx_documentdb_pool_checkout_duration_seconds",
+    "Time waited for a connection to the document database",
+    buckets=DATABASE_BUCKETS,
+)
+DOCUMENTDB_POOL_CHECKOUT_FAILURES = Counter(
+    "esparx_documentdb_pool_checkout_failures_total",
+    "Failed checkouts of connections to the document database, e.g., timeouts of a saturated pool",
+    ["reason"],
+)
+
+DATABASE_TIMEOUTS = Counter(
+    "esparx_database_timeouts_total",
+    "Requests failed with 503 Service Unavailable as a database did not respond in time",
+    ["database", "reason"],
+)
+
+STARTUP_DURATION = Gauge(
+    "esparx_startup_duration_seconds",
+    "Time the API took from the start of its lifespan until it accepted requests",
+    multiprocess_mode="liveall",
+)
+CACHE_WARM_UP_DURATION = Gauge(
+    "esparx_cache_warm_up_duration_seconds",
+    "Time the caches took to warm up in the background after startup",
+    multiprocess_mode="liveall",
+)
+
+
+class RequestMetrics:
+    """Database operations and serialization time of one request"""
+
+    def __init__(self, track_statements: bool = False):
+        self.query_durations: List[float] = []
+        self.operation_durations: List[Tuple[str, float]] = []
+        self.serialization_seconds = 0.0
+        self.finished = False
+        # shapes of the SQL statements and document database commands, only recorded if `track_statements` is set
+        self.statements: Optional[List[str]] = [] if track_statements else None
+        self.commands: Optional[List[str]] = [] if track_statements else None
+
+    def observe(self, route: str):
+        """Observe the collected metrics with the route of the request"""
+
+        self.finished = True
+        for seconds in self.query_durations:
+            DAGDB_QUERY_DURATION.labels(route).observe(seconds)
+        DAGDB_QUERIES_PER_REQUEST.labels(route).observe(len(self.query_durations))
+
+        documentdb_seconds = 0.0
+        for command, seconds in self.operation_durations:
+            DOCUMENTDB_OPERATION_DURATION.labels(route, command).observe(seconds)
+            documentdb_seconds += seconds
+
+        time_spent: Dict[str, float] = {
+            "dagdb": sum(self.query_durations),
+            "documentdb": documentdb_seconds,
+            "serialization": self.serialization_seconds,
+        }
+        for component, seconds in time_spent.items():
+            REQUEST_TIME_SPENT.labels(route, component).observe(seconds)
+
+
+current_request: ContextVar[Optional[RequestMetrics]] = ContextVar("current_request", default=None)
+"""Metrics of the request handled in the current context, set by the `MetricsMiddleware`"""
+
+
+def get_current_request() -> Optional[RequestMetrics]:
+    """Get the metrics of the current request, or None outside of requests and after the request finished"""
+
+    metrics = current_request.get()
+    # tasks started by a request inherit its context, but may outlive it
+    return None if metrics is None or metrics.finished else metrics
+
+
+budget_exempt: ContextVar[bool] = ContextVar("budget_exempt", default=False)
+
+
+@contextmanager
+def exempt_from_budget():
+    """
+    Do not check the statements run in this block against the query budget of the request, e.g., loading the
+    graph cache, which is done once for all requests after a write. The statements are still timed.
+    """
+
+    token = budget_exempt.set(True)
+    try:
+        yield
+    finally:
+        budget_exempt.reset(token)
+
+
+def record_query(statement: str, seconds: float):
+    metrics = get_current_request()
+    if metrics is None:
+        DAGDB_QUERY_DURATION.labels(BACKGROUND_ROUTE).observe(seconds)
+    else:
+        metrics.query_durations.append(seconds)
+        if metrics.statements is not None and not budget_exempt.get():
+            metrics.statements.append(statement)
+
+
+def record_command(get_shape: Callable[[], str]):
+    """Record the shape of a document database command if the current request tracks its statements"""
+
+    metrics = get_current_request()
+    if metrics is not None and metrics.commands is not None and not budget_exempt.get():
+        metrics.commands.append(get_shape())
+
+
+def record_operation(command: str, seconds: float):
+    metrics = get_current_request()
+    if metrics is None:
+        DOCUMENTDB_OPERATION_DURATION.labels(BACKGROUND_ROUTE, command).observe(seconds)
+    else:
+        metrics.operation_durations.append((command, seconds))
+
+
+def record_serialization(seconds: float):
+    metrics = get_current_request()
+    if metrics is not None:
+        metrics.serialization_seconds += seconds
@@ -0,0 +1,74 @@
+"""
+This module instruments the SQLAlchemy engine of the DAG database.
+Statements are timed with the cursor events of the engine, and the connections in use are counted with its pool
+events, which works with several worker processes. The remaining state of the connection pool is read whenever
+the metrics are scraped.
+"""
+
+import time
+
+from prometheus_client import REGISTRY
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.registry import Collector
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from .collectors import DAGDB_POOL_CHECKED_OUT, record_query
+
+QUERY_START_KEY = "esparx_query_start"
+
+
+def before_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+    connection.info.setdefault(QUERY_START_KEY, []).append(time.perf_counter())
+
+
+def after_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+    record_query(statement, time.perf_counter() - connection.info[QUERY_START_KEY].pop())
+
+
+def handle_error(exception_context):
+    starts = exception_context.connection.info.get(QUERY_START_KEY) if exception_context.connection else None
+    if starts:
+        record_query(exception_context.statement, time.perf_counter() - starts.pop())
+
+
+def checkout(dbapi_connection, connection_record, connection_proxy):
+    DAGDB_POOL_CHECKED_OUT.inc()
+
+
+def checkin(dbapi_connection, connection_record):
+    DAGDB_POOL_CHECKED_OUT.dec()
+
+
+class PoolCollector(Collector):
+    """Reports the connection pool of an engine at scrape time"""
+
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+
+    def collect(self):
+        pool = self.engine.pool
+        # pools without a fixed size, e.g., NullPool, do not report their state
+        if not hasattr(pool, "checkedout"):
+            return
+        yield GaugeMetricFamily(
+            "esparx_dagdb_pool_checked_in", "Idle connections to Postgres in the pool", value=pool.checkedin()
+        )
+        yield GaugeMetricFamily("esparx_dagdb_pool_size", "Size of the Postgres connection pool", value=pool.size())
+        yield GaugeMetricFamily(
+            "esparx_dagdb_pool_overflow",
+            "Connections to Postgres beyond the pool size, negative while the pool is not filled yet",
+            value=pool.overflow(),
+        )
+
+
+def instrument_engine(engine: AsyncEngine):
+    """Time the statements of an engine and report its connection pool"""
+
+    sync_engine = engine.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(sync_engine, "handle_error", handle_error)
+    event.listen(sync_engine, "checkout", checkout)
+    event.listen(sync_engine, "checkin", checkin)
+    REGISTRY.register(PoolCollector(engine))
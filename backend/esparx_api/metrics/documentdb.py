@@ -0,0 +1,96 @@
+"""
+This module instruments the client of the document database with the event listeners of pymongo.
+The listeners are passed to the client on creation, see `documentdb.client`. The embedded document database,
+which emits no pymongo events, times its commands with `time_command` instead.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Any, Mapping
+
+from pymongo import monitoring
+
+from .collectors import (
+    DOCUMENTDB_OPERATION_FAILURES,
+    DOCUMENTDB_POOL_CHECKED_OUT,
+    DOCUMENTDB_POOL_CHECKOUT_DURATION,
+    DOCUMENTDB_POOL_CHECKOUT_FAILURES,
+    record_command,
+    record_operation,
+)
+from .queries import CURSOR_COMMANDS, command_shape
+
+
+class CommandTimer(monitoring.CommandListener):
+    """Times the commands sent to the document database"""
+
+    def started(self, event: monitoring.CommandStartedEvent):
+        if event.command_name not in CURSOR_COMMANDS:
+            record_command(lambda: command_shape(event.command_name, event.command))
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent):
+        record_operation(event.command_name, event.duration_micros / 1e6)
+
+    def failed(self, event: monitoring.CommandFailedEvent):
+        record_operation(event.command_name, event.duration_micros / 1e6)
+        DOCUMENTDB_OPERATION_FAILURES.labels(event.command_name).inc()
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """Tracks the connections checked out of the pools of the document database client"""
+
+    def connection_checked_out(self, event: monitoring.ConnectionCheckedOutEvent):
+        DOCUMENTDB_POOL_CHECKED_OUT.labels(address_label(event.address)).inc()
+        if event.duration is not None:
+            DOCUMENTDB_POOL_CHECKOUT_DURATION.observe(event.duration)
+
+    def connection_checked_in(self, event: monitoring.ConnectionCheckedInEvent):
+        DOCUMENTDB_POOL_CHECKED_OUT.labels(address_label(event.address)).dec()
+
+    def connection_check_out_failed(self, event: monitoring.ConnectionCheckOutFailedEvent):
+        DOCUMENTDB_POOL_CHECKOUT_FAILURES.labels(event.reason).inc()
+
+    # the remaining pool events are not tracked
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+
+@contextmanager
+def time_command(command_name: str, command: Mapping[str, Any]):
+    """Record a command of the embedded document database like the `CommandTimer` records a pymongo command"""
+
+    record_command(lambda: command_shape(command_name, command))
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        DOCUMENTDB_OPERATION_FAILURES.labels(command_name).inc()
+        raise
+    finally:
+        record_operation(command_name, time.perf_counter() - start)
+
+
+def address_label(address) -> str:
+    host, port = address
+    return f"{host}:{port}"
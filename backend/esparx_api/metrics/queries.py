@@ -0,0 +1,107 @@
+"""
+This module detects requests issuing more database statements than necessary, e.g., statements run in a loop
+(N+1 queries). If `QUERY_DEBUG` is enabled, the SQL statements and document database commands of every request
+are recorded, and the `MetricsMiddleware` reports their number in response headers and warns about
+
+- statements run more than `REPEAT_LIMIT` times within one request, and
+- routes exceeding their budget in `QUERY_BUDGETS`.
+
+The statements are compared by their shape, i.e., SQL statements with placeholders instead of parameters and
+document database commands reduced to their name, collection and the fields they filter by.
+`tests/test_query_budgets.py` requests every route on a synthetic registry and fails on any of these warnings.
+"""
+
+import re
+from collections import Counter
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+DAGDB_STATEMENTS_HEADER = "X-DAGDB-Statements"
+DOCUMENTDB_COMMANDS_HEADER = "X-DocumentDB-Commands"
+REPEATED_STATEMENTS_HEADER = "X-Repeated-Statements"
+
+CURSOR_COMMANDS = {"getMore", "killCursors"}
+"""Commands continuing or closing the cursor of an earlier command, which are not counted"""
+
+REPEAT_LIMIT = 2
+"""A statement run more often than this within one request is reported, e.g., looking up the artifact and its source"""
+
+
+class QueryBudget(NamedTuple):
+    """Maximum number of SQL statements and document database commands of one request"""
+
+    dagdb: int
+    documentdb: int
+
+
+# a registration creating the artifact, its pipeline and the connection from its source, see `Artifact.create`.
+# Repeated registrations of the same content take one statement and one command.
+REGISTRATION_BUDGET = QueryBudget(dagdb=7, documentdb=3)
+
+# The budgets hold on graphs of any size, as the routes must not query per artifact or pipeline.
+# The DAG read routes are served from the graph cache, which checks the graph version with one statement.
+QUERY_BUDGETS: Dict[str, QueryBudget] = {
+    "GET /": QueryBudget(dagdb=0, documentdb=0),
+    "GET /metrics": QueryBudget(dagdb=0, documentdb=0),
+    "GET /graph": QueryBudget(dagdb=1, documentdb=0),
+    "GET /graph/layout": QueryBudget(dagdb=1, documentdb=0),
+    "GET /autocomplete": QueryBudget(dagdb=1, documentdb=0),
+    "GET /artifacts/": QueryBudget(dagdb=0, documentdb=2),
+    "GET /artifacts/search": QueryBudget(dagdb=0, documentdb=3),
+    "GET /artifacts/global": QueryBudget(dagdb=1, documentdb=0),
+    "GET /artifacts/pipeline/{pipeline_name}": QueryBudget(dagdb=1, documentdb=0),
+    "GET /artifacts/neighbors/{name}": QueryBudget(dagdb=1, documentdb=0),
+    "GET /artifacts/lineage/{name}": QueryBudget(dagdb=3, documentdb=0),
+    "GET /artifacts/name/{name}": QueryBudget(dagdb=0, documentdb=2),
+    "GET /pipelines/": QueryBudget(dagdb=1, documentdb=0),
+    "GET /pipelines/artifact/{artifact_name}": QueryBudget(dagdb=1, documentdb=0),
+    "GET /pipelines/results/{pipeline_name}": QueryBudget(dagdb=2, documentdb=2),
+    "GET /pipelines/{pipeline_name}/layout": QueryBudget(dagdb=1, documentdb=0),
+    "GET /connections/": QueryBudget(dagdb=1, documentdb=0),
+    "GET /connections/pipeline/{pipeline_name}": QueryBudget(dagdb=1, documentdb=0),
+    **{
+        f"POST /register/{artifact_type}": REGISTRATION_BUDGET
+        for artifact_type in ["code", "dataset", "model", "hyperparameters", "parameters", "results"]
+    },
+    # all artifacts of a batch take the statements of one registration, and all its connections those of one connection
+    "POST /register/batch": QueryBudget(dagdb=12, documentdb=3),
+    "POST /connections/create": QueryBudget(dagdb=5, documentdb=0),
+    "DELETE /artifacts/name/{name}": QueryBudget(dagdb=5, documentdb=2),
+    "DELETE /pipelines/name/{name}": QueryBudget(dagdb=4, documentdb=0),
+}
+
+
+def command_shape(command_name: str, command: Mapping[str, Any]) -> str:
+    """Get the shape of a document database command, e.g., `find artifacts {name}` or `aggregate artifacts [$match]`"""
+
+    shape = f"{command_name} {command.get(command_name)}"
+    query: Optional[Mapping[str, Any]] = command.get("filter") or command.get("query")
+    for key in ("updates", "deletes"):
+        if command.get(key):
+            query = command[key][0].get("q")
+    if query:
+        shape += " {" + ", ".join(sorted(query)) + "}"
+    if command.get("pipeline"):
+        shape += " [" + ", ".join(next(iter(stage)) for stage in command["pipeline"]) + "]"
+    return shape
+
+
+def get_repeated(shapes: List[str]) -> List[Tuple[str, int]]:
+    """Get the shapes occurring more than `REPEAT_LIMIT` times and how often they occur"""
+
+    return [(shape, count) for shape, count in Counter(shapes).items() if count > REPEAT_LIMIT]
+
+
+def find_problems(label: str, statements: List[str], commands: List[str]) -> List[str]:
+    """Check the statements and commands of a request to the route `label`, e.g., `GET /graph`"""
+
+    problems = []
+    budget = QUERY_BUDGETS.get(label)
+    if budget is not None and len(statements) > budget.dagdb:
+        problems.append(f"{label} ran {len(statements)} SQL statements, its budget is {budget.dagdb}.")
+    if budget is not None and len(commands) > budget.documentdb:
+        problems.append(f"{label} ran {len(commands)} document database commands, its budget is {budget.documentdb}.")
+    for shape, count in get_repeated(statements + commands):
+        # SQL statements span several lines, a single line with the start of the statement suffices to find it
+        shape = re.sub(r"\s+", " ", shape)[:200]
+        problems.append(f"{label} ran the same statement {count} times, which may be an N+1 query: {shape}")
+    return problems
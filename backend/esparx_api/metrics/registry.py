@@ -0,0 +1,53 @@
+"""
+This module provides the registry exposed at /metrics. If the API runs in several worker processes (see
+`esparx-api --production`), each worker writes its metrics to files in the directory given by the environment
+variable PROMETHEUS_MULTIPROC_DIR, and the registry aggregates the files of all workers at scrape time, so
+that every worker reports the metrics of the whole API. Metrics collected at scrape time, i.e., the idle
+connections and the overflow of the Postgres connection pool, are only available with a single process.
+"""
+
+import os
+import shutil
+import tempfile
+
+from prometheus_client import REGISTRY, CollectorRegistry, multiprocess
+
+MULTIPROCESS_DIRECTORY_VARIABLE = "PROMETHEUS_MULTIPROC_DIR"
+
+
+def is_multiprocess() -> bool:
+    return MULTIPROCESS_DIRECTORY_VARIABLE in os.environ
+
+
+def prepare_multiprocess_directory() -> str:
+    """
+    Create an empty directory for the metrics of the workers and make the workers use it.
+    Must be called before the workers are started, as prometheus_client reads the variable on import.
+    """
+
+    directory = os.environ.get(MULTIPROCESS_DIRECTORY_VARIABLE)
+    if directory:
+        # metrics of an earlier run would be reported as if they were collected by this one
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+    else:
+        directory = tempfile.mkdtemp(prefix="esparx-metrics-")
+    os.environ[MULTIPROCESS_DIRECTORY_VARIABLE] = directory
+    return directory
+
+
+def get_registry() -> CollectorRegistry:
+    """Get the registry of all metrics of the API, aggregated over all worker processes"""
+
+    if not is_multiprocess():
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def mark_worker_stopped():
+    """Remove the gauges of this worker from the aggregated metrics. Called once on API shutdown."""
+
+    if is_multiprocess():
+        multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,3 @@
+from .compression import CompressionMiddleware
+from .metrics import MetricsMiddleware
+from .timeouts import add_timeout_handlers
@@ -0,0 +1,264 @@
+"""
+This module compresses the bodies of requests and responses.
+
+Clients may send request bodies compressed with gzip or zstd and mark them with the `Content-Encoding` header,
+e.g., the Python API compresses large registrations. The bodies are decompressed before they reach the routes,
+up to a maximum decompressed size. Responses of at least a minimum size are compressed with the encoding the client
+ranks highest in its `Accept-Encoding` header, preferring zstd over gzip on a tie.
+Streamed responses are compressed chunk by chunk, so that every chunk can be decoded as soon as it arrives.
+The ETag of a compressed response is weakened (`W/"dag-3"`), as a strong ETag must not be shared by the
+encoded and the plain representation. `If-None-Match` uses the weak comparison, so it matches either of them.
+"""
+
+import zlib
+from typing import Dict, List, Optional
+
+import zstandard
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+THREAD_MINIMUM_SIZE = 128 * 1024
+"""Chunks of at least this size are (de)compressed in a worker thread instead of blocking the event loop"""
+
+# the encodings of request bodies are ordered by preference for responses
+ENCODINGS = ["zstd", "gzip"]
+EXCLUDED_MEDIA_TYPES = ("image/", "video/", "audio/", "application/gzip", "application/zip", "application/zstd")
+
+
+class Compressor:
+    """Compresses one response body, which may be split into several chunks"""
+
+    def __init__(self, encoding: str):
+        if encoding == "zstd":
+            self.compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+            self.sync_flush = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        else:
+            self.compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self.sync_flush = zlib.Z_SYNC_FLUSH
+
+    def compress(self, chunk: bytes, last: bool) -> bytes:
+        """Compress a chunk, which can be decoded on its own once all preceding chunks were decoded"""
+
+        compressed = self.compressor.compress(chunk)
+        return compressed + (self.compressor.flush() if last else self.compressor.flush(self.sync_flush))
+
+
+def decompress(body: bytes, encoding: str, limit: int) -> bytes:
+    """
+    Decompress a request body, but no more than `limit` + 1 bytes, so that oversized bodies can be detected
+    without decompressing them completely. Raises `ValueError` if the body is not valid for its encoding.
+    """
+
+    try:
+        if encoding == "gzip":
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            decompressed = decompressor.decompress(body, limit + 1)
+            if len(decompressed) <= limit and not decompressor.eof:
+                raise ValueError("The gzip stream is truncated.")
+            return decompressed
+
+        chunks: List[bytes] = []
+        size = 0
+        with zstandard.ZstdDecompressor().stream_reader(body) as reader:
+            while size <= limit:
+                chunk = reader.read(limit + 1 - size)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                size += len(chunk)
+        return b"".join(chunks)
+    except (zlib.error, zstandard.ZstdError) as error:
+        raise ValueError(str(error)) from error
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick the encoding of a response from the `Accept-Encoding` header of a request, or None to not compress"""
+
+    if not accept_encoding:
+        return None
+
+    quality: Dict[str, float] = {}
+    for entry in accept_encoding.split(","):
+        encoding, *params = (part.strip() for part in entry.split(";"))
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        quality[encoding.lower()] = q
+
+    wildcard = quality.get("*", 0.0)
+    ranked = [(quality.get(encoding, wildcard), encoding) for encoding in ENCODINGS]
+    best_quality = max(q for q, _ in ranked)
+    if best_quality <= 0:
+        return None
+    # `max` would pick the last encoding on a tie, so pick the first one with the best quality
+    return next(encoding for q, encoding in ranked if q == best_quality)
+
+
+class CompressionMiddleware:
+    """ASGI middleware decompressing request bodies and compressing responses"""
+
+    def __init__(self, app: ASGIApp, minimum_size: int, max_request_size: int):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.max_request_size = max_request_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        request_encoding = headers.get("content-encoding", "identity").strip().lower()
+        if request_encoding != "identity":
+            error = None
+            if request_encoding not in ENCODINGS:
+                error = JSONResponse(
+                    {"detail": f"Content-Encoding {request_encoding} is not supported. Use one of {ENCODINGS}."},
+                    status_code=415,
+                    headers={"Accept-Encoding": ", ".join(ENCODINGS)},
+                )
+            else:
+                try:
+                    scope, receive = await self.decompress_request(scope, receive, request_encoding)
+                except ValueError as e:
+                    error = JSONResponse({"detail": f"Invalid {request_encoding} body: {e}"}, status_code=400)
+                except OverflowError:
+                    error = JSONResponse(
+                        {"detail": f"The decompressed body exceeds the limit of {self.max_request_size} bytes."},
+                        status_code=413,
+                    )
+            if error is not None:
+                await error(scope, receive, send)
+                return
+
+        response_encoding = negotiate_encoding(headers.get("accept-encoding"))
+        if response_encoding is None:
+            await self.app(scope, receive, send)
+        else:
+            await CompressingSender(send, response_encoding, self.minimum_size).run(self.app, scope, receive)
+
+    async def decompress_request(self, scope: Scope, receive: Receive, encoding: str):
+        """
+        Read and decompress the whole request body, and get the scope and receive channel of the plain body.
+        Raises `ValueError` for invalid bodies and `OverflowError` for bodies exceeding `max_request_size`.
+        """
+
+        chunks: List[bytes] = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] != "http.request":
+                # the client disconnected, let the route notice it
+                break
+            chunks.append(message.get("body", b""))
+            more_body = message.get("more_body", False)
+        body = b"".join(chunks)
+
+        if len(body) >= THREAD_MINIMUM_SIZE:
+            body = await run_in_threadpool(decompress, body, encoding, self.max_request_size)
+        else:
+            body = decompress(body, encoding, self.max_request_size)
+        if len(body) > self.max_request_size:
+            raise OverflowError()
+
+        headers = MutableHeaders(scope={**scope, "headers": list(scope["headers"])})
+        del headers["content-encoding"]
+        headers["content-length"] = str(len(body))
+        scope = {**scope, "headers": headers.raw}
+
+        sent = False
+
+        async def receive_decompressed() -> Message:
+            nonlocal sent
+            if sent:
+                return await receive()
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        return scope, receive_decompressed
+
+
+def weaken_etag(headers: MutableHeaders):
+    """Mark the ETag of a response as weak, if it has a strong one"""
+
+    etag = headers.get("etag")
+    if etag and not etag.startswith("W/"):
+        headers["ETag"] = "W/" + etag
+
+
+class CompressingSender:
+    """Compresses the response of one request while it is sent"""
+
+    def __init__(self, send: Send, encoding: str, minimum_size: int):
+        self.send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start: Optional[Message] = None
+        self.compressor: Optional[Compressor] = None
+        self.passthrough = False
+
+    async def run(self, app: ASGIApp, scope: Scope, receive: Receive):
+        await app(scope, receive, self.send_compressed)
+
+    async def compress(self, chunk: bytes, last: bool) -> bytes:
+        if len(chunk) >= THREAD_MINIMUM_SIZE:
+            return await run_in_threadpool(self.compressor.compress, chunk, last)
+        return self.compressor.compress(chunk, last)
+
+    async def send_compressed(self, message: Message):
+        if message["type"] == "http.response.start":
+            # hold back the headers until the first chunk of the body shows whether it is compressed
+            headers = Headers(raw=message["headers"])
+            media_type = headers.get("content-type", "")
+            self.passthrough = (
+                "content-encoding" in headers
+                or message["status"] in (204, 206, 304)
+                or media_type.startswith(EXCLUDED_MEDIA_TYPES)
+            )
+            if self.passthrough:
+                if message["status"] == 304:
+                    # the client accepts an encoding, so its cached copy was most likely compressed
+                    weaken_etag(MutableHeaders(raw=message["headers"]))
+                await self.send(message)
+            else:
+                self.start = message
+            return
+
+        if self.passthrough or message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.start is not None:
+            start, self.start = self.start, None
+            headers = MutableHeaders(raw=start["headers"])
+            headers.add_vary_header("Accept-Encoding")
+            if len(body) < self.minimum_size and not more_body:
+                self.passthrough = True
+                await self.send(start)
+                await self.send(message)
+                return
+
+            self.compressor = Compressor(self.encoding)
+            headers["Content-Encoding"] = self.encoding
+            weaken_etag(headers)
+            if more_body:
+                del headers["Content-Length"]
+            body = await self.compress(body, last=not more_body)
+            if not more_body:
+                headers["Content-Length"] = str(len(body))
+            await self.send(start)
+        else:
+            body = await self.compress(body, last=not more_body)
+
+        await self.send({"type": "http.response.body", "body": body, "more_body": more_body})
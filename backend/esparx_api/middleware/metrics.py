@@ -0,0 +1,90 @@
+"""
+This module records the latency of requests per route and sets up the collection of the database and serialization
+metrics of every request, see `esparx_api.metrics`. With `query_debug`, it also reports the number of statements
+of every request and warns about repeated statements and exceeded query budgets, see `esparx_api.metrics.queries`.
+"""
+
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from esparx_api.metrics import (
+    DAGDB_STATEMENTS_HEADER,
+    DOCUMENTDB_COMMANDS_HEADER,
+    REPEATED_STATEMENTS_HEADER,
+    REQUEST_DURATION,
+    REQUESTS_IN_PROGRESS,
+    UNMATCHED_ROUTE,
+    RequestMetrics,
+    current_request,
+    find_problems,
+    get_repeated,
+)
+
+
+def get_route_label(scope: Scope) -> str:
+    """
+    Get the path template of the route that handled a request, e.g., `/artifacts/name/{name}`.
+    Routes of routers included with a prefix do not know their full path in every FastAPI version,
+    so the template is rebuilt from the path of the request by putting back the names of the path parameters.
+    """
+
+    if "route" not in scope:
+        return UNMATCHED_ROUTE
+    path = scope["path"]
+    # the server prepends the root path (e.g., /api behind a proxy) to the path, which is not part of the route
+    root_path = scope.get("root_path", "")
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path) :]
+    # path parameters are matched from left to right, so replacing them from the right keeps earlier segments
+    for name, value in reversed(list(scope.get("path_params", {}).items())):
+        head, separator, tail = path.rpartition(str(value))
+        if separator:
+            path = f"{head}{{{name}}}{tail}"
+    return path
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing requests and collecting their database and serialization metrics"""
+
+    def __init__(self, app: ASGIApp, query_debug: bool = False):
+        self.app = app
+        self.query_debug = query_debug
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        metrics = RequestMetrics(track_statements=self.query_debug)
+        token = current_request.set(metrics)
+
+        async def send_with_status(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.query_debug:
+                    # statements of streamed responses issued after this point are not counted
+                    headers = MutableHeaders(scope=message)
+                    headers[DAGDB_STATEMENTS_HEADER] = str(len(metrics.statements))
+                    headers[DOCUMENTDB_COMMANDS_HEADER] = str(len(metrics.commands))
+                    headers[REPEATED_STATEMENTS_HEADER] = str(len(get_repeated(metrics.statements + metrics.commands)))
+            await send(message)
+
+        start = time.perf_counter()
+        REQUESTS_IN_PROGRESS.labels(method).inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUESTS_IN_PROGRESS.labels(method).dec()
+            current_request.reset(token)
+            # the router adds the matched route to the scope
+            route = get_route_label(scope)
+            REQUEST_DURATION.labels(method, route, str(status)).observe(time.perf_counter() - start)
+            metrics.observe(route)
+            if self.query_debug:
+                for problem in find_problems(f"{method} {route}", metrics.statements, metrics.commands):
+                    print(f"Query check: {problem}")
@@ -0,0 +1,63 @@
+"""
+This module answers timeouts of the databases with 503 Service Unavailable, so that requests fail fast while
+a connection pool is saturated or a database is unreachable, instead of queueing until the client gives up.
+The time waited is bounded by the timeouts of the settings, e.g., `DAGDB_POOL_TIMEOUT`. Every timeout is counted
+in the metric `esparx_database_timeouts_total`.
+"""
+
+from typing import Optional
+
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse
+from pymongo.errors import (
+    PyMongoError,
+    ServerSelectionTimeoutError,
+    WaitQueueTimeoutError,
+)
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from esparx_api.metrics import DATABASE_TIMEOUTS
+
+RETRY_AFTER_SECONDS = 1
+QUERY_CANCELED = "57014"
+"""SQLSTATE of statements cancelled by Postgres, e.g., on exceeding the statement timeout"""
+
+
+def get_dagdb_timeout(exc: Exception) -> Optional[str]:
+    if isinstance(exc, PoolTimeoutError):
+        return "pool"
+    if isinstance(exc, OperationalError) and getattr(exc.orig, "sqlstate", None) == QUERY_CANCELED:
+        return "statement"
+    return None
+
+
+def get_documentdb_timeout(exc: Exception) -> Optional[str]:
+    if isinstance(exc, WaitQueueTimeoutError):
+        return "pool"
+    if isinstance(exc, ServerSelectionTimeoutError):
+        return "server_selection"
+    if isinstance(exc, PyMongoError) and exc.timeout:
+        return "operation"
+    return None
+
+
+async def respond_unavailable(request: Request, exc: Exception) -> JSONResponse:
+    """Answer a database timeout with 503 Service Unavailable, other database errors are raised again"""
+
+    for database, reason in (("dagdb", get_dagdb_timeout(exc)), ("documentdb", get_documentdb_timeout(exc))):
+        if reason:
+            DATABASE_TIMEOUTS.labels(database, reason).inc()
+            # the message of the error is not logged, as it may contain the parameters of a statement
+            print(f"{request.method} {request.url.path} failed with a timeout of the {database} ({reason}).")
+            return JSONResponse(
+                {"detail": "The database is busy, please try again."},
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+            )
+    raise exc
+
+
+def add_timeout_handlers(app: FastAPI):
+    for error in (PoolTimeoutError, OperationalError, PyMongoError):
+        app.add_exception_handler(error, respond_unavailable)
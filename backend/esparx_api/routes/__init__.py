@@ -2,3 +2,6 @@ from .artifacts import ArtifactRouter
 from .pipelines import PipelineRouter
 from .connections import ConnectionRouter
 from .register import ArtifactRegisterRouter
+from .graph import GraphRouter
+from .autocomplete import AutocompleteRouter
+from .metrics import MetricsRouter
@@ -1,29 +1,123 @@
 import urllib.parse
-from typing import List
-
-from fastapi import APIRouter, HTTPException, status
-
-from esparx_api.dagdb import Session
+from datetime import datetime
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from pymongo.asynchronous.cursor import AsyncCursor
+from sqlalchemy import Row
+
+from esparx_api.dagdb import READ_OPTIONS, CachedGraph, LocalGraphCache, Session
+from esparx_api.dependencies import (
+    Encoder,
+    IdPage,
+    NamePage,
+    check_etag,
+    encode,
+    make_etag,
+)
 from esparx_api.dependencies.auth import IdentifiedUser
-from esparx_api.documentdb import DocumentDBClient
-from esparx_api.schemas import Artifact, ArtifactResponse
+from esparx_api.dependencies.pagination import MAX_PAGE_SIZE
+from esparx_api.documentdb import (
+    RESPONSE_PROJECTION,
+    REVISION_FIELD,
+    ArtifactSearchIndex,
+    bump_artifacts_version,
+    get_artifacts_version,
+    get_collection,
+)
+from esparx_api.schemas import Artifact, ArtifactResponse, LineageResponse
+from esparx_api.schemas.dag import MAX_LINEAGE_DEPTH
 
 ArtifactRouter = APIRouter(tags=["Artifacts"])
 
-db = DocumentDBClient.artifactdb
-artifact_collection = db.artifacts
-artifact_collection.create_index("name", unique=True)
-
 
-@ArtifactRouter.get("/")
-async def get_artifacts():
-    """Get all artifacts from the DocumentDB"""
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
 
-    entries = list(artifact_collection.find({}, {"_id": 0}))  # Omit the _id field
-    return {"entries": entries}
+STREAM_BATCH_SIZE = 500
+"""Number of documents fetched from the DocumentDB and sent to the client at once when streaming"""
 
 
-def artifact_to_dict(artifact: Artifact) -> dict:
+@ArtifactRouter.get("/")
+async def get_artifacts(
+    page: NamePage,
+    request: Request,
+    response: Response,
+    encoder: Encoder,
+    artifact_type: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    accept: Optional[str] = Header(None),
+):
+    """Get all artifacts from the DocumentDB ordered by name. Paginated by name, see the `X-Next-Cursor` header.
+
+    With `Accept: application/x-ndjson`, the artifacts are streamed as newline delimited JSON instead.
+    Streamed responses contain no `X-Next-Cursor` header.
+    """
+
+    stream = bool(accept and NDJSON_MEDIA_TYPE in accept)
+    etag = make_etag("artifacts", await get_artifacts_version(), *(["ndjson"] if stream else []))
+    check_etag(request, response, etag)
+
+    query = {}
+    if page.after is not None:
+        query["name"] = {"$gt": page.after}
+    if artifact_type is not None:
+        query["artifact_type"] = artifact_type
+    if created_after is not None or created_before is not None:
+        query["created_at"] = {}
+        if created_after is not None:
+            query["created_at"]["$gte"] = created_after
+        if created_before is not None:
+            query["created_at"]["$lt"] = created_before
+
+    cursor = get_collection("artifacts").find(query, RESPONSE_PROJECTION).sort("name", 1)  # Omit the _id field
+    if page.limit is not None:
+        cursor = cursor.limit(page.limit)
+
+    if stream:
+        return StreamingResponse(
+            stream_ndjson(cursor.batch_size(STREAM_BATCH_SIZE)), media_type=NDJSON_MEDIA_TYPE, headers={"ETag": etag}
+        )
+
+    entries = await cursor.to_list()
+
+    page.set_next_cursor(response, [entry["name"] for entry in entries])
+    return encoder.respond({"entries": entries})
+
+
+async def stream_ndjson(cursor: AsyncCursor):
+    """Encode the documents of a cursor as newline delimited JSON, one batch at a time"""
+
+    lines = []
+    async for entry in cursor:
+        lines.append(encode(entry))
+        if len(lines) == STREAM_BATCH_SIZE:
+            yield b"\n".join(lines) + b"\n"
+            lines = []
+    if lines:
+        yield b"\n".join(lines) + b"\n"
+
+
+@ArtifactRouter.get("/search")
+async def search_artifacts(
+    request: Request,
+    response: Response,
+    encoder: Encoder,
+    q: str = Query(..., min_length=1, description="Search terms, matched against artifact names and descriptions"),
+    artifact_type: Optional[str] = None,
+    offset: int = Query(0, ge=0, description="Number of matches to skip"),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of matches"),
+):
+    """Search artifacts by name and description. Matches are ordered by relevance, given as `score`."""
+
+    check_etag(request, response, make_etag("artifacts", await get_artifacts_version()))
+
+    entries = await ArtifactSearchIndex.search(q, artifact_type, offset, limit)
+    return encoder.respond({"entries": entries})
+
+
+def artifact_to_dict(artifact: Row) -> dict:
     return {
         "id": artifact.id,
         "name": artifact.name,
@@ -32,59 +126,105 @@ def artifact_to_dict(artifact: Artifact) -> dict:
 
 
 @ArtifactRouter.get("/global", response_model=List[ArtifactResponse])
-async def get_artifacts_for_global_view(session: Session):
-    """Get all artifacts from the DAG DB for global view"""
+async def get_artifacts_for_global_view(
+    graph: CachedGraph,
+    page: IdPage,
+    response: Response,
+    encoder: Encoder,
+    artifact_type: Optional[str] = None,
+    owner_id: Optional[str] = None,
+):
+    """Get all artifacts from the DAG DB for global view. Paginated by id, see the `X-Next-Cursor` header."""
 
-    with session.begin() as s:
-        artifacts = Artifact.get_all_artifacts(s)
-        artifacts_dicts = [artifact_to_dict(artifact) for artifact in artifacts]
-        return [ArtifactResponse.model_validate(artifact_dict) for artifact_dict in artifacts_dicts]
+    artifacts = graph.get_all_artifacts(page.after, page.limit, artifact_type, owner_id)
+    page.set_next_cursor(response, [artifact.id for artifact in artifacts])
+    return encoder.respond([artifact_to_dict(artifact) for artifact in artifacts])
 
 
 @ArtifactRouter.get("/pipeline/{pipeline_name:path}", response_model=List[ArtifactResponse])
-async def get_artifacts_by_pipeline(pipeline_name: str, session: Session):
+async def get_artifacts_by_pipeline(pipeline_name: str, graph: CachedGraph, encoder: Encoder):
     """Get all artifacts in a pipeline"""
 
     pipeline_name = urllib.parse.unquote(pipeline_name)
-    # Search for the artifacts in the database collection
-    with session.begin() as s:
-        artifacts = Artifact.get_artifacts_by_pipeline(s, pipeline_name)
-        artifacts_dicts = [artifact_to_dict(artifact) for artifact in artifacts]
-        return [ArtifactResponse.model_validate(artifact_dict) for artifact_dict in artifacts_dicts]
+    artifacts = graph.get_artifacts_by_pipeline(pipeline_name)
+    return encoder.respond([artifact_to_dict(artifact) for artifact in artifacts])
 
 
 @ArtifactRouter.get("/neighbors/{name:path}", response_model=List[ArtifactResponse])
-async def get_neighbors(name: str, session: Session):
+async def get_neighbors(name: str, graph: CachedGraph, encoder: Encoder):
     """Get all neighbors (in any pipeline) of an artifact by artifact name"""
 
     name = urllib.parse.unquote(name)
-    with session.begin() as s:
-        # get pipelines of the artifact
-        artifact = Artifact.get_artifact_by_name(s, name)
-        connections_as_source = artifact.connections_as_source
-        connections_as_target = artifact.connections_as_target
-        # create list of all artifacts in the connection lists
-        target_neighbors = [connection.target for connection in connections_as_source]
-        source_neighbors = [connection.source for connection in connections_as_target]
-        neighbors = target_neighbors + source_neighbors
-        neighbors_dicts = [artifact_to_dict(neighbor) for neighbor in neighbors]
-        neighbors_response = [ArtifactResponse.model_validate(neighbor_dict) for neighbor_dict in neighbors_dicts]
-        # return {"neighbors": neighbors_response}
-        return neighbors_response
+    try:
+        neighbors = graph.get_neighbors(name)
+    except ValueError as err:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, str(err))
+
+    return encoder.respond([artifact_to_dict(neighbor) for neighbor in neighbors])
+
+
+@ArtifactRouter.get("/lineage/{name:path}", response_model=LineageResponse)
+async def get_lineage(
+    name: str,
+    request: Request,
+    response: Response,
+    encoder: Encoder,
+    session: Session,
+    direction: Literal["up", "down", "both"] = Query("both", description="Ancestors (up), descendants (down) or both"),
+    depth: Optional[int] = Query(None, ge=1, le=MAX_LINEAGE_DEPTH, description="Maximum number of connections"),
+    pipeline: Optional[str] = Query(None, description="Only follow connections within this pipeline"),
+):
+    """Get the ancestors and/or descendants of an artifact and the connections between them at once"""
+
+    check_etag(request, response, make_etag("dag", await LocalGraphCache.get_version()))
+
+    name = urllib.parse.unquote(name)
+    try:
+        async with session() as s:
+            await s.connection(execution_options=READ_OPTIONS)
+            artifact, rows = await Artifact.get_lineage(s, name, direction, depth, pipeline)
+    except ValueError as err:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, str(err))
+
+    artifacts = {artifact.id: {**artifact_to_dict(artifact), "depth": 0}}
+    connections = {}
+    for row in rows:
+        # on cycles, a connection is both upstream and downstream
+        connections[row.id] = {"source": row.source_id, "target": row.target_id, "pipeline": row.pipeline_id}
+        # an artifact reached via several connections is reported at the smallest depth
+        known = artifacts.get(row.artifact_id)
+        if known is None or abs(row.depth) < abs(known["depth"]):
+            artifacts[row.artifact_id] = {
+                "id": row.artifact_id,
+                "name": row.name,
+                "artifact_type": row.artifact_type,
+                "depth": row.depth,
+            }
+
+    return encoder.respond({"artifacts": list(artifacts.values()), "connections": list(connections.values())})
 
 
 @ArtifactRouter.get("/name/{name:path}")
-async def get_artifact_by_name(name: str):
-    """Get a single artifact by name"""
+async def get_artifact_by_name(name: str, request: Request, response: Response, encoder: Encoder):
+    """Get a single artifact by name. Tagged with the revision of the artifact as ETag."""
 
     name = urllib.parse.unquote(name)
-    # Search for the artifact in the database collection
-    artifact = artifact_collection.find_one({"name": name}, {"_id": 0})  # Omit the _id field
+    # Look up the revision first, which is answered from an index
+    revision = await get_collection("artifacts").find_one({"name": name}, {"_id": 1, REVISION_FIELD: 1})
+
+    if not revision:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Artifact not found")
+
+    # the _id changes when an artifact is deleted and registered again
+    check_etag(request, response, make_etag("artifact", revision["_id"], revision.get(REVISION_FIELD, 0)))
+
+    # Search for the artifact in the database collection, omitting the _id field
+    artifact = await get_collection("artifacts").find_one({"name": name}, RESPONSE_PROJECTION)
 
     if not artifact:
-        return HTTPException(status.HTTP_404_NOT_FOUND, detail="Artifact not found")
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Artifact not found")
 
-    return artifact
+    return encoder.respond(artifact)
 
 
 @ArtifactRouter.delete("/name/{name:path}")
@@ -92,11 +232,14 @@ async def remove_artifact_by_name(name: str, session: Session, user: IdentifiedU
     """Remove a single artifact by name"""
 
     name = urllib.parse.unquote(name)
-    artifact_collection.delete_one({"name": name})
 
     try:
-        with session.begin() as s:
-            response = Artifact.remove(s, name, user.id)
+        async with session.begin() as s:
+            response = await Artifact.remove(s, name, user.id)
+            # deleted only once the user is allowed to, and before the dagdb transaction commits, such that a failing
+            # delete rolls back the dagdb changes
+            await get_collection("artifacts").delete_one({"name": name})
+            await bump_artifacts_version()
     except ValueError as err:
         raise HTTPException(status.HTTP_404_NOT_FOUND, str(err))
     except PermissionError as err:
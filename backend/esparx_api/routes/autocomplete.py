@@ -0,0 +1,22 @@
+from typing import List
+
+from fastapi import APIRouter, Query
+
+from esparx_api.dagdb import CachedGraph, NameKind
+from esparx_api.dependencies import Encoder
+from esparx_api.dependencies.pagination import MAX_PAGE_SIZE
+
+AutocompleteRouter = APIRouter(tags=["Autocomplete"])
+
+
+@AutocompleteRouter.get("", response_model=List[str])
+async def autocomplete(
+    graph: CachedGraph,
+    encoder: Encoder,
+    prefix: str = "",
+    kind: NameKind = "artifact",
+    limit: int = Query(10, ge=1, le=MAX_PAGE_SIZE),
+):
+    """Get the first `limit` artifact or pipeline names (in lexicographic order) starting with `prefix`"""
+
+    return encoder.respond(graph.get_name_index(kind).search(prefix, limit))
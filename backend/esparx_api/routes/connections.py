@@ -1,12 +1,12 @@
 import urllib.parse
 from typing import List
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Response, status
+from sqlalchemy import Row
 
-from esparx_api.dagdb import Session
-from esparx_api.dependencies import IdentifiedUser
+from esparx_api.dagdb import CachedGraph, GraphSnapshot, Session
+from esparx_api.dependencies import Encoder, IdentifiedUser, IdPage
 from esparx_api.schemas import (
-    Artifact,
     Connection,
     ConnectionCreation,
     ConnectionResponse,
@@ -15,24 +15,25 @@ from esparx_api.schemas import (
 ConnectionRouter = APIRouter(tags=["Connections"])
 
 
-def artifact_to_dict(artifact: Artifact) -> dict:
+def artifact_to_dict(artifact: Row) -> dict:
     return {"name": artifact.name}
 
 
-def connection_to_dict(connection: Connection) -> dict:
-    return {"source": artifact_to_dict(connection.source), "target": artifact_to_dict(connection.target)}
+def connection_to_dict(graph: GraphSnapshot, connection: Row) -> dict:
+    return {
+        "source": artifact_to_dict(graph.artifact_by_id[connection.source_id]),
+        "target": artifact_to_dict(graph.artifact_by_id[connection.target_id]),
+    }
 
 
 @ConnectionRouter.get("/pipeline/{pipeline_name}", response_model=List[ConnectionResponse])
-async def get_connections_by_pipeline(pipeline_name: str, session: Session = Session):
+async def get_connections_by_pipeline(pipeline_name: str, graph: CachedGraph, encoder: Encoder):
     """Get all connections in a pipeline"""
 
     pipeline_name = urllib.parse.unquote(pipeline_name)
-    # Search for the connections in the dagdb
-    with session.begin() as s:
-        connections = Connection.get_connections_by_pipeline(s, pipeline_name)
-        connection_dicts = [connection_to_dict(connection) for connection in connections]
-        return connection_dicts
+    connections = graph.get_connections_by_pipeline(pipeline_name)
+    connection_dicts = [connection_to_dict(graph, connection) for connection in connections]
+    return encoder.respond(connection_dicts)
 
 
 @ConnectionRouter.post("/create")
@@ -40,8 +41,8 @@ async def create_connection(connection: ConnectionCreation, session: Session, us
     """Create a connection between two artifacts in a pipeline"""
 
     try:
-        with session.begin() as s:
-            response = Connection.create(session=s, param=connection, user_id=user.id)
+        async with session.begin() as s:
+            response = await Connection.create(session=s, param=connection, user_id=user.id)
     except PermissionError as err:
         return HTTPException(status.HTTP_401_UNAUTHORIZED, err)
 
@@ -49,10 +50,10 @@ async def create_connection(connection: ConnectionCreation, session: Session, us
 
 
 @ConnectionRouter.get("/", response_model=List[ConnectionResponse])
-async def get_connections(session: Session = Session):
-    """Get all connections"""
+async def get_connections(graph: CachedGraph, page: IdPage, response: Response, encoder: Encoder):
+    """Get all connections. Paginated by id, see the `X-Next-Cursor` header."""
 
-    with session.begin() as s:
-        connections = Connection.get_all_connections(s)
-        connection_dicts = [connection_to_dict(connection) for connection in connections]
-        return connection_dicts
+    connections = graph.get_all_connections(page.after, page.limit)
+    page.set_next_cursor(response, [connection.id for connection in connections])
+    connection_dicts = [connection_to_dict(graph, connection) for connection in connections]
+    return encoder.respond(connection_dicts)
@@ -0,0 +1,24 @@
+from fastapi import APIRouter
+
+from esparx_api.dagdb import CachedGraph
+from esparx_api.dependencies import Encoder
+from esparx_api.schemas import GraphResponse, LayoutResponse
+
+GraphRouter = APIRouter(tags=["Graph"])
+
+
+@GraphRouter.get("", response_model=GraphResponse)
+async def get_graph(graph: CachedGraph, encoder: Encoder):
+    """
+    Get the complete DAG (pipelines, artifacts with their pipeline memberships and connections) at once.
+    Encoded once per version of the DAG.
+    """
+
+    return encoder.respond(graph.get_encoded("graph", lambda: graph.graph, encoder.media_type))
+
+
+@GraphRouter.get("/layout", response_model=LayoutResponse)
+async def get_graph_layout(graph: CachedGraph, encoder: Encoder):
+    """Get the positions of all artifacts for drawing the complete DAG. Computed once per version of the DAG."""
+
+    return encoder.respond(graph.get_encoded(("layout", None), graph.get_layout, encoder.media_type))
@@ -0,0 +1,13 @@
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from esparx_api.metrics import get_registry
+
+MetricsRouter = APIRouter(tags=["Metrics"])
+
+
+@MetricsRouter.get("", response_class=Response)
+async def get_metrics():
+    """Get the metrics of the API in the Prometheus text format, e.g., request latencies and database timings"""
+
+    return Response(generate_latest(get_registry()), media_type=CONTENT_TYPE_LATEST)
@@ -1,20 +1,19 @@
 import urllib.parse
+from typing import List, Optional, Tuple
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Request, Response, status
+from sqlalchemy import Row
 
-from esparx_api.dagdb import Session
+from esparx_api.dagdb import READ_OPTIONS, CachedGraph, LocalGraphCache, Session
+from esparx_api.dependencies import Encoder, IdPage, check_etag, make_etag
 from esparx_api.dependencies.auth import IdentifiedUser
-from esparx_api.documentdb import DocumentDBClient
-from esparx_api.schemas import Artifact, Pipeline
+from esparx_api.documentdb import get_artifacts_version, get_collection
+from esparx_api.schemas import Artifact, LayoutResponse, Pipeline
 
 PipelineRouter = APIRouter(tags=["Pipelines"])
 
-db = DocumentDBClient.artifactdb
-artifact_collection = db.artifacts
-artifact_collection.create_index("name", unique=True)
 
-
-def pipeline_to_dict(pipeline: Pipeline) -> dict:
+def pipeline_to_dict(pipeline: Row) -> dict:
     return {
         "id": pipeline.id,
         "name": pipeline.name,
@@ -22,75 +21,101 @@ def pipeline_to_dict(pipeline: Pipeline) -> dict:
 
 
 @PipelineRouter.get("/")
-async def get_pipelines(session: Session = Session):
-    """Get all pipelines in the DAG database."""
+async def get_pipelines(
+    graph: CachedGraph, page: IdPage, response: Response, encoder: Encoder, owner_id: Optional[str] = None
+):
+    """Get all pipelines in the DAG database. Paginated by id, see the `X-Next-Cursor` header."""
 
-    with session.begin() as s:
-        pipelines = Pipeline.get_all_pipelines(s)
-        pipeline_dicts = [pipeline_to_dict(pipeline) for pipeline in pipelines]
-        return pipeline_dicts
+    pipelines = graph.get_all_pipelines(page.after, page.limit, owner_id)
+    page.set_next_cursor(response, [pipeline.id for pipeline in pipelines])
+    pipeline_dicts = [pipeline_to_dict(pipeline) for pipeline in pipelines]
+    return encoder.respond(pipeline_dicts)
 
 
 @PipelineRouter.get("/artifact/{artifact_name:path}")
-async def get_pipelines_by_artifact(artifact_name: str, session: Session = Session):
+async def get_pipelines_by_artifact(artifact_name: str, graph: CachedGraph, encoder: Encoder):
     """Get all pipelines in the DAG database that contain a specific artifact."""
 
-    with session.begin() as s:
-        pipelines = Pipeline.get_pipelines_by_artifact(s, artifact_name)
-        pipeline_dicts = [pipeline_to_dict(pipeline) for pipeline in pipelines]
-        return pipeline_dicts
+    pipelines = graph.get_pipelines_by_artifact(artifact_name)
+    pipeline_dicts = [pipeline_to_dict(pipeline) for pipeline in pipelines]
+    return encoder.respond(pipeline_dicts)
 
 
 @PipelineRouter.get("/results/{pipeline_name:path}")
-async def get_results_artifacts_by_pipeline(pipeline_name: str, session: Session = Session):
+async def get_results_artifacts_by_pipeline(
+    pipeline_name: str, request: Request, response: Response, encoder: Encoder, session: Session = Session
+):
     """Get all results artifacts in a pipeline"""
 
+    # the results depend on the DAG (artifacts of the pipeline) and the artifactdb (their values)
+    etag = make_etag("dag", await LocalGraphCache.get_version(), "artifacts", await get_artifacts_version())
+    check_etag(request, response, etag)
+
     pipeline_name = urllib.parse.unquote(pipeline_name)
-    results_artifacts_name_list = []
-    results_metrics_list = []
-    results_valuelists_list = []
-    # Search for the artifacts in the database collection
-    with session.begin() as s:
-        results_artifacts = Artifact.get_results_artifacts_by_pipeline(s, pipeline_name)
-        for result_artifact in results_artifacts:
-            results_artifacts_name_list.append(result_artifact.name)
-            # get artifact by name
-            artifact = artifact_collection.find_one({"name": result_artifact.name}, {"_id": 0})
-            results = artifact["results"]
-            results_values_list = []
-            for result in results:
-                results_metrics_list.append(result["metric"])
-                results_values_list.append(result["value"])
-            results_valuelists_list.append(results_values_list)
-
-    # always put 'persistence' as the first metric
+    async with session() as s:
+        await s.connection(execution_options=READ_OPTIONS)
+        results_artifacts = await Artifact.get_results_artifacts_by_pipeline(s, pipeline_name)
+    results_artifacts_name_list = [result_artifact.name for result_artifact in results_artifacts]
+
+    # always put 'persistence' as the first artifact
     # TODO: This solution does not generalize well, implement a more sophisticated solution
     if "Persistence Results" in results_artifacts_name_list:
-        keep_values = results_valuelists_list[results_artifacts_name_list.index("Persistence Results")]
-        results_valuelists_list.remove(keep_values)
-        results_valuelists_list.insert(0, keep_values)
         results_artifacts_name_list.remove("Persistence Results")
         results_artifacts_name_list.insert(0, "Persistence Results")
 
-    # define a new list where each element is a list of values for a metric
-    # the order of the values must fit to the name list, i.e.,
-    # list[0] corrsponds to list(set(results_metrics_list))[0]
-    # and element 0 in list[0] corresponds to results_artifacts_name_list[0]
-    value_list_by_metric = []
-    for metric in list(set(results_metrics_list)):
-        value_list = []
-        for i in range(len(results_artifacts_name_list)):
-            value_list.append(results_valuelists_list[i][results_metrics_list.index(metric)])
-        value_list_by_metric.append(value_list)
-
-    response = {
-        "results_artifacts_names": results_artifacts_name_list,
-        "results_metrics": list(set(results_metrics_list)),
-        "results_values": value_list_by_metric,
-    }
-    print(results_artifacts_name_list)
+    # Search for all the artifacts in the database collection at once
+    cursor = get_collection("artifacts").find(
+        {"name": {"$in": results_artifacts_name_list}}, {"_id": 0, "name": 1, "results": 1}
+    )
+    results_by_name = {entry["name"]: entry.get("results", []) async for entry in cursor}
+
+    metrics, values = pivot_results([results_by_name.get(name, []) for name in results_artifacts_name_list])
+
+    return encoder.respond(
+        {
+            "results_artifacts_names": results_artifacts_name_list,
+            "results_metrics": metrics,
+            "results_values": values,
+        }
+    )
+
+
+def pivot_results(results_per_artifact: List[List[dict]]) -> Tuple[List[str], List[List[Optional[float]]]]:
+    """
+    Arrange the results of several artifacts in a metric x artifact matrix.
+    Metrics are ordered by their first occurrence. Values missing for an artifact are None.
+    """
+
+    # imported on first use, as importing NumPy takes longer than starting the rest of the API
+    import numpy as np
 
-    return response
+    metric_index = {}
+    metric_indices, artifact_indices, values = [], [], []
+    for artifact_index, results in enumerate(results_per_artifact):
+        for result in results:
+            metric_indices.append(metric_index.setdefault(result["metric"], len(metric_index)))
+            artifact_indices.append(artifact_index)
+            values.append(result["value"])
+
+    matrix = np.full((len(metric_index), len(results_per_artifact)), np.nan)
+    matrix[metric_indices, artifact_indices] = values
+
+    # NaN is not valid JSON, so missing values are returned as null
+    return list(metric_index), np.where(np.isnan(matrix), None, matrix).tolist()
+
+
+@PipelineRouter.get("/{pipeline_name:path}/layout", response_model=LayoutResponse)
+async def get_pipeline_layout(pipeline_name: str, graph: CachedGraph, encoder: Encoder):
+    """Get the positions of the artifacts for drawing a pipeline. Computed once per version of the DAG."""
+
+    pipeline_name = urllib.parse.unquote(pipeline_name)
+    try:
+        layout = graph.get_encoded(
+            ("layout", pipeline_name), lambda: graph.get_layout(pipeline_name), encoder.media_type
+        )
+    except ValueError as err:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, str(err))
+    return encoder.respond(layout)
 
 
 @PipelineRouter.delete("/name/{name:path}")
@@ -100,8 +125,8 @@ async def remove_pipeline_by_name(name: str, session: Session, user: IdentifiedU
     name = urllib.parse.unquote(name)
 
     try:
-        with session.begin() as s:
-            response = Pipeline.remove(s, name, user.id)
+        async with session.begin() as s:
+            response = await Pipeline.remove(s, name, user.id)
     except ValueError as err:
         raise HTTPException(status.HTTP_404_NOT_FOUND, str(err))
     except PermissionError as err:
@@ -1,9 +1,27 @@
+from collections import defaultdict, deque
+from typing import Dict, List
+
 from fastapi import APIRouter, HTTPException, status
+from pymongo import UpdateOne
 
-from esparx_api.dagdb import Session
+from esparx_api.dagdb import READ_OPTIONS, Session
 from esparx_api.dependencies import IdentifiedUser
-from esparx_api.documentdb import DocumentDBClient
-from esparx_api.schemas import Artifact, ArtifactCreation, CodeArtifact
+from esparx_api.documentdb import (
+    CONTENT_HASH_FIELD,
+    REVISION_FIELD,
+    bump_artifacts_version,
+    get_collection,
+    get_content_hash,
+)
+from esparx_api.schemas import (
+    AnyArtifact,
+    Artifact,
+    ArtifactCreation,
+    BatchRegistration,
+    BatchRegistrationResponse,
+    CodeArtifact,
+    Connection,
+)
 from esparx_api.schemas.artifacts import (
     DatasetArtifact,
     HyperparametersArtifact,
@@ -11,57 +29,140 @@ from esparx_api.schemas.artifacts import (
     ParametersArtifact,
     ResultsArtifact,
 )
+from esparx_api.schemas.dag import COLORS
 
 ArtifactRegisterRouter = APIRouter(tags=["Artifacts"])
 
-db = DocumentDBClient.artifactdb
-artifact_collection = db.artifacts
-artifact_collection.create_index("name", unique=True)
-
 
 @ArtifactRegisterRouter.post("/code")
 async def register_code_artifact(session: Session, user: IdentifiedUser, artifact: CodeArtifact):
     """Register code artifact"""
 
-    return register_artifact(session, user, artifact)
+    return await register_artifact(session, user, artifact)
 
 
 @ArtifactRegisterRouter.post("/hyperparameters")
 async def register_hyperparameters_artifact(session: Session, user: IdentifiedUser, artifact: HyperparametersArtifact):
     """Register hyperparameters artifact"""
 
-    return register_artifact(session, user, artifact)
+    return await register_artifact(session, user, artifact)
 
 
 @ArtifactRegisterRouter.post("/dataset")
 async def register_dataset_artifact(session: Session, user: IdentifiedUser, artifact: DatasetArtifact):
     """Register dataset artifact"""
 
-    return register_artifact(session, user, artifact)
+    return await register_artifact(session, user, artifact)
 
 
 @ArtifactRegisterRouter.post("/model")
 async def register_model_artifact(session: Session, user: IdentifiedUser, artifact: ModelArtifact):
     """Register model artifact"""
 
-    return register_artifact(session, user, artifact)
+    return await register_artifact(session, user, artifact)
 
 
 @ArtifactRegisterRouter.post("/parameters")
 async def register_parameters_artifact(session: Session, user: IdentifiedUser, artifact: ParametersArtifact):
     """Register parameters artifact"""
 
-    return register_artifact(session, user, artifact)
+    return await register_artifact(session, user, artifact)
+
+
+@ArtifactRegisterRouter.post("/batch", response_model=BatchRegistrationResponse)
+async def register_batch(session: Session, user: IdentifiedUser, batch: BatchRegistration):
+    """Register artifacts of different types and connections between them at once.
+
+    Artifacts are registered after their source artifact if it is part of the batch. All dagdb operations run
+    in a single transaction with a fixed number of statements, and all artifactdb writes are sent as one bulk write.
+    The status is reported per item.
+    """
+
+    artifacts = batch.artifacts
+    artifact_statuses = [None] * len(artifacts)
+    connection_statuses = []
+
+    def report(index: int, artifact_status: str, message: str):
+        artifact_statuses[index] = {"name": artifacts[index].name, "status": artifact_status, "message": message}
+
+    first_indices = get_first_indices(artifacts)
+    order = sort_by_source(artifacts)
+    for index in sorted(set(range(len(artifacts))) - set(order)):
+        if first_indices[artifacts[index].name] != index:
+            report(index, "failed", "An artifact of the same name appears earlier in the batch.")
+        else:
+            report(index, "failed", "Source dependencies within the batch are cyclic.")
+
+    content_hashes = await get_content_hashes([artifact.name for artifact in artifacts])
+
+    registered = []
+    for index in order:
+        if artifacts[index].source_name and not artifacts[index].pipeline_name:
+            report(index, "failed", "Source artifact specified without pipeline.")
+        else:
+            registered.append(index)
+
+    operations = []
+    async with session.begin() as s:
+        results = await Artifact.create_many(
+            session=s,
+            params=[
+                ArtifactCreation(
+                    name=artifacts[index].name,
+                    artifact_type=artifacts[index].artifact_type,
+                    pipeline=artifacts[index].pipeline_name,
+                    source=artifacts[index].source_name,
+                )
+                for index in registered
+            ],
+            user_id=user.id,
+        )
+        for index, result in zip(registered, results):
+            artifact = artifacts[index]
+            if isinstance(result, Exception):
+                report(index, "failed", str(result))
+                continue
+
+            content_hash = get_content_hash(to_entry_data(artifact))
+            metadata_unchanged = content_hashes.get(artifact.name) == content_hash
+            if not result.can_modify:
+                report(index, "linked", result.message)
+            elif metadata_unchanged and not result.changed:
+                report(index, "unchanged", result.message)
+            elif metadata_unchanged:
+                report(index, "updated", result.message)
+            else:
+                operations.append(UpdateOne({"name": artifact.name}, to_entry_update(artifact), upsert=True))
+                if result.created:
+                    report(index, "created", result.message)
+                else:
+                    report(index, "updated", result.message + "Artifact metadata updated successfully.")
+
+        responses = await Connection.create_many(session=s, params=batch.connections, user_id=user.id)
+        for connection, response in zip(batch.connections, responses):
+            connection_status = connection.model_dump()
+            if isinstance(response, Exception):
+                connection_statuses.append({**connection_status, "status": "failed", "message": str(response)})
+            else:
+                connection_statuses.append({**connection_status, "status": "connected", "message": response})
+
+        # written before the dagdb transaction commits, such that a failing write rolls back the dagdb changes
+        if operations:
+            await get_collection("artifacts").bulk_write(operations, ordered=True)
+            await bump_artifacts_version()
+            print(f"{len(operations)} artifacts written to artifactdb in one bulk write.")
+
+    return {"artifacts": artifact_statuses, "connections": connection_statuses}
 
 
 @ArtifactRegisterRouter.post("/results")
 async def register_results_artifact(session: Session, user: IdentifiedUser, artifact: ResultsArtifact):
     """Register results artifact"""
 
-    return register_artifact(session, user, artifact)
+    return await register_artifact(session, user, artifact)
 
 
-def register_artifact(
+async def register_artifact(
     session: Session,
     user: IdentifiedUser,
     artifact: (
@@ -70,51 +171,11 @@ def register_artifact(
 ):
     """Register artifacts of different types"""
 
-    entry_data = artifact.model_dump()
-
-    pipeline = entry_data.get("pipeline_name", None)
-    source = entry_data.get("source_name", None)
+    pipeline = artifact.pipeline_name
+    source = artifact.source_name
 
     if source and not pipeline:
         return {"error": "Source artifact specified without pipeline."}
-    if source:
-        source_entry = artifact_collection.find_one({"name": entry_data["source_name"]})
-        if not source_entry:
-            return {"error": "Source artifact does not exist. Create the source artifact first."}
-
-    artifact_exists = False
-    can_modify = False
-    update_flag = False
-    with session.begin() as s:
-        db_artifact = Artifact.get_artifact_by_name(session=s, artifact_name=artifact.name)
-
-        if db_artifact:
-            artifact_exists = True
-            can_modify = db_artifact.can_modify(user.id)
-
-    if (not artifact_exists) or can_modify:
-        if entry_data.get("source_url"):
-            entry_data["source_url"] = str(entry_data["source_url"])
-        if entry_data.get("download_url"):
-            entry_data["download_url"] = str(entry_data["download_url"])
-
-        # remove pipeline-related logic
-        entry_data.pop("pipeline_name", None)
-        entry_data.pop("source_name", None)
-
-        # If artifact does not exist in artifactdb, insert it
-        if not artifact_exists:
-            artifact_collection.insert_one(entry_data)
-            print("New artifact inserted successfully in artifactdb.")
-
-        # If user has the right to modify, update artifact
-        else:
-            artifact_collection.update_one({"name": artifact.name}, {"$set": entry_data})
-            # note that at least the 'created_at' field will be updated
-            print("Updated artifact successfully in artifactdb.")
-            update_flag = True
-    else:
-        print("An artifact with this had been created by another user. A PermissionError will be returned.")
 
     # Handle dagdb operations (logic is inside the create method)
     node_data = ArtifactCreation(
@@ -124,13 +185,117 @@ def register_artifact(
         source=source,
     )
 
+    content_hash = get_content_hash(to_entry_data(artifact))
+    content_hashes = await get_content_hashes([artifact.name])
+    metadata_unchanged = content_hashes.get(artifact.name) == content_hash
+
+    # repeated registrations, e.g., at the start of every training run, write nothing
+    if metadata_unchanged:
+        async with session() as s:
+            await s.connection(execution_options=READ_OPTIONS)
+            unchanged = await Artifact.is_registered(session=s, param=node_data, user_id=user.id)
+        if unchanged:
+            print(f"Artifact '{artifact.name}' is unchanged, nothing was written.")
+            return {
+                "message": f"Artifact {COLORS['artifact']}{artifact.name}{COLORS['reset']} is {COLORS['unchanged']}UNCHANGED{COLORS['reset']}.\n"  # noqa: E501
+            }
+
     try:
-        with session.begin() as s:
-            response = Artifact.create(session=s, param=node_data, user_id=user.id)
+        async with session.begin() as s:
+            result = await Artifact.create(session=s, param=node_data, user_id=user.id)
+
+            # If user has the right to modify and the content changed, insert or update the artifact in artifactdb.
+            # Written before the dagdb transaction commits, such that a failing write rolls back the dagdb changes.
+            if result.can_modify and not metadata_unchanged:
+                await get_collection("artifacts").update_one(
+                    {"name": artifact.name}, to_entry_update(artifact), upsert=True
+                )
+                await bump_artifacts_version()
+                print("Artifact written successfully to artifactdb.")
+            elif not result.can_modify:
+                print("An artifact with this name has been created by another user, its metadata is not updated.")
+    except ValueError as err:
+        return {"error": str(err)}
     except PermissionError as err:
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, detail=str(err))
 
-    if update_flag:
+    response = result.message
+    if result.can_modify and not result.created and not metadata_unchanged:
+        # note that at least the 'created_at' field was updated
         response += "Artifact metadata updated successfully."
 
     return {"message": response}
+
+
+def to_entry_data(artifact: AnyArtifact) -> dict:
+    """Convert an artifact into its artifactdb entry"""
+
+    entry_data = artifact.model_dump()
+
+    if entry_data.get("source_url"):
+        entry_data["source_url"] = str(entry_data["source_url"])
+    if entry_data.get("download_url"):
+        entry_data["download_url"] = str(entry_data["download_url"])
+
+    # remove pipeline-related logic
+    entry_data.pop("pipeline_name", None)
+    entry_data.pop("source_name", None)
+
+    return entry_data
+
+
+def to_entry_update(artifact: AnyArtifact) -> dict:
+    """
+    Get the update which overwrites the artifactdb entry of an artifact, including its content hash, and increments
+    its revision
+    """
+
+    entry_data = to_entry_data(artifact)
+    return {"$set": {**entry_data, CONTENT_HASH_FIELD: get_content_hash(entry_data)}, "$inc": {REVISION_FIELD: 1}}
+
+
+async def get_content_hashes(names: List[str]) -> Dict[str, str]:
+    """Get the content hashes of the artifactdb entries with the given names in one command"""
+
+    cursor = get_collection("artifacts").find({"name": {"$in": names}}, {"_id": 0, "name": 1, CONTENT_HASH_FIELD: 1})
+    return {entry["name"]: entry.get(CONTENT_HASH_FIELD) async for entry in cursor}
+
+
+def get_first_indices(artifacts: List[AnyArtifact]) -> Dict[str, int]:
+    """Get the index of the first artifact of a batch with each name"""
+
+    first_indices = {}
+    for index, artifact in enumerate(artifacts):
+        first_indices.setdefault(artifact.name, index)
+    return first_indices
+
+
+def sort_by_source(artifacts: List[AnyArtifact]) -> List[int]:
+    """
+    Get the indices of the artifacts of a batch in dependency order, i.e., every artifact is placed after the
+    artifact of the batch that is named like its source. An artifact named like an earlier one and artifacts on a
+    dependency cycle are left out. An artifact that is its own source does not depend on itself.
+    """
+
+    first_indices = get_first_indices(artifacts)
+    indices = sorted(first_indices.values())
+
+    dependents = defaultdict(list)
+    num_dependencies = [0] * len(artifacts)
+    for index in indices:
+        source_index = first_indices.get(artifacts[index].source_name)
+        if source_index is not None and source_index != index:
+            dependents[source_index].append(index)
+            num_dependencies[index] += 1
+
+    queue = deque(index for index in indices if num_dependencies[index] == 0)
+    order = []
+    while queue:
+        index = queue.popleft()
+        order.append(index)
+        for dependent in dependents[index]:
+            num_dependencies[dependent] -= 1
+            if num_dependencies[dependent] == 0:
+                queue.append(dependent)
+
+    return order
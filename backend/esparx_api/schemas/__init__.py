@@ -5,16 +5,25 @@ from .artifacts import (
     HyperparametersArtifact,
     ParametersArtifact,
     ResultsArtifact,
-    ArtifactType
+    ArtifactType,
+    AnyArtifact,
+    BatchRegistration,
+    BatchRegistrationResponse,
 )
 from .dag import (
     Base,
     ArtifactResponse,
     ArtifactCreation,
+    ArtifactCreationResult,
     Artifact,
     Pipeline,
     Connection,
     ConnectionResponse,
     ConnectionCreation,
+    PipelineResponse,
+    GraphResponse,
+    GraphVersion,
+    LineageResponse,
+    LayoutResponse,
 )
 from .user import User
@@ -1,9 +1,11 @@
 import enum
 from datetime import datetime
-from typing import List, Literal, Optional
+from typing import Annotated, List, Literal, Optional, Union
 
 import pytz
-from pydantic import BaseModel, HttpUrl
+from pydantic import BaseModel, Field, HttpUrl
+
+from .dag import ConnectionCreation
 
 
 class ArtifactType(enum.Enum):
@@ -143,3 +145,51 @@ class ResultsArtifact(BaseModel):
     created_at: datetime = datetime.now(pytz.timezone("Europe/Berlin"))
     pipeline_name: Optional[str] = None
     source_name: Optional[str] = None
+
+
+AnyArtifact = Annotated[
+    Union[DatasetArtifact, CodeArtifact, ModelArtifact, HyperparametersArtifact, ParametersArtifact, ResultsArtifact],
+    Field(discriminator="artifact_type"),
+]
+"""Artifact of any type. The type is selected via the (then required) `artifact_type` field."""
+
+
+class BatchRegistration(BaseModel):
+    """Schema for registering multiple artifacts and connections at once"""
+
+    artifacts: List[AnyArtifact]
+    """
+    Artifacts to register. Artifacts are registered after their source artifact, if it is part of the batch. An
+    artifact named like an earlier artifact of the batch fails.
+    """
+
+    connections: List[ConnectionCreation] = []
+    """Connections to create once all artifacts are registered"""
+
+
+class BatchArtifactStatus(BaseModel):
+    """Registration status of a single artifact of a batch"""
+
+    name: str
+    status: Literal["created", "updated", "unchanged", "linked", "failed"]
+    """
+    `unchanged` means that the artifact had been registered with the same content and pipeline before, so nothing
+    was written. `linked` means that an existing artifact of another user was only linked to the pipeline.
+    """
+
+    message: str
+
+
+class BatchConnectionStatus(BaseModel):
+    """Status of a single connection of a batch"""
+
+    source: str
+    target: str
+    pipeline: str
+    status: Literal["connected", "failed"]
+    message: str
+
+
+class BatchRegistrationResponse(BaseModel):
+    artifacts: List[BatchArtifactStatus]
+    connections: List[BatchConnectionStatus]
@@ -1,17 +1,31 @@
 from __future__ import annotations
 
-from typing import List, Optional
+from typing import Dict, Iterable, List, Literal, Optional, Sequence, Set, Tuple, Union
 
 from pydantic import BaseModel
-from sqlalchemy import Column, ForeignKey, Integer, String, Table, and_, select
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    ForeignKey,
+    Index,
+    Integer,
+    Row,
+    String,
+    Table,
+    delete,
+    func,
+    literal,
+    select,
+    union_all,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import (
     Mapped,
-    Session,
     aliased,
     declarative_base,
-    joinedload,
     mapped_column,
     relationship,
+    selectinload,
 )
 
 # Define ANSI color codes
@@ -21,37 +35,79 @@ COLORS = {
     "created": "\033[1;92m",  # Green
     "connected": "\033[1;93m",  # Yellow
     "deleted": "\033[1;91m",  # Red
+    "unchanged": "\033[1;90m",  # Gray
     "reset": "\033[0m",  # Reset color
 }
 
 Base = declarative_base()
 
+MAX_LINEAGE_DEPTH = 100
+"""Maximum number of connections followed from an artifact when querying its lineage"""
 
-artifact_pipelines = Table(
-    "artifact_pipelines",
-    Base.metadata,
-    Column("left_id", ForeignKey("artifacts.id"), primary_key=True),
-    Column("right_id", ForeignKey("pipelines.id"), primary_key=True),
-)
 
-connection_sourceartifact = Table(
-    "connection_sourceartifact",
-    Base.metadata,
-    Column("left_id", ForeignKey("connections.id", ondelete="SET NULL"), primary_key=True),
-    Column("right_id", ForeignKey("artifacts.id", ondelete="CASCADE"), primary_key=True),
-)
+def insert(session: AsyncSession, table):
+    """Get an INSERT statement supporting ON CONFLICT clauses in the dialect of the session (Postgres or SQLite)"""
 
-connection_targetartifact = Table(
-    "connection_targetartifact",
-    Base.metadata,
-    Column("left_id", ForeignKey("connections.id", ondelete="SET NULL"), primary_key=True),
-    Column("right_id", ForeignKey("artifacts.id", ondelete="CASCADE"), primary_key=True),
-)
+    # the dialect packages are imported here, as the engine loads only one of them
+    from sqlalchemy.dialects import postgresql, sqlite
+
+    dialect = session.get_bind().dialect.name
+    return sqlite.insert(table) if dialect == "sqlite" else postgresql.insert(table)
+
+
+async def get_by_names(session: AsyncSession, entity, names: Iterable[str], *columns) -> Dict[str, Row]:
+    """Get the `name` and `columns` of the rows with the given names in one statement, by name"""
+
+    names = set(names)
+    if not names:
+        return {}
+    rows = await session.execute(select(entity.name, *columns).where(entity.name.in_(names)))
+    return {row.name: row for row in rows}
+
+
+async def insert_missing(
+    session: AsyncSession, entity, values: List[dict], *columns
+) -> Tuple[Dict[str, Row], Dict[str, Row]]:
+    """
+    Insert rows in one statement, skipping rows whose name exists already. The rows are meant to be looked up
+    beforehand, as most registrations repeat existing names, and a conflicting insert would still consume an id
+    of the sequence in Postgres.
+    Returns the `name` and `columns` of the inserted rows and of the rows inserted by concurrent transactions since
+    the lookup, by name. A concurrent insert of the same name does not fail on the unique constraint of the name.
+    """
+
+    if not values:
+        return {}, {}
+    stmt = (
+        insert(session, entity)
+        .values(values)
+        .on_conflict_do_nothing(index_elements=["name"])
+        .returning(entity.name, *columns)
+    )
+    inserted = {row.name: row for row in await session.execute(stmt)}
+    # inserted by a concurrent transaction after the lookup, which is visible once it committed
+    concurrent = await get_by_names(
+        session, entity, [row["name"] for row in values if row["name"] not in inserted], *columns
+    )
+    return inserted, concurrent
 
-connection_pipeline = Table(
-    "connection_pipeline",
+
+def claim(created: Set, key) -> bool:
+    """
+    Check whether `key` was created, such that only the first of several registrations of the same name, link or
+    connection reports it as created
+    """
+
+    if key in created:
+        created.remove(key)
+        return True
+    return False
+
+
+artifact_pipelines = Table(
+    "artifact_pipelines",
     Base.metadata,
-    Column("left_id", ForeignKey("connections.id"), primary_key=True),
+    Column("left_id", ForeignKey("artifacts.id"), primary_key=True),
     Column("right_id", ForeignKey("pipelines.id"), primary_key=True),
 )
 
@@ -72,6 +128,22 @@ class ArtifactCreation(BaseModel):
     """Name of the source artifact in pipeline"""
 
 
+class ArtifactCreationResult(BaseModel):
+    """Outcome of creating an artifact in the dagdb"""
+
+    message: str
+    """Report of the dagdb operations"""
+
+    created: bool
+    """Whether the artifact was created, otherwise it existed and was linked"""
+
+    can_modify: bool
+    """Whether the user may modify the metadata of the artifact, i.e., created it"""
+
+    changed: bool
+    """Whether the dagdb was changed, otherwise the artifact had been registered like this before"""
+
+
 class ConnectionCreation(BaseModel):
     """Schema for a connection"""
 
@@ -98,6 +170,96 @@ class ConnectionResponse(BaseModel):
     target: ArtifactResponseForConnections
 
 
+class PipelineResponse(BaseModel):
+    id: int
+    name: str
+
+
+class GraphArtifactResponse(ArtifactResponse):
+    pipelines: List[int]
+    """IDs of the pipelines the artifact is part of"""
+
+
+class GraphConnectionResponse(BaseModel):
+    source: int
+    """ID of the source artifact"""
+
+    target: int
+    """ID of the target artifact"""
+
+    pipeline: int
+    """ID of the pipeline the connection belongs to"""
+
+
+class GraphResponse(BaseModel):
+    """The complete DAG (all pipelines, artifacts and connections) in one payload"""
+
+    pipelines: List[PipelineResponse]
+    artifacts: List[GraphArtifactResponse]
+    connections: List[GraphConnectionResponse]
+
+
+class LayoutArtifactResponse(ArtifactResponse):
+    level: int
+    """Column of the artifact, counted from the left. Connections always point to a higher level."""
+
+    x: float
+    y: float
+
+
+class LayoutResponse(BaseModel):
+    """Artifacts with their positions in the drawing of a DAG, and the connections between them"""
+
+    artifacts: List[LayoutArtifactResponse]
+    connections: List[GraphConnectionResponse]
+
+
+class LineageArtifactResponse(ArtifactResponse):
+    depth: int
+    """Number of connections between this artifact and the queried artifact. Negative for ancestors."""
+
+
+class LineageResponse(BaseModel):
+    """The ancestors and/or descendants of an artifact together with the connections between them"""
+
+    artifacts: List[LineageArtifactResponse]
+    connections: List[GraphConnectionResponse]
+
+
+class GraphVersion(Base):
+    """
+    Version counter of the SQL/DAG database.
+    Every write to the DAG bumps the version within its transaction. As the counter lives in the database,
+    all API workers agree on it and can tell whether their cached copy of the DAG is outdated.
+    """
+
+    __tablename__ = "graph_version"
+
+    id: Mapped[int] = mapped_column("id", Integer, primary_key=True, nullable=False)
+    """identifier of the single counter row"""
+
+    version: Mapped[int] = mapped_column("version", BigInteger, nullable=False, default=0)
+    """current version of the DAG"""
+
+    @classmethod
+    async def get_version(cls, session: AsyncSession) -> int:
+        """Get the current version of the DAG"""
+
+        return await session.scalar(select(cls.version).where(cls.id == 1)) or 0
+
+    @classmethod
+    async def bump(cls, session: AsyncSession) -> int:
+        """Increment the version of the DAG. Becomes visible to other workers when the transaction commits."""
+
+        stmt = (
+            insert(session, cls)
+            .values(id=1, version=1)
+            .on_conflict_do_update(index_elements=["id"], set_={"version": cls.version + 1})
+            .returning(cls.version)
+        )
+        return await session.scalar(stmt)
+
+
 class Artifact(Base):
     """Represenation of an artifact in the SQL/DAG database"""
 
@@ -122,15 +284,17 @@ class Artifact(Base):
     """
 
     connections_as_source: Mapped[List[Connection]] = relationship(
-        secondary=connection_sourceartifact,
+        foreign_keys="Connection.source_id",
         back_populates="source",
         cascade="delete",
+        passive_deletes=True,
     )
 
     connections_as_target: Mapped[List[Connection]] = relationship(
-        secondary=connection_targetartifact,
+        foreign_keys="Connection.target_id",
         back_populates="target",
         cascade="delete",
+        passive_deletes=True,
     )
 
     def can_modify(self, user_id: str) -> bool:
@@ -139,158 +303,314 @@ class Artifact(Base):
         return self.owner_id == user_id
 
     @classmethod
-    def get_all_artifacts(cls, session: Session) -> List["Artifact"]:
-        """Get all artifacts"""
+    async def get_artifact_by_name(cls, session: AsyncSession, artifact_name: str, *options) -> Artifact:
+        """Get an artifact by name. Relationships needed afterwards must be eagerly loaded via `options`."""
 
-        return session.query(cls).all()
+        return await session.scalar(select(cls).options(*options).filter_by(name=artifact_name).limit(1))
 
     @classmethod
-    def get_artifact_by_name(cls, session: Session, artifact_name: str) -> Artifact:
-        """Get an artifact by name"""
+    async def get_lineage(
+        cls,
+        session: AsyncSession,
+        artifact_name: str,
+        direction: Literal["up", "down", "both"] = "both",
+        depth: Optional[int] = None,
+        pipeline_name: Optional[str] = None,
+    ) -> Tuple["Artifact", List[Row]]:
+        """
+        Get the connections leading to the ancestors (up) and/or descendants (down) of an artifact
+        within `depth` connections, optionally only following connections of one pipeline.
+        All of them are collected by a single recursive query.
+        Returns the artifact and one row per connection with the artifact it leads to (`artifact_id`, `name`,
+        `artifact_type`) and the smallest `depth` at which it is reached, which is negative for ancestors.
+        """
 
-        return session.query(cls).filter_by(name=artifact_name).first()
+        artifact = await cls.get_artifact_by_name(session, artifact_name)
+        if not artifact:
+            raise ValueError("Oh no! The artifact could not be found!")
 
-    @classmethod
-    def get_artifacts_by_pipeline(cls, session: Session, pipeline_name: str) -> List["Artifact"]:
-        """Get all artifacts in a pipeline"""
+        pipeline = None
+        if pipeline_name is not None:
+            pipeline = await Pipeline.get_pipeline_by_name(session, pipeline_name)
+            if not pipeline:
+                raise ValueError("Oh no! The pipeline could not be found!")
 
-        stmt = (
-            select(cls)
-            .options(joinedload(cls.pipelines))
-            .join(artifact_pipelines, cls.id == artifact_pipelines.c.left_id)  # Join artifacts with artifact_pipelines
-            .join(Pipeline, artifact_pipelines.c.right_id == Pipeline.id)  # Join artifact_pipelines with pipelines
-            .where(Pipeline.name == pipeline_name)  # Filter by pipeline name
-        )
-        return session.execute(stmt).unique().scalars().all()
+        max_depth = min(depth or MAX_LINEAGE_DEPTH, MAX_LINEAGE_DEPTH)
+
+        def closure(downstream: bool):
+            # connections are followed from `near` to `far`, i.e., from source to target when going downstream
+            near, far = (Connection.source_id, Connection.target_id)
+            if not downstream:
+                near, far = far, near
+            columns = [Connection.id, Connection.source_id, Connection.target_id, Connection.pipeline_id]
+
+            anchor = select(*columns, far.label("artifact_id"), literal(1, Integer).label("depth")).where(
+                near == artifact.id
+            )
+            if pipeline:
+                anchor = anchor.where(Connection.pipeline_id == pipeline.id)
+            cte = anchor.cte("downstream" if downstream else "upstream", recursive=True)
+
+            # UNION instead of UNION ALL and the depth limit make the recursion terminate even on cycles
+            step = (
+                select(*columns, far, cte.c.depth + 1)
+                .join(cte, near == cte.c.artifact_id)
+                .where(cte.c.depth < max_depth)
+            )
+            if pipeline:
+                step = step.where(Connection.pipeline_id == pipeline.id)
+            cte = cte.union(step)
+
+            keys = [cte.c.id, cte.c.source_id, cte.c.target_id, cte.c.pipeline_id, cte.c.artifact_id]
+            return (
+                select(
+                    *keys,
+                    cls.name,
+                    cls.artifact_type,
+                    (func.min(cte.c.depth) * (1 if downstream else -1)).label("depth"),
+                )
+                .join(cls, cls.id == cte.c.artifact_id)
+                .group_by(*keys, cls.name, cls.artifact_type)
+            )
+
+        closures = []
+        if direction in ("up", "both"):
+            closures.append(closure(downstream=False))
+        if direction in ("down", "both"):
+            closures.append(closure(downstream=True))
+        stmt = closures[0] if len(closures) == 1 else union_all(*closures)
+
+        return artifact, (await session.execute(stmt)).all()
 
     @classmethod
-    def get_results_artifacts_by_pipeline(cls, session: Session, pipeline_name: str) -> List["Artifact"]:
-        """Get all results artifacts in a pipeline"""
+    async def get_results_artifacts_by_pipeline(cls, session: AsyncSession, pipeline_name: str) -> Sequence[Row]:
+        """Get (id, name) of all results artifacts in a pipeline"""
 
         stmt = (
-            select(cls)
-            .options(joinedload(cls.pipelines))
+            select(cls.id, cls.name)
             .join(artifact_pipelines, cls.id == artifact_pipelines.c.left_id)  # Join artifacts with artifact_pipelines
             .join(Pipeline, artifact_pipelines.c.right_id == Pipeline.id)  # Join artifact_pipelines with pipelines
             .where(Pipeline.name == pipeline_name)  # Filter by pipeline name
             .where(cls.artifact_type == "results")  # Filter by artifact type
         )
-        return session.execute(stmt).unique().scalars().all()
+        return (await session.execute(stmt)).all()
 
     @classmethod
-    def create(cls, session: Session, param: ArtifactCreation, user_id: str) -> str:
+    async def create(cls, session: AsyncSession, param: ArtifactCreation, user_id: str) -> ArtifactCreationResult:
         """
         Dagdb operation to create an artifact and link it to a pipeline.
         See Miro graphic for underlying logic.
+        Raises a ValueError if the source artifact does not exist, and a PermissionError if the pipeline was created
+        by another user.
         """
 
-        artifact = session.query(Artifact).filter_by(name=param.name).first()
-        if not artifact:
-            artifact = Artifact(
-                name=param.name,
-                artifact_type=param.artifact_type,
-                owner_id=user_id,
+        (result,) = await cls.create_many(session, [param], user_id)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    @classmethod
+    async def create_many(
+        cls, session: AsyncSession, params: List[ArtifactCreation], user_id: str
+    ) -> List[Union[ArtifactCreationResult, ValueError, PermissionError]]:
+        """
+        Dagdb operation to create artifacts one after another like `create`, where an artifact may have one of the
+        artifacts before it as source.
+        All names are looked up at once, and the artifacts, pipelines, links and connections are written with one
+        INSERT ... ON CONFLICT each, so that registering any number of artifacts issues a fixed number of statements
+        and concurrent registrations of the same names do not fail.
+        Returns the result of every artifact, or the error `create` would raise, in which case nothing was written
+        for the artifact.
+        """
+
+        artifacts = await get_by_names(
+            session,
+            cls,
+            [param.name for param in params] + [param.source for param in params if param.source],
+            cls.id,
+            cls.owner_id,
+        )
+        pipelines = await get_by_names(
+            session, Pipeline, [param.pipeline for param in params if param.pipeline], Pipeline.id, Pipeline.owner_id
+        )
+
+        def check() -> List[Optional[Exception]]:
+            # the artifacts created before an artifact count as existing sources
+            names = set(artifacts)
+            errors = []
+            for param in params:
+                error = None
+                if param.source and param.source not in names:
+                    error = ValueError("Source artifact does not exist. Create the source artifact first.")
+                elif param.pipeline in pipelines and pipelines[param.pipeline].owner_id != user_id:
+                    error = PermissionError("Whoops! Users can only modify pipelines they've created themselves!")
+                else:
+                    names.add(param.name)
+                errors.append(error)
+            return errors
+
+        def pipelines_used() -> List[str]:
+            # in the order of the artifacts, such that the pipelines get their ids in this order
+            return list(
+                dict.fromkeys(param.pipeline for param, error in zip(params, errors) if not error and param.pipeline)
             )
-            session.add(artifact)
-            session.flush()
-            print(f"Artifact '{artifact.name}' created.")
-            response = f"{COLORS['created']}CREATED{COLORS['reset']} artifact {COLORS['artifact']}{artifact.name}{COLORS['reset']}.\n"  # noqa: E501
-        else:
-            print(f"Artifact '{artifact.name}' already exists.")
-            response = f"Artifact {COLORS['artifact']}{artifact.name}{COLORS['reset']} already exists.\n"
-
-        if not param.pipeline:
-            print("No pipeline linked.")
-            response += "No pipeline linked.\n"  # Done.
-
-        else:
-            pipeline = session.query(Pipeline).filter_by(name=param.pipeline).first()
-            if not pipeline:
-                pipeline = Pipeline(name=param.pipeline, artifacts=[artifact], owner_id=user_id)
-                session.add(pipeline)
-                session.flush()
-                print(f"Pipeline '{pipeline.name}' created and linked to artifact '{artifact.name}'.")
-                response += f"{COLORS['created']}CREATED{COLORS['reset']} pipeline {COLORS['pipeline']}{pipeline.name}{COLORS['reset']}.\n"
-                response += f"{COLORS['connected']}CONNECTED{COLORS['reset']} artifact {COLORS['artifact']}{artifact.name}{COLORS['reset']} to pipeline {COLORS['pipeline']}{pipeline.name}{COLORS['reset']}.\n"  # noqa: E501
+
+        errors = check()
+        created_pipelines, concurrent_pipelines = await insert_missing(
+            session,
+            Pipeline,
+            [{"name": name, "owner_id": user_id} for name in pipelines_used() if name not in pipelines],
+            Pipeline.id,
+            Pipeline.owner_id,
+        )
+        pipelines.update(created_pipelines)
+        if concurrent_pipelines:
+            pipelines.update(concurrent_pipelines)
+            # the artifacts of pipelines created by other users in the meantime fail, and so may the artifacts having
+            # them as source. Pipelines created for those artifacts only are removed again.
+            errors = check()
+            unused = set(created_pipelines) - set(pipelines_used())
+            if unused:
+                await session.execute(delete(Pipeline).where(Pipeline.name.in_(unused)))
+                for name in unused:
+                    del pipelines[name], created_pipelines[name]
+
+        new_artifacts = {}
+        for param, error in zip(params, errors):
+            if not error and param.name not in artifacts:
+                new_artifacts.setdefault(
+                    param.name, {"name": param.name, "artifact_type": param.artifact_type, "owner_id": user_id}
+                )
+        created_artifacts, concurrent_artifacts = await insert_missing(
+            session, cls, list(new_artifacts.values()), cls.id, cls.owner_id
+        )
+        artifacts.update(created_artifacts)
+        artifacts.update(concurrent_artifacts)
+
+        linked = [param for param, error in zip(params, errors) if not error and param.pipeline]
+        created_connections = await Connection.connect(
+            session,
+            [
+                (artifacts[param.source].id, artifacts[param.name].id, pipelines[param.pipeline].id)
+                for param in linked
+                if param.source
+            ],
+        )
+        links = [(artifacts[param.name].id, pipelines[param.pipeline].id) for param in linked]
+        # the source is linked to the pipeline when the connection is created
+        links += [
+            (artifacts[param.source].id, pipelines[param.pipeline].id)
+            for param in linked
+            if param.source
+            and (artifacts[param.source].id, artifacts[param.name].id, pipelines[param.pipeline].id)
+            in created_connections
+        ]
+        created_links = await Pipeline.link(session, links)
+
+        created_artifacts, created_pipelines = set(created_artifacts), set(created_pipelines)
+        results = []
+        for param, error in zip(params, errors):
+            if error:
+                results.append(error)
+                continue
+
+            artifact = artifacts[param.name]
+            created = claim(created_artifacts, param.name)
+            changed = created
+            if created:
+                print(f"Artifact '{param.name}' created.")
+                response = f"{COLORS['created']}CREATED{COLORS['reset']} artifact {COLORS['artifact']}{param.name}{COLORS['reset']}.\n"  # noqa: E501
+            else:
+                print(f"Artifact '{param.name}' already exists.")
+                response = f"Artifact {COLORS['artifact']}{param.name}{COLORS['reset']} already exists.\n"
+
+            if not param.pipeline:
+                print("No pipeline linked.")
+                response += "No pipeline linked.\n"  # Done.
 
             else:
-                if not pipeline.can_modify(user_id):
-                    raise PermissionError("Whoops! Users can only modify pipelines they've created themselves!")
-
-                response += f"Pipeline {COLORS['pipeline']}{pipeline.name}{COLORS['reset']} found.\n"
-                if pipeline not in artifact.pipelines:
-                    artifact.pipelines.append(pipeline)
-                    print(f"Pipeline '{pipeline.name}' found and linked to artifact '{artifact.name}'.")
-                    response += f"{COLORS['connected']}CONNECTED{COLORS['reset']} artifact {COLORS['artifact']}{artifact.name}{COLORS['reset']} to pipeline {COLORS['pipeline']}{pipeline.name}{COLORS['reset']}.\n"  # noqa: E501
+                pipeline = pipelines[param.pipeline]
+                if claim(created_pipelines, param.pipeline):
+                    changed = True
+                    claim(created_links, (artifact.id, pipeline.id))
+                    print(f"Pipeline '{param.pipeline}' created and linked to artifact '{param.name}'.")
+                    response += f"{COLORS['created']}CREATED{COLORS['reset']} pipeline {COLORS['pipeline']}{param.pipeline}{COLORS['reset']}.\n"
+                    response += f"{COLORS['connected']}CONNECTED{COLORS['reset']} artifact {COLORS['artifact']}{param.name}{COLORS['reset']} to pipeline {COLORS['pipeline']}{param.pipeline}{COLORS['reset']}.\n"  # noqa: E501
+
                 else:
-                    print(f"Pipeline '{pipeline.name}' found, and it is already linked to artifact '{artifact.name}'.")
-                    response += f"Artifact {COLORS['artifact']}{artifact.name}{COLORS['reset']} is already linked to pipeline {COLORS['pipeline']}{pipeline.name}{COLORS['reset']}.\n"  # Done. # noqa: E501
+                    response += f"Pipeline {COLORS['pipeline']}{param.pipeline}{COLORS['reset']} found.\n"
+                    if claim(created_links, (artifact.id, pipeline.id)):
+                        changed = True
+                        print(f"Pipeline '{param.pipeline}' found and linked to artifact '{param.name}'.")
+                        response += f"{COLORS['connected']}CONNECTED{COLORS['reset']} artifact {COLORS['artifact']}{param.name}{COLORS['reset']} to pipeline {COLORS['pipeline']}{param.pipeline}{COLORS['reset']}.\n"  # noqa: E501
+                    else:
+                        print(
+                            f"Pipeline '{param.pipeline}' found, and it is already linked to artifact '{param.name}'."
+                        )
+                        response += f"Artifact {COLORS['artifact']}{param.name}{COLORS['reset']} is already linked to pipeline {COLORS['pipeline']}{param.pipeline}{COLORS['reset']}.\n"  # Done. # noqa: E501
 
-            if param.source:
-                source = session.query(Artifact).filter_by(name=param.source).first()
-
-                # Aliases for clearer joins
-                SourceArtifact = aliased(Artifact, name="source_artifact")
-                TargetArtifact = aliased(Artifact, name="target_artifact")
-
-                # Query for existing connection
-                connection = (
-                    session.query(Connection)
-                    .join(
-                        connection_sourceartifact,
-                        connection_sourceartifact.c.left_id == Connection.id,
-                    )
-                    .join(
-                        SourceArtifact,
-                        connection_sourceartifact.c.right_id == SourceArtifact.id,
-                    )
-                    .join(
-                        connection_targetartifact,
-                        connection_targetartifact.c.left_id == Connection.id,
-                    )
-                    .join(
-                        TargetArtifact,
-                        connection_targetartifact.c.right_id == TargetArtifact.id,
-                    )
-                    .filter(
-                        and_(
-                            SourceArtifact.id == source.id,
-                            TargetArtifact.id == artifact.id,
-                            Connection.pipeline == pipeline,
+                if param.source:
+                    source_id = artifacts[param.source].id
+                    if claim(created_connections, (source_id, artifact.id, pipeline.id)):
+                        changed = True
+                        print(
+                            f"Connection between '{param.source}' and '{param.name}' created within pipeline '{param.pipeline}'."
                         )
-                    )
-                    .first()
-                )
-                if not connection:
-                    source = session.query(Artifact).filter_by(name=param.source).first()
-                    connection = Connection(source=source, target=artifact, pipeline=pipeline)
-                    session.add(connection)
-                    session.flush()
-                    print(
-                        f"Connection between '{param.source}' and '{param.name}' created within pipeline '{param.pipeline}'."
-                    )
-                    response += f"{COLORS['connected']}CONNECTED{COLORS['reset']} {COLORS['artifact']}{param.source}{COLORS['reset']} to {COLORS['artifact']}{param.name}{COLORS['reset']} within pipeline {COLORS['pipeline']}{param.pipeline}{COLORS['reset']}.\n"  # noqa: E501
-                    # Check whether the connection source is linked to the pipeline
-                    if source not in pipeline.artifacts:
-                        source.pipelines.append(pipeline)
+                        response += f"{COLORS['connected']}CONNECTED{COLORS['reset']} {COLORS['artifact']}{param.source}{COLORS['reset']} to {COLORS['artifact']}{param.name}{COLORS['reset']} within pipeline {COLORS['pipeline']}{param.pipeline}{COLORS['reset']}.\n"  # noqa: E501
+                        # Check whether the connection source is linked to the pipeline
+                        if claim(created_links, (source_id, pipeline.id)):
+                            print(
+                                f"For this, the source artifact '{param.source}' was linked to pipeline '{param.pipeline}', as this connection had not been established yet."  # noqa: E501
+                            )
+                            response += f"Artifact {COLORS['artifact']}{param.source}{COLORS['reset']} has not yet been linked to pipeline {COLORS['pipeline']}{param.pipeline}{COLORS['reset']}.\n"  # noqa: E501
+                            response += f"{COLORS['connected']}CONNECTED{COLORS['reset']} artifact {COLORS['artifact']}{param.source}{COLORS['reset']} to pipeline {COLORS['pipeline']}{param.pipeline}{COLORS['reset']}.\n"  # noqa: E501
+                    else:
                         print(
-                            f"For this, the source artifact '{source.name}' was linked to pipeline '{pipeline.name}', as this connection had not been established yet."  # noqa: E501
+                            f"Connection between '{param.source}' and '{param.name}' already exists in pipeline '{param.pipeline}'."
                         )
-                        response += f"Artifact {COLORS['artifact']}{source.name}{COLORS['reset']} has not yet been linked to pipeline {COLORS['pipeline']}{pipeline.name}{COLORS['reset']}.\n"  # noqa: E501
-                        response += f"{COLORS['connected']}CONNECTED{COLORS['reset']} artifact {COLORS['artifact']}{source.name}{COLORS['reset']} to pipeline {COLORS['pipeline']}{pipeline.name}{COLORS['reset']}.\n"  # noqa: E501
-                else:
-                    print(
-                        f"Connection between '{param.source}' and '{param.name}' already exists in pipeline '{param.pipeline}'."
-                    )
-                    response += f"Connection between {COLORS['artifact']}{param.source}{COLORS['reset']} and {COLORS['artifact']}{param.name}{COLORS['reset']} already exists within pipeline {COLORS['pipeline']}{param.pipeline}{COLORS['reset']}.\n"  # Done. # noqa: E501
+                        response += f"Connection between {COLORS['artifact']}{param.source}{COLORS['reset']} and {COLORS['artifact']}{param.name}{COLORS['reset']} already exists within pipeline {COLORS['pipeline']}{param.pipeline}{COLORS['reset']}.\n"  # Done. # noqa: E501
+
+            results.append(
+                ArtifactCreationResult(
+                    message=response,
+                    created=created,
+                    can_modify=created or artifact.owner_id == user_id,
+                    changed=changed,
+                )
+            )
 
-        return response
+        if any(not isinstance(result, Exception) and result.changed for result in results):
+            await GraphVersion.bump(session)
+
+        return results
+
+    @classmethod
+    async def is_registered(cls, session: AsyncSession, param: ArtifactCreation, user_id: str) -> bool:
+        """
+        Check in a single query whether `create` would change nothing, i.e., whether the user's artifact exists,
+        is linked to the user's pipeline and is connected to the source artifact within the pipeline.
+        """
+
+        stmt = select(cls.id).where(cls.name == param.name, cls.owner_id == user_id)
+        if param.pipeline:
+            stmt = stmt.join(artifact_pipelines, artifact_pipelines.c.left_id == cls.id).join(
+                Pipeline,
+                (Pipeline.id == artifact_pipelines.c.right_id)
+                & (Pipeline.name == param.pipeline)
+                & (Pipeline.owner_id == user_id),
+            )
+            if param.source:
+                source = aliased(cls)
+                stmt = stmt.join(
+                    Connection, (Connection.target_id == cls.id) & (Connection.pipeline_id == Pipeline.id)
+                ).join(source, (source.id == Connection.source_id) & (source.name == param.source))
+        return (await session.scalar(stmt.limit(1))) is not None
 
     @classmethod
-    def remove(cls, session: Session, name: str, user_id: str):
+    async def remove(cls, session: AsyncSession, name: str, user_id: str):
         """Remove an artifact by its name"""
 
-        artifact = cls.get_artifact_by_name(session, name)
+        artifact = await cls.get_artifact_by_name(session, name)
 
         if not artifact:
             raise ValueError("Oh no! The artifact could not be found!")
@@ -298,7 +618,8 @@ class Artifact(Base):
         if not artifact.can_modify(user_id):
             raise PermissionError("Whoops! Users can only delete artifacts they've created themselves!")
 
-        session.delete(artifact)
+        await session.delete(artifact)
+        await GraphVersion.bump(session)
         print(f"Artifact '{name}' deleted.")
         response = (
             f"{COLORS['deleted']}DELETED{COLORS['reset']} artifact {COLORS['artifact']}{name}{COLORS['reset']}.\n"
@@ -325,7 +646,7 @@ class Pipeline(Base):
     )
 
     connections: Mapped[List[Connection]] = relationship(
-        secondary=connection_pipeline, back_populates="pipeline", cascade="all, delete"
+        back_populates="pipeline", cascade="all, delete", passive_deletes=True
     )
 
     def can_modify(self, user_id: str) -> bool:
@@ -334,29 +655,35 @@ class Pipeline(Base):
         return self.owner_id == user_id
 
     @classmethod
-    def get_all_pipelines(cls, session: Session) -> List["Pipeline"]:
-        """Get all pipelines"""
+    async def get_pipeline_by_name(cls, session: AsyncSession, pipeline_name: str, *options) -> Pipeline:
+        """Get a pipeline by name. Relationships needed afterwards must be eagerly loaded via `options`."""
 
-        return session.query(cls).all()
+        return await session.scalar(select(cls).options(*options).filter_by(name=pipeline_name).limit(1))
 
     @classmethod
-    def get_pipelines_by_artifact(cls, session: Session, artifact_name: str) -> List["Pipeline"]:
-        """Get all pipelines that contain a specific artifact"""
+    async def link(cls, session: AsyncSession, links: List[Tuple[int, int]]) -> Set[Tuple[int, int]]:
+        """
+        Link artifacts to pipelines (artifact id, pipeline id) unless they are already linked, in one statement.
+        Returns the links which were created.
+        """
 
+        if not links:
+            return set()
         stmt = (
-            select(cls)
-            .options(joinedload(cls.artifacts))
-            .join(artifact_pipelines, cls.id == artifact_pipelines.c.right_id)  # Join pipelines with artifact_pipelines
-            .join(Artifact, artifact_pipelines.c.left_id == Artifact.id)  # Join artifact_pipelines with artifacts
-            .where(Artifact.name == artifact_name)  # Filter by artifact name
+            insert(session, artifact_pipelines)
+            .values(
+                [{"left_id": artifact_id, "right_id": pipeline_id} for artifact_id, pipeline_id in dict.fromkeys(links)]
+            )
+            .on_conflict_do_nothing(index_elements=["left_id", "right_id"])
+            .returning(artifact_pipelines.c.left_id, artifact_pipelines.c.right_id)
         )
-        return session.execute(stmt).unique().scalars().all()
+        return {tuple(row) for row in await session.execute(stmt)}
 
     @classmethod
-    def remove(cls, session: Session, name: str, user_id: str):
+    async def remove(cls, session: AsyncSession, name: str, user_id: str):
         """Remove pipeline by its name. Only possible if pipeline is empty."""
 
-        pipeline = session.query(cls).filter_by(name=name).first()
+        pipeline = await cls.get_pipeline_by_name(session, name, selectinload(cls.artifacts))
 
         if not pipeline:
             raise ValueError("Oh no! The pipeline could not be found!")
@@ -368,7 +695,8 @@ class Pipeline(Base):
         if pipeline.artifacts:
             raise ValueError("Whoops! The pipeline is not empty and can therefore not be deleted!")
 
-        session.delete(pipeline)
+        await session.delete(pipeline)
+        await GraphVersion.bump(session)
         print(f"Pipeline '{name}' deleted.")
         response = (
             f"{COLORS['deleted']}DELETED{COLORS['reset']} pipeline {COLORS['pipeline']}{name}{COLORS['reset']}.\n"
@@ -381,23 +709,38 @@ class Connection(Base):
 
     __tablename__ = "connections"
 
+    __table_args__ = (
+        # a connection exists at most once per pipeline, the index also serves lookups by source
+        Index("ix_connections_source_target_pipeline", "source_id", "target_id", "pipeline_id", unique=True),
+        Index("ix_connections_target_id", "target_id"),
+        Index("ix_connections_pipeline_id", "pipeline_id"),
+    )
+
     id: Mapped[int] = mapped_column("id", Integer, primary_key=True, unique=True, autoincrement=True, nullable=False)
     """unique identifier of the connection"""
 
+    source_id: Mapped[int] = mapped_column(ForeignKey("artifacts.id", ondelete="CASCADE"), nullable=False)
+    """identifier of the source artifact"""
+
+    target_id: Mapped[int] = mapped_column(ForeignKey("artifacts.id", ondelete="CASCADE"), nullable=False)
+    """identifier of the target artifact"""
+
+    pipeline_id: Mapped[int] = mapped_column(ForeignKey("pipelines.id", ondelete="CASCADE"), nullable=False)
+    """identifier of the corresponding pipeline"""
+
     source: Mapped[Artifact] = relationship(
-        secondary=connection_sourceartifact,
+        foreign_keys=[source_id],
         back_populates="connections_as_source",
     )
     """source artifact"""
 
     target: Mapped[Artifact] = relationship(
-        secondary=connection_targetartifact,
+        foreign_keys=[target_id],
         back_populates="connections_as_target",
     )
     """target artifact"""
 
     pipeline: Mapped[Pipeline] = relationship(
-        secondary=connection_pipeline,
         back_populates="connections",
     )
     """corresponding pipeline"""
@@ -408,112 +751,120 @@ class Connection(Base):
         return self.pipeline.can_modify(user_id)
 
     @classmethod
-    def get_all_connections(cls, session: Session) -> List["Connection"]:
-        """Get all connections"""
-
-        return session.query(cls).all()
-
-    @classmethod
-    def get_connections_by_pipeline(cls, session: Session, pipeline_name: str) -> List["Connection"]:
-        """Get all connections in a pipeline"""
+    async def connect(cls, session: AsyncSession, connections: List[Tuple[int, int, int]]) -> Set[Tuple[int, int, int]]:
+        """
+        Create connections (source id, target id, pipeline id) unless they already exist, in one statement.
+        Returns the connections which were created.
+        """
 
+        if not connections:
+            return set()
         stmt = (
-            select(cls)
-            .options(joinedload(cls.pipeline))
-            .join(
-                connection_pipeline, cls.id == connection_pipeline.c.left_id
-            )  # Join connections with connection_pipeline
-            .join(Pipeline, connection_pipeline.c.right_id == Pipeline.id)  # Join connection_pipelines with pipelines
-            .where(Pipeline.name == pipeline_name)  # Filter by pipeline name
+            insert(session, cls)
+            .values([dict(zip(["source_id", "target_id", "pipeline_id"], key)) for key in dict.fromkeys(connections)])
+            .on_conflict_do_nothing(index_elements=["source_id", "target_id", "pipeline_id"])
+            .returning(cls.source_id, cls.target_id, cls.pipeline_id)
         )
-        return session.execute(stmt).unique().scalars().all()
+        return {tuple(row) for row in await session.execute(stmt)}
 
     @classmethod
-    def create(cls, session: Session, param: ConnectionCreation, user_id: str) -> str:
+    async def create(cls, session: AsyncSession, param: ConnectionCreation, user_id: str) -> str:
         """
         Dagdb operation to create a connection between two existing artifacts.
         If one of the two artifacts is not linked to the pipeline, the link will be created.
         """
 
-        source_artifact = session.query(Artifact).filter_by(name=param.source).first()
-        if not source_artifact:
-            print(f"Artifact '{param.source}' not found.")
-            raise ValueError(f"Artifact '{param.source}' not found.")
+        (result,) = await cls.create_many(session, [param], user_id)
+        if isinstance(result, Exception):
+            raise result
+        return result
 
-        target_artifact = session.query(Artifact).filter_by(name=param.target).first()
-        if not target_artifact:
-            print(f"Artifact '{param.target}' not found.")
-            raise ValueError(f"Artifact '{param.target}' not found.")
+    @classmethod
+    async def create_many(
+        cls, session: AsyncSession, params: List[ConnectionCreation], user_id: str
+    ) -> List[Union[str, ValueError, PermissionError]]:
+        """
+        Dagdb operation to create connections like `create`, with a fixed number of statements however many
+        connections are created. Returns the report of every connection, or the error `create` would raise, in which
+        case nothing was written for the connection.
+        """
 
-        pipeline = session.query(Pipeline).filter_by(name=param.pipeline).first()
-        if not pipeline:
-            print(f"Pipeline '{param.pipeline}' not found.")
-            raise ValueError(f"Pipeline '{param.pipeline}' not found.")
+        # all artifacts and pipelines are looked up in one statement each
+        artifacts = await get_by_names(
+            session, Artifact, [name for param in params for name in (param.source, param.target)], Artifact.id
+        )
+        pipelines = await get_by_names(
+            session, Pipeline, [param.pipeline for param in params], Pipeline.id, Pipeline.owner_id
+        )
 
-        if not pipeline.can_modify(user_id):
-            raise PermissionError("Whoops! Users can only modify pipelines they've created themselves!")
+        errors = []
+        for param in params:
+            missing = [name for name in (param.source, param.target) if name not in artifacts]
+            if missing:
+                print(f"Artifact '{missing[0]}' not found.")
+                errors.append(ValueError(f"Artifact '{missing[0]}' not found."))
+            elif param.pipeline not in pipelines:
+                print(f"Pipeline '{param.pipeline}' not found.")
+                errors.append(ValueError(f"Pipeline '{param.pipeline}' not found."))
+            elif pipelines[param.pipeline].owner_id != user_id:
+                errors.append(PermissionError("Whoops! Users can only modify pipelines they've created themselves!"))
+            else:
+                errors.append(None)
+
+        valid = [param for param, error in zip(params, errors) if not error]
+        created_links = await Pipeline.link(
+            session,
+            [
+                (artifacts[name].id, pipelines[param.pipeline].id)
+                for param in valid
+                for name in (param.source, param.target)
+            ],
+        )
+        created_connections = await cls.connect(
+            session,
+            [(artifacts[param.source].id, artifacts[param.target].id, pipelines[param.pipeline].id) for param in valid],
+        )
 
-        response = ""
-        if pipeline not in source_artifact.pipelines:
-            source_artifact.pipelines.append(pipeline)
-            print(
-                f"The source artifact '{source_artifact.name}' was not linked to pipeline '{pipeline.name}' yet. This link was now created."
-            )
-            response += f"The source artifact {COLORS['artifact']}{source_artifact.name}{COLORS['reset']} was not linked to pipeline {COLORS['pipeline']}{pipeline.name}{COLORS['reset']} yet.\n"  # noqa: E501
-            response += f"{COLORS['connected']}CONNECTED{COLORS['reset']} artifact {COLORS['artifact']}{source_artifact.name}{COLORS['reset']} to pipeline {COLORS['pipeline']}{pipeline.name}{COLORS['reset']}.\n"  # noqa: E501
+        results = []
+        changed = False
+        for param, error in zip(params, errors):
+            if error:
+                results.append(error)
+                continue
+
+            source_id, target_id = artifacts[param.source].id, artifacts[param.target].id
+            pipeline_id = pipelines[param.pipeline].id
+            response = ""
+            if claim(created_links, (source_id, pipeline_id)):
+                changed = True
+                print(
+                    f"The source artifact '{param.source}' was not linked to pipeline '{param.pipeline}' yet. This link was now created."
+                )
+                response += f"The source artifact {COLORS['artifact']}{param.source}{COLORS['reset']} was not linked to pipeline {COLORS['pipeline']}{param.pipeline}{COLORS['reset']} yet.\n"  # noqa: E501
+                response += f"{COLORS['connected']}CONNECTED{COLORS['reset']} artifact {COLORS['artifact']}{param.source}{COLORS['reset']} to pipeline {COLORS['pipeline']}{param.pipeline}{COLORS['reset']}.\n"  # noqa: E501
 
-        if pipeline not in target_artifact.pipelines:
-            target_artifact.pipelines.append(pipeline)
-            print(
-                f"The target artifact '{target_artifact.name}' was not linked to pipeline '{pipeline.name}' yet. This link was now created."
-            )
-            response += f"The target artifact {COLORS['artifact']}{target_artifact.name}{COLORS['reset']} was not linked to pipeline {COLORS['pipeline']}{pipeline.name}{COLORS['reset']} yet.\n"  # noqa: E501
-            response += f"{COLORS['connected']}CONNECTED{COLORS['reset']} artifact {COLORS['artifact']}{target_artifact.name}{COLORS['reset']} to pipeline {COLORS['pipeline']}{pipeline.name}{COLORS['reset']}.\n"  # noqa: E501
-
-        # Aliases for clearer joins
-        SourceArtifact = aliased(Artifact, name="source_artifact")
-        TargetArtifact = aliased(Artifact, name="target_artifact")
-
-        # Query for existing connection
-        connection = (
-            session.query(Connection)
-            .join(
-                connection_sourceartifact,
-                connection_sourceartifact.c.left_id == Connection.id,
-            )
-            .join(
-                SourceArtifact,
-                connection_sourceartifact.c.right_id == SourceArtifact.id,
-            )
-            .join(
-                connection_targetartifact,
-                connection_targetartifact.c.left_id == Connection.id,
-            )
-            .join(
-                TargetArtifact,
-                connection_targetartifact.c.right_id == TargetArtifact.id,
-            )
-            .filter(
-                and_(
-                    SourceArtifact.id == source_artifact.id,
-                    TargetArtifact.id == target_artifact.id,
-                    Connection.pipeline == pipeline,
+            if claim(created_links, (target_id, pipeline_id)):
+                changed = True
+                print(
+                    f"The target artifact '{param.target}' was not linked to pipeline '{param.pipeline}' yet. This link was now created."
                 )
-            )
-            .first()
-        )
-        if not connection:
-            connection = Connection(source=source_artifact, target=target_artifact, pipeline=pipeline)
-            session.add(connection)
-            session.flush()
-            print(
-                f"Connection between '{param.source}' and '{param.target}' created within pipeline '{param.pipeline}'."
-            )
-            response += f"{COLORS['connected']}CONNECTED{COLORS['reset']} {COLORS['artifact']}{param.source}{COLORS['reset']} to {COLORS['artifact']}{param.target}{COLORS['reset']} within pipeline {COLORS['pipeline']}{param.pipeline}{COLORS['reset']}.\n"  # Done. # noqa: E501
-        else:
-            print(
-                f"Connection between '{param.source}' and '{param.target}' already exists in pipeline '{param.pipeline}'."
-            )
-            response += f"Connection between {COLORS['artifact']}{param.source}{COLORS['reset']} and {COLORS['artifact']}{param.target}{COLORS['reset']} already exists within pipeline {COLORS['pipeline']}{param.pipeline}{COLORS['reset']}.\n"  # Done. # noqa: E501
+                response += f"The target artifact {COLORS['artifact']}{param.target}{COLORS['reset']} was not linked to pipeline {COLORS['pipeline']}{param.pipeline}{COLORS['reset']} yet.\n"  # noqa: E501
+                response += f"{COLORS['connected']}CONNECTED{COLORS['reset']} artifact {COLORS['artifact']}{param.target}{COLORS['reset']} to pipeline {COLORS['pipeline']}{param.pipeline}{COLORS['reset']}.\n"  # noqa: E501
 
-        return response
+            if claim(created_connections, (source_id, target_id, pipeline_id)):
+                changed = True
+                print(
+                    f"Connection between '{param.source}' and '{param.target}' created within pipeline '{param.pipeline}'."
+                )
+                response += f"{COLORS['connected']}CONNECTED{COLORS['reset']} {COLORS['artifact']}{param.source}{COLORS['reset']} to {COLORS['artifact']}{param.target}{COLORS['reset']} within pipeline {COLORS['pipeline']}{param.pipeline}{COLORS['reset']}.\n"  # Done. # noqa: E501
+            else:
+                print(
+                    f"Connection between '{param.source}' and '{param.target}' already exists in pipeline '{param.pipeline}'."
+                )
+                response += f"Connection between {COLORS['artifact']}{param.source}{COLORS['reset']} and {COLORS['artifact']}{param.target}{COLORS['reset']} already exists within pipeline {COLORS['pipeline']}{param.pipeline}{COLORS['reset']}.\n"  # Done. # noqa: E501
+            results.append(response)
+
+        if changed:
+            await GraphVersion.bump(session)
+
+        return results
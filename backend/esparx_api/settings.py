@@ -1,19 +1,83 @@
 """This file enables accessing environment variables."""
 
 from pathlib import Path
+from typing import Literal, Optional
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
-    # define variables which should be read from .env
-    ARTIFACTDB_ENDPOINT: str
-    DAGDB_CONNECTSTRING: str
+    # "server": the DAG in Postgres and the artifacts in MongoDB, both required for production deployments
+    # "embedded": both in SQLite files in EMBEDDED_STORAGE_PATH, for single-node deployments, CI and development
+    STORAGE: Literal["server", "embedded"] = "server"
+    EMBEDDED_STORAGE_PATH: Path = Path(__file__).parent.parent / "data"
+
+    # define variables which should be read from .env, required for the "server" storage once the API connects.
+    # Importing the API, e.g., to generate the OpenAPI spec, works without them.
+    ARTIFACTDB_ENDPOINT: Optional[str] = None
+    DAGDB_CONNECTSTRING: Optional[str] = None
+
+    # serve the cached DAG while it is rebuilt in the background after a write, instead of waiting for the rebuild
+    GRAPH_CACHE_SERVE_STALE: bool = False
+
+    # full-text search over artifacts: "text_index" (document database), "memory" (in-process index),
+    # or "auto" (text index, with the in-process index as fallback if the text index is not available)
+    ARTIFACT_SEARCH: Literal["auto", "text_index", "memory"] = "auto"
+
+    # compress responses of at least this many bytes for clients accepting zstd or gzip
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    # reject compressed request bodies that decompress to more than this many bytes
+    MAX_DECOMPRESSED_REQUEST_SIZE: int = 64 * 1024 * 1024
+
+    # count the database statements of every request, report them in response headers and warn about repeated
+    # statements (N+1 queries) and routes exceeding their query budget. Meant for development and CI, not production.
+    QUERY_DEBUG: bool = False
+
+    # server of `esparx-api --production`: number of worker processes (0: one per CPU core), length of the queue
+    # of pending connections and seconds idle keep-alive connections are held open
+    WORKERS: int = 0
+    BACKLOG: int = 2048
+    KEEP_ALIVE_TIMEOUT: int = 5
+    # restart a worker gracefully after this many requests plus a random jitter, e.g., to bound the growth of its
+    # memory. None: never. Needs several workers, as a single worker is not restarted. Requests in flight are
+    # completed, but connections the worker accepted without having received a request yet are closed. A jitter of
+    # the same order as the limit keeps the workers from restarting at the same time.
+    MAX_REQUESTS_PER_WORKER: Optional[int] = None
+    MAX_REQUESTS_JITTER: int = 0
+    # seconds a stopping worker waits for requests in flight before closing their connections
+    GRACEFUL_SHUTDOWN_TIMEOUT: int = 30
+    # log every request, the request metrics at /metrics do not need it
+    ACCESS_LOG: bool = True
+
+    # connection pools of every worker process, so the API opens up to WORKERS times as many connections.
+    # DAGDB_POOL_SIZE connections to Postgres are kept open, and up to DAGDB_MAX_OVERFLOW more are opened under load.
+    DAGDB_POOL_SIZE: int = 5
+    DAGDB_MAX_OVERFLOW: int = 10
+    DOCUMENTDB_MAX_POOL_SIZE: int = 100
+    # seconds a request waits for a free connection of a saturated pool before it fails fast with
+    # 503 Service Unavailable, instead of queueing until the client gives up
+    DAGDB_POOL_TIMEOUT: float = 5
+    DOCUMENTDB_WAIT_QUEUE_TIMEOUT: float = 5
+    # seconds after which connections to Postgres are replaced (-1: never), e.g., before a firewall or proxy drops
+    # idle connections, and whether connections are tested before use, which costs a round trip per checkout but
+    # hides connections broken by a restart of the database
+    DAGDB_POOL_RECYCLE: int = 1800
+    DAGDB_POOL_PRE_PING: bool = False
+    # seconds a single statement may run before Postgres cancels it (None: no limit)
+    DAGDB_STATEMENT_TIMEOUT: Optional[float] = 30
+    # executions of a statement after which psycopg prepares it on the server (None: never, required behind a
+    # connection pooler in transaction mode like PgBouncer)
+    DAGDB_PREPARE_THRESHOLD: Optional[int] = 5
+    # seconds to wait for a reachable server of the document database and for a single operation (None: no limit)
+    DOCUMENTDB_SERVER_SELECTION_TIMEOUT: float = 10
+    DOCUMENTDB_OPERATION_TIMEOUT: Optional[float] = None
 
     # define the path to the .env file
     model_config = SettingsConfigDict(
         env_file=Path(__file__).parent.parent / ".env",
         case_sensitive=True,
+        # e.g., DAGDB_STATEMENT_TIMEOUT=None for no limit
+        env_parse_none_str="None",
     )
 
 
@@ -0,0 +1,32 @@
+"""Add graph version
+
+Revision ID: 3d9a6f1b7c25
+Revises: 5f3c2a9e81d4
+Create Date: 2026-10-18 18:36:02.118734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3d9a6f1b7c25'
+down_revision: Union[str, None] = '5f3c2a9e81d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    graph_version = op.create_table(
+        'graph_version',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.bulk_insert(graph_version, [{'id': 1, 'version': 0}])
+
+
+def downgrade() -> None:
+    op.drop_table('graph_version')
@@ -0,0 +1,106 @@
+"""Direct foreign keys on connections
+
+Revision ID: 5f3c2a9e81d4
+Revises: bd7a3169c1d9
+Create Date: 2026-10-18 17:02:14.512904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f3c2a9e81d4'
+down_revision: Union[str, None] = 'bd7a3169c1d9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('connections', sa.Column('source_id', sa.Integer(), nullable=True))
+    op.add_column('connections', sa.Column('target_id', sa.Integer(), nullable=True))
+    op.add_column('connections', sa.Column('pipeline_id', sa.Integer(), nullable=True))
+
+    # move the data from the association tables into the new columns
+    op.execute(
+        """
+        UPDATE connections SET
+            source_id = (SELECT right_id FROM connection_sourceartifact WHERE left_id = connections.id LIMIT 1),
+            target_id = (SELECT right_id FROM connection_targetartifact WHERE left_id = connections.id LIMIT 1),
+            pipeline_id = (SELECT right_id FROM connection_pipeline WHERE left_id = connections.id LIMIT 1)
+        """
+    )
+    op.drop_table('connection_sourceartifact')
+    op.drop_table('connection_targetartifact')
+    op.drop_table('connection_pipeline')
+
+    # drop incomplete connections and duplicates, which would violate the new constraints
+    op.execute("DELETE FROM connections WHERE source_id IS NULL OR target_id IS NULL OR pipeline_id IS NULL")
+    op.execute(
+        """
+        DELETE FROM connections WHERE id NOT IN (
+            SELECT MIN(id) FROM connections GROUP BY source_id, target_id, pipeline_id
+        )
+        """
+    )
+
+    op.alter_column('connections', 'source_id', nullable=False)
+    op.alter_column('connections', 'target_id', nullable=False)
+    op.alter_column('connections', 'pipeline_id', nullable=False)
+    op.create_foreign_key(
+        'connections_source_id_fkey', 'connections', 'artifacts', ['source_id'], ['id'], ondelete='CASCADE'
+    )
+    op.create_foreign_key(
+        'connections_target_id_fkey', 'connections', 'artifacts', ['target_id'], ['id'], ondelete='CASCADE'
+    )
+    op.create_foreign_key(
+        'connections_pipeline_id_fkey', 'connections', 'pipelines', ['pipeline_id'], ['id'], ondelete='CASCADE'
+    )
+    op.create_index(
+        'ix_connections_source_target_pipeline', 'connections', ['source_id', 'target_id', 'pipeline_id'], unique=True
+    )
+    op.create_index('ix_connections_target_id', 'connections', ['target_id'], unique=False)
+    op.create_index('ix_connections_pipeline_id', 'connections', ['pipeline_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.create_table(
+        'connection_sourceartifact',
+        sa.Column('left_id', sa.Integer(), nullable=False),
+        sa.Column('right_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['left_id'], ['connections.id'], ondelete='SET NULL'),
+        sa.ForeignKeyConstraint(['right_id'], ['artifacts.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('left_id', 'right_id'),
+    )
+    op.create_table(
+        'connection_targetartifact',
+        sa.Column('left_id', sa.Integer(), nullable=False),
+        sa.Column('right_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['left_id'], ['connections.id'], ondelete='SET NULL'),
+        sa.ForeignKeyConstraint(['right_id'], ['artifacts.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('left_id', 'right_id'),
+    )
+    op.create_table(
+        'connection_pipeline',
+        sa.Column('left_id', sa.Integer(), nullable=False),
+        sa.Column('right_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['left_id'], ['connections.id']),
+        sa.ForeignKeyConstraint(['right_id'], ['pipelines.id']),
+        sa.PrimaryKeyConstraint('left_id', 'right_id'),
+    )
+
+    op.execute("INSERT INTO connection_sourceartifact (left_id, right_id) SELECT id, source_id FROM connections")
+    op.execute("INSERT INTO connection_targetartifact (left_id, right_id) SELECT id, target_id FROM connections")
+    op.execute("INSERT INTO connection_pipeline (left_id, right_id) SELECT id, pipeline_id FROM connections")
+
+    op.drop_index('ix_connections_pipeline_id', table_name='connections')
+    op.drop_index('ix_connections_target_id', table_name='connections')
+    op.drop_index('ix_connections_source_target_pipeline', table_name='connections')
+    op.drop_constraint('connections_pipeline_id_fkey', 'connections', type_='foreignkey')
+    op.drop_constraint('connections_target_id_fkey', 'connections', type_='foreignkey')
+    op.drop_constraint('connections_source_id_fkey', 'connections', type_='foreignkey')
+    op.drop_column('connections', 'pipeline_id')
+    op.drop_column('connections', 'target_id')
+    op.drop_column('connections', 'source_id')
@@ -0,0 +1,49 @@
+import asyncio
+import os
+import tempfile
+from typing import Optional
+
+import pytest
+
+# the settings are read when the API is imported, so the storage is configured before the tests import it
+os.environ["STORAGE"] = "embedded"
+os.environ["EMBEDDED_STORAGE_PATH"] = tempfile.mkdtemp(prefix="esparx-tests-")
+os.environ["QUERY_DEBUG"] = "true"
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from benchmarks.runner import write_entry  # noqa: E402
+from esparx_api import app  # noqa: E402
+from esparx_api.dagdb import LocalGraphCache  # noqa: E402
+from esparx_api.documentdb import ArtifactSearchIndex  # noqa: E402
+
+USER_ID = "tests"
+
+
+@pytest.fixture(scope="module", autouse=True)
+def cache_locks():
+    # an asyncio lock is bound to the event loop of the first request waiting for it, while every test module runs
+    # the API in an event loop of its own (see `client`), so the caches of the API get new locks for every module
+    LocalGraphCache._lock = asyncio.Lock()
+    ArtifactSearchIndex._lock = asyncio.Lock()
+
+
+@pytest.fixture(scope="module")
+def client():
+    """Client requesting the API in-process, with the lifespan of the API running and the user of the tests"""
+
+    with TestClient(app, headers={"X-User-ID": USER_ID}) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def make_entry():
+    """
+    Factory of bodies registering an artifact with metadata derived from its name, e.g.,
+    `make_entry("model", "model", pipeline="p", source="data")`
+    """
+
+    def make(name: str, artifact_type: str, pipeline: Optional[str] = None, source: Optional[str] = None) -> dict:
+        return {**write_entry("tests", name, artifact_type, 0), "pipeline_name": pipeline, "source_name": source}
+
+    return make
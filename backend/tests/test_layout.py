@@ -0,0 +1,50 @@
+from collections import namedtuple
+
+from esparx_api.dagdb.layout import LEVEL_SPACING, ROW_SPACING, compute_layout
+
+ArtifactRow = namedtuple("ArtifactRow", ["id", "name", "artifact_type"])
+ConnectionRow = namedtuple("ConnectionRow", ["source_id", "target_id", "pipeline_id"])
+
+
+def get_levels(artifacts, connections) -> dict:
+    layout = compute_layout([ArtifactRow(id, name, "code") for id, name in enumerate(artifacts)], connections)
+    return {artifact["name"]: artifact["level"] for artifact in layout["artifacts"]}
+
+
+def connect(*pairs):
+    return [ConnectionRow(source, target, 1) for source, target in pairs]
+
+
+def test_levels_follow_the_longest_path():
+    # a -> b -> c and a shortcut a -> c
+    assert get_levels("abc", connect((0, 1), (1, 2), (0, 2))) == {"a": 0, "b": 1, "c": 2}
+
+
+def test_sinks_are_placed_in_the_last_level():
+    # a -> b and c -> d -> e
+    assert get_levels("abcde", connect((0, 1), (2, 3), (3, 4))) == {"a": 1, "b": 2, "c": 0, "d": 1, "e": 2}
+
+
+def test_connections_closing_a_cycle_are_ignored():
+    levels = get_levels("abc", connect((0, 1), (1, 2), (2, 0)))
+    assert sorted(levels.values()) == [0, 1, 2]
+
+
+def test_positions_and_connections():
+    artifacts = [ArtifactRow(3, "a", "dataset"), ArtifactRow(5, "b", "code"), ArtifactRow(7, "c", "model")]
+    # the connection to an artifact outside of the layout is left out
+    connections = [ConnectionRow(3, 7, 1), ConnectionRow(5, 7, 1), ConnectionRow(5, 99, 1)]
+    layout = compute_layout(artifacts, connections)
+    assert [(artifact["name"], artifact["x"], artifact["y"]) for artifact in layout["artifacts"]] == [
+        ("a", 0, 0),
+        ("b", 0, ROW_SPACING),
+        ("c", LEVEL_SPACING, 0),
+    ]
+    assert layout["connections"] == [
+        {"source": 3, "target": 7, "pipeline": 1},
+        {"source": 5, "target": 7, "pipeline": 1},
+    ]
+
+
+def test_empty_layout():
+    assert compute_layout([], []) == {"artifacts": [], "connections": []}
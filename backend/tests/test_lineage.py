@@ -0,0 +1,78 @@
+import pytest
+
+
+@pytest.fixture(scope="module", autouse=True)
+def graph(client, make_entry):
+    # a -> b -> c -> d and e -> c
+    body = {
+        "artifacts": [
+            make_entry("lineage-a", "dataset", "lineage-pipeline"),
+            make_entry("lineage-b", "code", "lineage-pipeline", "lineage-a"),
+            make_entry("lineage-c", "model", "lineage-pipeline", "lineage-b"),
+            make_entry("lineage-d", "results", "lineage-pipeline", "lineage-c"),
+            make_entry("lineage-e", "hyperparameters", "lineage-pipeline"),
+        ],
+        "connections": [{"source": "lineage-e", "target": "lineage-c", "pipeline": "lineage-pipeline"}],
+    }
+    response = client.post("/register/batch", json=body)
+    assert [status["status"] for status in response.json()["artifacts"]] == ["created"] * 5
+    assert [status["status"] for status in response.json()["connections"]] == ["connected"]
+
+
+def get_lineage(client, name: str, **params) -> dict:
+    response = client.get(f"/artifacts/lineage/{name}", params=params)
+    assert response.status_code == 200
+    lineage = response.json()
+    ids = {artifact["id"]: artifact["name"] for artifact in lineage["artifacts"]}
+    return {
+        "artifacts": {artifact["name"]: artifact["depth"] for artifact in lineage["artifacts"]},
+        "connections": sorted(
+            (ids[connection["source"]], ids[connection["target"]]) for connection in lineage["connections"]
+        ),
+    }
+
+
+def test_lineage_in_both_directions(client):
+    assert get_lineage(client, "lineage-c") == {
+        "artifacts": {"lineage-c": 0, "lineage-b": -1, "lineage-e": -1, "lineage-a": -2, "lineage-d": 1},
+        "connections": [
+            ("lineage-a", "lineage-b"),
+            ("lineage-b", "lineage-c"),
+            ("lineage-c", "lineage-d"),
+            ("lineage-e", "lineage-c"),
+        ],
+    }
+
+
+def test_lineage_upstream(client):
+    assert get_lineage(client, "lineage-c", direction="up")["artifacts"] == {
+        "lineage-c": 0,
+        "lineage-b": -1,
+        "lineage-e": -1,
+        "lineage-a": -2,
+    }
+
+
+def test_lineage_downstream(client):
+    assert get_lineage(client, "lineage-b", direction="down") == {
+        "artifacts": {"lineage-b": 0, "lineage-c": 1, "lineage-d": 2},
+        "connections": [("lineage-b", "lineage-c"), ("lineage-c", "lineage-d")],
+    }
+
+
+def test_lineage_with_depth(client):
+    assert get_lineage(client, "lineage-c", direction="up", depth=1) == {
+        "artifacts": {"lineage-c": 0, "lineage-b": -1, "lineage-e": -1},
+        "connections": [("lineage-b", "lineage-c"), ("lineage-e", "lineage-c")],
+    }
+    assert get_lineage(client, "lineage-a", direction="down", depth=2)["artifacts"] == {
+        "lineage-a": 0,
+        "lineage-b": 1,
+        "lineage-c": 2,
+    }
+    assert get_lineage(client, "lineage-d", depth=1)["artifacts"] == {"lineage-d": 0, "lineage-c": -1}
+
+
+def test_lineage_of_unknown_artifact(client):
+    assert client.get("/artifacts/lineage/lineage-unknown").status_code == 404
+    assert client.get("/artifacts/lineage/lineage-a", params={"depth": 0}).status_code == 422
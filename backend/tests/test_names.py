@@ -0,0 +1,73 @@
+from collections import namedtuple
+
+from esparx_api.dagdb.cache import diff_names
+from esparx_api.dagdb.names import UPDATE_LIMIT, NameIndex
+
+NameRow = namedtuple("NameRow", ["id", "name"])
+
+
+def test_search_by_prefix():
+    index = NameIndex(["model-b", "data", "model-a", "modelling", "mod"])
+    assert index.search("model") == ["model-a", "model-b", "modelling"]
+    assert index.search("model", limit=2) == ["model-a", "model-b"]
+    assert index.search("x") == []
+    assert index.search("") == ["data", "mod", "model-a", "model-b", "modelling"]
+
+
+def test_update():
+    index = NameIndex(["a", "b", "c"])
+    index.update(removed=["b", "unknown"], added=["ab", "d"])
+    assert index.search("") == ["a", "ab", "c", "d"]
+
+
+def test_update_many_names():
+    names = [f"name-{i:04d}" for i in range(4 * UPDATE_LIMIT)]
+    index = NameIndex(names[::2])
+    # more names than UPDATE_LIMIT are removed and added at once
+    removed = names[: 3 * UPDATE_LIMIT : 2]
+    index.update(removed=removed, added=names[1::2])
+    assert index.search("") == sorted(set(names) - set(removed))
+
+
+def test_diff_names_of_added_rows():
+    previous = [NameRow(1, "a"), NameRow(2, "b")]
+    assert diff_names(previous, previous + [NameRow(3, "c")]) == ([], ["c"])
+
+
+def test_diff_names_after_deletes():
+    previous = [NameRow(1, "a"), NameRow(2, "b"), NameRow(3, "c"), NameRow(4, "d")]
+    rows = [NameRow(1, "a"), NameRow(3, "c"), NameRow(5, "e")]
+    assert diff_names(previous, rows) == (["b", "d"], ["e"])
+    assert diff_names(previous, []) == (["a", "b", "c", "d"], [])
+
+
+def test_diff_names_with_reused_ids():
+    # SQLite gives the next row the largest id again after the row with that id was deleted
+    previous = [NameRow(1, "a"), NameRow(2, "b")]
+    assert diff_names(previous, [NameRow(1, "a"), NameRow(2, "c")]) == (["b"], ["c"])
+    assert diff_names(previous, [NameRow(1, "c"), NameRow(2, "b")]) == (["a"], ["c"])
+
+
+def autocomplete(client, prefix: str) -> list:
+    return client.get("/autocomplete", params={"prefix": prefix}).json()
+
+
+def get_id(client, name: str) -> int:
+    return next(artifact["id"] for artifact in client.get("/artifacts/global").json() if artifact["name"] == name)
+
+
+def test_autocomplete_after_deletes(client, make_entry):
+    client.post("/register/dataset", json=make_entry("names-a", "dataset"))
+    client.post("/register/dataset", json=make_entry("names-b", "dataset"))
+    assert autocomplete(client, "names-") == ["names-a", "names-b"]
+    deleted_id = get_id(client, "names-b")
+
+    # no request sees the graph between the delete and the registration, so the name index of the snapshot with
+    # `names-b` is updated for the snapshot with `names-c`, which got the id of `names-b`
+    assert client.delete("/artifacts/name/names-b").status_code == 200
+    client.post("/register/dataset", json=make_entry("names-c", "dataset"))
+    assert autocomplete(client, "names-") == ["names-a", "names-c"]
+    assert get_id(client, "names-c") == deleted_id
+
+    assert client.delete("/artifacts/name/names-a").status_code == 200
+    assert autocomplete(client, "names-") == ["names-c"]
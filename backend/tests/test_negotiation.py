@@ -0,0 +1,123 @@
+import gzip
+
+import msgpack
+import orjson
+import pytest
+import zstandard
+
+from esparx_api.dependencies.serialization import (
+    JSON_MEDIA_TYPE,
+    MSGPACK_MEDIA_TYPE,
+    negotiate,
+)
+from esparx_api.middleware.compression import negotiate_encoding
+
+
+@pytest.fixture(scope="module", autouse=True)
+def graph(client, make_entry):
+    # enough artifacts for the graph to be compressed
+    body = {"artifacts": [make_entry(f"negotiation-{i}", "dataset") for i in range(30)]}
+    assert client.post("/register/batch", json=body).status_code == 200
+
+
+@pytest.mark.parametrize(
+    "accept, media_type",
+    [
+        (None, JSON_MEDIA_TYPE),
+        ("*/*", JSON_MEDIA_TYPE),
+        ("application/msgpack", MSGPACK_MEDIA_TYPE),
+        ("application/x-msgpack", MSGPACK_MEDIA_TYPE),
+        ("application/msgpack, application/json", MSGPACK_MEDIA_TYPE),
+        ("application/msgpack;q=0.5, application/json", JSON_MEDIA_TYPE),
+        ("application/json, application/msgpack;q=0", JSON_MEDIA_TYPE),
+        ("text/html", JSON_MEDIA_TYPE),
+    ],
+)
+def test_negotiate_media_type(accept, media_type):
+    assert negotiate(accept) == media_type
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, encoding",
+    [
+        (None, None),
+        ("identity", None),
+        ("gzip, deflate", "gzip"),
+        ("gzip, zstd", "zstd"),
+        ("zstd;q=0.5, gzip", "gzip"),
+        ("*", "zstd"),
+        ("*, zstd;q=0", "gzip"),
+        ("gzip;q=0", None),
+    ],
+)
+def test_negotiate_encoding(accept_encoding, encoding):
+    assert negotiate_encoding(accept_encoding) == encoding
+
+
+def test_not_modified(client, make_entry):
+    identity = {"Accept-Encoding": "identity"}
+    etag = client.get("/graph", headers=identity).headers["ETag"]
+
+    response = client.get("/graph", headers={**identity, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+    # If-None-Match uses the weak comparison, so the ETags of the plain and the compressed response match each other
+    assert client.get("/graph", headers={**identity, "If-None-Match": f"W/{etag}"}).status_code == 304
+    assert client.get("/graph", headers={"Accept-Encoding": "gzip", "If-None-Match": etag}).status_code == 304
+
+    client.post("/register/dataset", json=make_entry("negotiation-new", "dataset"))
+    response = client.get("/graph", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_msgpack(client):
+    json_response = client.get("/graph")
+    response = client.get("/graph", headers={"Accept": MSGPACK_MEDIA_TYPE})
+    assert response.headers["Content-Type"] == MSGPACK_MEDIA_TYPE
+    assert msgpack.unpackb(response.content) == json_response.json()
+    # both representations have their own ETag
+    assert response.headers["ETag"] == json_response.headers["ETag"][:-1] + '-msgpack"'
+    headers = {"Accept": MSGPACK_MEDIA_TYPE, "If-None-Match": json_response.headers["ETag"]}
+    assert client.get("/graph", headers=headers).status_code == 200
+
+
+def get_raw(client, url: str, headers: dict):
+    """Get a response with its body as sent, without decoding it"""
+
+    with client.stream("GET", url, headers=headers) as response:
+        return response, b"".join(response.iter_raw())
+
+
+@pytest.mark.parametrize("encoding", ["zstd", "gzip"])
+def test_compressed_response(client, encoding):
+    content = client.get("/graph", headers={"Accept-Encoding": "identity"}).content
+    response, body = get_raw(client, "/graph", {"Accept-Encoding": encoding})
+    assert response.headers["Content-Encoding"] == encoding
+    assert response.headers["ETag"].startswith("W/")
+    if encoding == "zstd":
+        assert zstandard.ZstdDecompressor().decompressobj().decompress(body) == content
+    else:
+        assert gzip.decompress(body) == content
+
+
+def test_small_responses_are_not_compressed(client):
+    response, body = get_raw(client, "/", {"Accept-Encoding": "zstd"})
+    assert "Content-Encoding" not in response.headers
+    assert body.startswith(b"{")
+
+
+@pytest.mark.parametrize("encoding", ["zstd", "gzip"])
+def test_compressed_request(client, make_entry, encoding):
+    body = orjson.dumps(make_entry(f"negotiation-{encoding}", "dataset"))
+    compressed = zstandard.ZstdCompressor().compress(body) if encoding == "zstd" else gzip.compress(body)
+    headers = {"Content-Encoding": encoding, "Content-Type": "application/json"}
+    response = client.post("/register/dataset", content=compressed, headers=headers)
+    assert "CREATED" in response.json()["message"]
+
+
+def test_unsupported_request_encoding(client):
+    headers = {"Content-Encoding": "br", "Content-Type": "application/json"}
+    response = client.post("/register/dataset", content=b"compressed", headers=headers)
+    assert response.status_code == 415
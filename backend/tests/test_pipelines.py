@@ -0,0 +1,26 @@
+import math
+
+from esparx_api.routes.pipelines import pivot_results
+
+
+def test_pivot_results():
+    results = [
+        [{"metric": "accuracy", "value": 0.9}, {"metric": "loss", "value": 0.1}],
+        [{"metric": "loss", "value": 0.2}, {"metric": "f1", "value": 0.5}],
+        [],
+    ]
+    assert pivot_results(results) == (
+        ["accuracy", "loss", "f1"],
+        [[0.9, None, None], [0.1, 0.2, None], [None, 0.5, None]],
+    )
+
+
+def test_pivot_results_returns_nan_as_none():
+    metrics, values = pivot_results([[{"metric": "loss", "value": math.nan}], [{"metric": "loss", "value": 1}]])
+    assert metrics == ["loss"]
+    assert values == [[None, 1.0]]
+
+
+def test_pivot_results_without_results():
+    assert pivot_results([]) == ([], [])
+    assert pivot_results([[], []]) == ([], [])
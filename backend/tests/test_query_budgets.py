@@ -0,0 +1,137 @@
+"""
+These tests request every route of the API on a synthetic registry in the embedded storage and check the number of
+statements of every request against the query budgets in `esparx_api/metrics/queries.py`, so that routes querying
+per artifact or pipeline (N+1 queries) are caught before they reach production.
+The routes are requested through the ASGI app like in the benchmarks, see `benchmarks/runner.py`.
+"""
+
+import asyncio
+from typing import List, Tuple
+
+import httpx
+import pytest
+
+from benchmarks.loader import OWNER_ID, load_registry
+from benchmarks.runner import WRITE_PIPELINES, read_routes, write_entry, write_routes
+from benchmarks.workload import WorkloadShape, generate_registry
+from esparx_api import app
+from esparx_api.dagdb import create_tables, dispose_engine
+from esparx_api.documentdb import close_client
+from esparx_api.metrics.queries import (
+    DAGDB_STATEMENTS_HEADER,
+    DOCUMENTDB_COMMANDS_HEADER,
+    QUERY_BUDGETS,
+    REPEAT_LIMIT,
+    REPEATED_STATEMENTS_HEADER,
+)
+
+SHAPE = WorkloadShape(pipelines=20, artifacts=1_000, hub_datasets=10, prefix="budget")
+"""Large enough that querying per artifact or pipeline exceeds any budget"""
+
+REQUESTS = 3
+"""Number of requests per route, the first of which fills the caches of the API"""
+
+
+async def request_routes() -> List[Tuple[str, httpx.Response]]:
+    """Request every route of the API, writing and deleting as the benchmarks do, and label the responses"""
+
+    registry = generate_registry(SHAPE)
+    await create_tables()
+    await load_registry(registry)
+
+    responses = []
+    transport = httpx.ASGITransport(app=app)
+    # the transport does not run the lifespan of the app, which prepares the databases and warms up the caches
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test", headers={"X-User-ID": OWNER_ID}
+        ) as client:
+
+            async def request(label: str, **kwargs):
+                responses.append((label, await client.request(**kwargs)))
+
+            routes = {**read_routes(registry, seed=0), "GET /": lambda n: {"method": "GET", "url": "/"}}
+            for label, make_request in routes.items():
+                for n in range(REQUESTS):
+                    await request(label, **make_request(n))
+
+            # the roots of the write pipelines are the sources of all registered artifacts
+            roots = [f"{SHAPE.prefix}-write-root-{p}" for p in range(WRITE_PIPELINES)]
+            for p, root in enumerate(roots):
+                body = {**write_entry(SHAPE.prefix, root, "dataset", p), "source_name": None}
+                await request("POST /register/dataset", method="POST", url="/register/dataset", json=body)
+
+            routes, written = write_routes(registry)
+            for label, make_request in routes.items():
+                for n in range(REQUESTS):
+                    await request(label, **make_request(n))
+
+            # a batch creating an artifact, its pipeline and the connection from its source, and connections
+            # between the artifacts registered before
+            name = f"{SHAPE.prefix}-write-batch-connected"
+            written.append(name)
+            artifact = {
+                **write_entry(SHAPE.prefix, name, "code", 0),
+                "pipeline_name": f"{SHAPE.prefix}-write-pipeline-{WRITE_PIPELINES}",
+            }
+            connections = [
+                {
+                    "source": f"{SHAPE.prefix}-write-dataset-{n}",
+                    "target": f"{SHAPE.prefix}-write-results-{n}",
+                    "pipeline": f"{SHAPE.prefix}-write-pipeline-{n % WRITE_PIPELINES}",
+                }
+                for n in range(REQUESTS)
+            ]
+            body = {"artifacts": [artifact], "connections": connections}
+            await request("POST /register/batch", method="POST", url="/register/batch", json=body)
+
+            for name in written + roots:
+                await request("DELETE /artifacts/name/{name}", method="DELETE", url=f"/artifacts/name/{name}")
+            for p in range(WRITE_PIPELINES + 1):
+                url = f"/pipelines/name/{SHAPE.prefix}-write-pipeline-{p}"
+                await request("DELETE /pipelines/name/{name}", method="DELETE", url=url)
+
+    # the lifespan of the app closed the connections already, but loading the registry opened new ones
+    await dispose_engine()
+    await close_client()
+    return responses
+
+
+@pytest.fixture(scope="module")
+def responses() -> List[Tuple[str, httpx.Response]]:
+    return asyncio.run(request_routes())
+
+
+def get_budget_label(label: str) -> str:
+    # variants of a route, e.g., `POST /register/code (unchanged)`, share the budget of the route
+    return label.split(" (")[0]
+
+
+def test_requests_succeed(responses):
+    failed = [f"{label}: {response.status_code}" for label, response in responses if response.status_code >= 400]
+    assert not failed
+
+
+def test_query_budgets(responses):
+    problems = []
+    for label, response in responses:
+        budget = QUERY_BUDGETS[get_budget_label(label)]
+        statements = int(response.headers[DAGDB_STATEMENTS_HEADER])
+        commands = int(response.headers[DOCUMENTDB_COMMANDS_HEADER])
+        repeated = int(response.headers[REPEATED_STATEMENTS_HEADER])
+        if statements > budget.dagdb:
+            problems.append(f"{label} ran {statements} SQL statements, its budget is {budget.dagdb}.")
+        if commands > budget.documentdb:
+            problems.append(f"{label} ran {commands} document database commands, its budget is {budget.documentdb}.")
+        if repeated:
+            problems.append(f"{label} ran {repeated} statements more than {REPEAT_LIMIT} times.")
+    assert not problems
+
+
+def test_every_route_is_budgeted_and_requested(responses):
+    routes = {
+        f"{method.upper()} {path}" for path, operations in app.openapi()["paths"].items() for method in operations
+    }
+    requested = {get_budget_label(label) for label, _ in responses}
+    assert routes == set(QUERY_BUDGETS)
+    assert routes == requested
@@ -0,0 +1,108 @@
+from types import SimpleNamespace
+
+from esparx_api.routes.register import sort_by_source
+
+
+def batch(*artifacts: str):
+    # "name" or "name<source"
+    return [
+        SimpleNamespace(name=artifact.split("<")[0], source_name=artifact.partition("<")[2] or None)
+        for artifact in artifacts
+    ]
+
+
+def test_sort_by_source_places_sources_first():
+    assert sort_by_source(batch("c<b", "b<a", "a")) == [2, 1, 0]
+
+
+def test_sort_by_source_keeps_independent_artifacts_in_order():
+    assert sort_by_source(batch("a", "b<outside", "c")) == [0, 1, 2]
+
+
+def test_sort_by_source_leaves_out_cycles_and_their_dependents():
+    assert sort_by_source(batch("x<y", "y<x", "z<x", "a")) == [3]
+
+
+def test_sort_by_source_does_not_depend_on_itself():
+    assert sort_by_source(batch("a<a")) == [0]
+
+
+def test_sort_by_source_leaves_out_duplicates():
+    assert sort_by_source(batch("a", "a<a", "c<a")) == [0, 2]
+    # dependents are placed after the first artifact of the name, whatever the duplicates
+    assert sort_by_source(batch("b<a", "a", "a<b")) == [1, 0]
+
+
+def get_statuses(response) -> dict:
+    assert response.status_code == 200
+    return {
+        "artifacts": [(status["name"], status["status"]) for status in response.json()["artifacts"]],
+        "connections": [(status["target"], status["status"]) for status in response.json()["connections"]],
+    }
+
+
+def test_batch_reports_status_per_item(client, make_entry):
+    body = {
+        "artifacts": [
+            make_entry("register-code", "code", "register-pipeline", "register-data"),
+            make_entry("register-data", "dataset"),
+            make_entry("register-data", "dataset"),
+            make_entry("register-orphan", "code", source="register-data"),
+            make_entry("register-x", "code", "register-pipeline", "register-y"),
+            make_entry("register-y", "code", "register-pipeline", "register-x"),
+            make_entry("register-missing", "code", "register-pipeline", "register-unknown"),
+        ],
+        "connections": [
+            {"source": "register-data", "target": "register-x", "pipeline": "register-pipeline"},
+            {"source": "register-unknown", "target": "register-code", "pipeline": "register-pipeline"},
+        ],
+    }
+    assert get_statuses(client.post("/register/batch", json=body)) == {
+        "artifacts": [
+            ("register-code", "created"),
+            ("register-data", "created"),
+            ("register-data", "failed"),
+            ("register-orphan", "failed"),
+            ("register-x", "failed"),
+            ("register-y", "failed"),
+            ("register-missing", "failed"),
+        ],
+        "connections": [("register-x", "failed"), ("register-code", "failed")],
+    }
+
+    body = {
+        "artifacts": [
+            make_entry("register-data", "dataset"),
+            {**make_entry("register-code", "code", "register-pipeline", "register-data"), "description": "changed"},
+            make_entry("register-model", "model", "register-pipeline", "register-data"),
+        ],
+        "connections": [{"source": "register-model", "target": "register-code", "pipeline": "register-pipeline"}],
+    }
+    assert get_statuses(client.post("/register/batch", json=body)) == {
+        "artifacts": [("register-data", "unchanged"), ("register-code", "updated"), ("register-model", "created")],
+        "connections": [("register-code", "connected")],
+    }
+
+    # artifacts of another user are linked into the pipeline, but their metadata is not changed
+    entry = make_entry("register-data", "dataset")
+    body = {"artifacts": [{**entry, "description": "changed"}]}
+    response = client.post("/register/batch", json=body, headers={"X-User-ID": "other"})
+    assert get_statuses(response)["artifacts"] == [("register-data", "linked")]
+    assert client.get("/artifacts/name/register-data").json()["description"] == entry["description"]
+
+
+def test_unchanged_registration_writes_nothing(client, make_entry):
+    entry = make_entry("register-unchanged", "dataset")
+    assert "CREATED" in client.post("/register/dataset", json=entry).json()["message"]
+    graph_etag = client.get("/graph").headers["ETag"]
+    artifacts_etag = client.get("/artifacts/").headers["ETag"]
+
+    # the time of registration is not part of the content
+    response = client.post("/register/dataset", json={**entry, "created_at": "2030-01-01T00:00:00+00:00"})
+    assert "UNCHANGED" in response.json()["message"]
+    assert client.get("/graph").headers["ETag"] == graph_etag
+    assert client.get("/artifacts/").headers["ETag"] == artifacts_etag
+
+    response = client.post("/register/dataset", json={**entry, "description": "changed"})
+    assert "Artifact metadata updated successfully." in response.json()["message"]
+    assert client.get("/artifacts/").headers["ETag"] != artifacts_etag
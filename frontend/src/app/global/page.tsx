@@ -21,14 +21,12 @@ import {
 import { useRouter } from "next/navigation";
 import Button from "@/components/Button";
 import ArtifactNode from "@/components/ArtifactNode";
-import { topologicalSort } from "@/lib/manual/topological_sort";
 import {
   ArtifactResponse,
   ConnectionResponse,
-  getArtifactsForGlobalViewArtifactsGlobalGet,
-  getConnectionsConnectionsGet,
-  getPipelinesByArtifactPipelinesArtifactArtifactNameGet,
-  getPipelinesPipelinesGet,
+  GraphArtifactResponse,
+  getGraphGraphGet,
+  getGraphLayoutGraphLayoutGet,
 } from "@/lib/api";
 
 import "@xyflow/react/dist/base.css";
@@ -63,18 +61,23 @@ const DAGFlow = () => {
 
   useEffect(() => {
     const fetchArtifacts = async () => {
-      // Fetch pipelines
-      const { error: fetchPipelineError, data: fetchedPipelines } =
-        await getPipelinesPipelinesGet();
+      // Fetch pipelines, artifacts and connections, and the artifact positions at once
+      const [
+        { error: fetchGraphError, data: fetchedGraph },
+        { error: fetchLayoutError, data: fetchedLayout },
+      ] = await Promise.all([getGraphGraphGet(), getGraphLayoutGraphLayoutGet()]);
+
+      if (fetchGraphError || !fetchedGraph) {
+        console.error("Failed to fetch Graph", fetchGraphError);
+        return;
+      }
 
-      if (fetchPipelineError) {
-        console.error("Unable to fetch Pipelines", fetchPipelineError);
+      if (fetchLayoutError || !fetchedLayout) {
+        console.error("Failed to fetch Layout", fetchLayoutError);
         return;
       }
 
-      const pipelineMap = (
-        fetchedPipelines as { id: number; name: string }[]
-      ).reduce(
+      const pipelineMap = fetchedGraph.pipelines.reduce(
         (map, cur, idx) => {
           map[cur.name] = idx;
           return map;
@@ -83,103 +86,48 @@ const DAGFlow = () => {
       );
       setPipelines(pipelineMap);
 
-      // Fetch all artifacts and connections
-      const { error: fetchArtifactsError, data: fetchedArtifacts } =
-        await getArtifactsForGlobalViewArtifactsGlobalGet();
-
-      if (fetchArtifactsError) {
-        console.error("Failed to fetch Artifacts", fetchArtifactsError);
-        return;
-      }
-
-      setArtifacts(fetchedArtifacts as ArtifactResponse[]);
-
-      const { error: fetchConnectionsError, data: fetchedConnections } =
-        await getConnectionsConnectionsGet();
-      if (fetchConnectionsError) {
-        console.error("Failed to fetch Connections", fetchConnectionsError);
-        return;
-      }
-      setConnections(fetchedConnections as ConnectionResponse[]);
-
-      // Create a dependency map
-      const nodeDependencies = new Map<string, string[]>();
-
-      fetchedArtifacts!.forEach((artifact) => {
-        nodeDependencies.set(artifact.name, []);
+      // Look up tables for pipelines and artifacts by their ids
+      const pipelinesById = new Map<number, { idx: number; name: string }>();
+      fetchedGraph.pipelines.forEach((pipeline, idx) => {
+        pipelinesById.set(pipeline.id, { idx: idx, name: pipeline.name });
       });
 
-      fetchedConnections!.forEach((connection) => {
-        nodeDependencies
-          .get(connection.target.name)
-          ?.push(connection.source.name);
+      const artifactsById = new Map<number, GraphArtifactResponse>();
+      fetchedGraph.artifacts.forEach((artifact) => {
+        artifactsById.set(artifact.id, artifact);
       });
 
-      // Perform topological sorting to get the ordered list of nodes
-      const { sortedNodes, nodeLevels } = topologicalSort(nodeDependencies);
-
-      // Get maximum node level (for positioning)
-      const maxLevel = Math.max(...Array.from(nodeLevels.values()));
-
-      const levelNodeCounts: Map<number, number> = new Map(); // Initialize the map to track node counts at each level
-
-      // Set node positions based on the topological sort
-      const updatedNodes = await Promise.all(
-        sortedNodes.map(async (nodeName) => {
-          const artifact = fetchedArtifacts?.find(
-            (artifact) => artifact.name === nodeName,
-          );
-
-          let pipeline_idx: { idx: number; name: string }[] = [];
-          if (artifact) {
-            const {
-              error: artifactPipelinesErr,
-              data: fetchArtifactPipelines,
-            } = await getPipelinesByArtifactPipelinesArtifactArtifactNameGet({
-              path: { artifact_name: artifact.name },
-            });
-
-            if (!artifactPipelinesErr) {
-              pipeline_idx = (
-                fetchArtifactPipelines as { id: number; name: string }[]
-              ).map((val) => ({
-                idx: pipelineMap[val.name],
-                name: val.name,
-              }));
-            }
-          }
-          const level = nodeLevels.get(nodeName) || 0;
-
-          const artifact_type =
-            fetchedArtifacts!.find((artifact) => artifact.name === nodeName)
-              ?.artifact_type || "unknown";
-
-          // Initialize the node count for this level if it doesn't exist
-          if (!levelNodeCounts.has(level)) {
-            levelNodeCounts.set(level, 0);
-          }
-
-          // Calculate the vertical position based on how many nodes are already placed at this level
-          const yPos = levelNodeCounts.get(level)! * 100; // Vertical distance between nodes at the same level
-
-          // Increment the count for this level
-          levelNodeCounts.set(level, levelNodeCounts.get(level)! + 1);
-
-          return {
-            id: nodeName,
-            type: "custom",
-            data: {
-              name: nodeName,
-              artifact_type: artifact_type,
-              pipelines: pipeline_idx,
-            },
-            position: {
-              x: 100 + maxLevel * 250 - level * 250,
-              y: 100 + yPos,
-            }, // Horizontal position by level, vertical by node count at the level
-          };
-        }),
-      );
+      setArtifacts(fetchedGraph.artifacts);
+
+      const fetchedConnections: ConnectionResponse[] =
+        fetchedGraph.connections.map((connection) => ({
+          source: { name: artifactsById.get(connection.source)!.name },
+          target: { name: artifactsById.get(connection.target)!.name },
+        }));
+      setConnections(fetchedConnections);
+
+      // Place the nodes at the positions computed by the API
+      const updatedNodes = fetchedLayout.artifacts.map((layoutArtifact) => {
+        const artifact = artifactsById.get(layoutArtifact.id);
+
+        const pipeline_idx: { idx: number; name: string }[] = (
+          artifact?.pipelines || []
+        ).map((pipelineId) => pipelinesById.get(pipelineId)!);
+
+        return {
+          id: layoutArtifact.name,
+          type: "custom",
+          data: {
+            name: layoutArtifact.name,
+            artifact_type: layoutArtifact.artifact_type,
+            pipelines: pipeline_idx,
+          },
+          position: {
+            x: 100 + layoutArtifact.x,
+            y: 100 + layoutArtifact.y,
+          },
+        };
+      });
 
       {
         /* @ts-ignore */
@@ -187,7 +135,7 @@ const DAGFlow = () => {
       }
 
       // Set edges based on fetched connections
-      const updatedEdges = fetchedConnections!.map((connection) => ({
+      const updatedEdges = fetchedConnections.map((connection) => ({
         id: connection.source.name + "-" + connection.target.name,
         source: connection.source.name,
         target: connection.target.name,
@@ -34,7 +34,7 @@ export default function ArtifactDetailPage({
     [],
   );
   const [metrics, setMetrics] = useState<string[]>([]);
-  const [valuelists, setValuelists] = useState<number[][]>([]);
+  const [valuelists, setValuelists] = useState<(number | null)[][]>([]);
 
   // define color list for the chart
   // TODO: Update colors to TUM colors
@@ -72,7 +72,7 @@ export default function ArtifactDetailPage({
             .results_artifacts_names,
         );
         setMetrics((data as { results_metrics: string[] }).results_metrics);
-        setValuelists((data as { results_values: number[][] }).results_values);
+        setValuelists((data as { results_values: (number | null)[][] }).results_values);
       }
     };
 
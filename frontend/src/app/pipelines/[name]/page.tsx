@@ -19,12 +19,10 @@ import {
   faAngleLeft,
   faAngleRight,
 } from "@fortawesome/free-solid-svg-icons";
-import { topologicalSort } from "@/lib/manual/topological_sort";
 import {
   ArtifactResponse,
   ConnectionResponse,
-  getArtifactsByPipelineArtifactsPipelinePipelineNameGet,
-  getConnectionsByPipelineConnectionsPipelinePipelineNameGet,
+  getPipelineLayoutPipelinesPipelineNameLayoutGet,
   getPipelinesByArtifactPipelinesArtifactArtifactNameGet,
   getPipelinesPipelinesGet,
 } from "@/lib/api";
@@ -56,84 +54,45 @@ const DAGFlow = ({ name }: { name: string }) => {
     const fetchArtifacts = async () => {
       if (name) {
         try {
-          // Fetch artifacts and connections by pipeline name
-          const { error: fetchArtifactsError, data: fetchedArtifacts } =
-            await getArtifactsByPipelineArtifactsPipelinePipelineNameGet({
+          // Fetch artifacts with their positions and connections by pipeline name
+          const { error: fetchLayoutError, data: fetchedLayout } =
+            await getPipelineLayoutPipelinesPipelineNameLayoutGet({
               path: { pipeline_name: name },
             });
 
-          if (fetchArtifactsError) {
-            console.error("Unable to fetch Artifacts", fetchArtifactsError);
+          if (fetchLayoutError || !fetchedLayout) {
+            console.error("Unable to fetch Layout", fetchLayoutError);
             return;
           }
 
-          setArtifacts(fetchedArtifacts as ArtifactResponse[]);
+          setArtifacts(fetchedLayout.artifacts);
 
-          const { error: fetchConnectionsError, data: fetchedConnections } =
-            await getConnectionsByPipelineConnectionsPipelinePipelineNameGet({
-              path: { pipeline_name: name },
-            });
-
-          if (fetchConnectionsError) {
-            console.error("Unable to fetch Connections", fetchConnectionsError);
-            return;
-          }
-
-          setConnections(fetchedConnections);
-
-          // Create a dependency map
-          const nodeDependencies = new Map<string, string[]>();
-          fetchedArtifacts.forEach((artifact) => {
-            nodeDependencies.set(artifact.name, []);
+          // Look up table for artifact names by their ids
+          const artifactNamesById = new Map<number, string>();
+          fetchedLayout.artifacts.forEach((artifact) => {
+            artifactNamesById.set(artifact.id, artifact.name);
           });
 
-          fetchedConnections.forEach((connection) => {
-            nodeDependencies
-              .get(connection.target.name)
-              ?.push(connection.source.name);
-          });
-
-          // Perform topological sorting to get the ordered list of nodes
-          const { sortedNodes, nodeLevels } = topologicalSort(nodeDependencies);
-
-          // Get maximum node level (for positioning)
-          const maxLevel = Math.max(...Array.from(nodeLevels.values()));
-
-          const levelNodeCounts: Map<number, number> = new Map(); // Initialize the map to track node counts at each level
-
-          // Set node positions based on the topological sort
-          const updatedNodes = sortedNodes.map((nodeName) => {
-            const artifact = fetchedArtifacts.find(
-              (artifact) => artifact.name === nodeName,
-            );
-
-            const level = nodeLevels.get(nodeName) || 0;
-            const artifact_type = artifact?.artifact_type || "unknown";
-
-            // Initialize the node count for this level if it doesn't exist
-            if (!levelNodeCounts.has(level)) {
-              levelNodeCounts.set(level, 0);
-            }
-
-            // Calculate the vertical position based on how many nodes are already placed at this level
-            const yPos = levelNodeCounts.get(level)! * 100; // Vertical distance between nodes at the same level
-
-            // Increment the count for this level
-            levelNodeCounts.set(level, levelNodeCounts.get(level)! + 1);
+          const fetchedConnections: ConnectionResponse[] =
+            fetchedLayout.connections.map((connection) => ({
+              source: { name: artifactNamesById.get(connection.source)! },
+              target: { name: artifactNamesById.get(connection.target)! },
+            }));
+          setConnections(fetchedConnections);
 
-            return {
-              id: nodeName,
-              type: "custom",
-              data: {
-                name: nodeName,
-                artifact_type: artifact_type,
-              },
-              position: {
-                x: 24 + maxLevel * 250 - level * 250,
-                y: 100 + yPos,
-              }, // Horizontal position by level, vertical by node count at the level
-            };
-          });
+          // Place the nodes at the positions computed by the API
+          const updatedNodes = fetchedLayout.artifacts.map((artifact) => ({
+            id: artifact.name,
+            type: "custom",
+            data: {
+              name: artifact.name,
+              artifact_type: artifact.artifact_type,
+            },
+            position: {
+              x: 24 + artifact.x,
+              y: 100 + artifact.y,
+            },
+          }));
 
           {
             /* @ts-ignore */
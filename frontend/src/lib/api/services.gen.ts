@@ -1,7 +1,7 @@
 // This file is auto-generated by @hey-api/openapi-ts
 
 import { createClient, createConfig, type Options } from '@hey-api/client-fetch';
-import type { RegisterCodeArtifactRegisterCodePostData, RegisterCodeArtifactRegisterCodePostError, RegisterCodeArtifactRegisterCodePostResponse, RegisterHyperparametersArtifactRegisterHyperparametersPostData, RegisterHyperparametersArtifactRegisterHyperparametersPostError, RegisterHyperparametersArtifactRegisterHyperparametersPostResponse, RegisterDatasetArtifactRegisterDatasetPostData, RegisterDatasetArtifactRegisterDatasetPostError, RegisterDatasetArtifactRegisterDatasetPostResponse, RegisterModelArtifactRegisterModelPostData, RegisterModelArtifactRegisterModelPostError, RegisterModelArtifactRegisterModelPostResponse, RegisterParametersArtifactRegisterParametersPostData, RegisterParametersArtifactRegisterParametersPostError, RegisterParametersArtifactRegisterParametersPostResponse, RegisterResultsArtifactRegisterResultsPostData, RegisterResultsArtifactRegisterResultsPostError, RegisterResultsArtifactRegisterResultsPostResponse, GetArtifactsArtifactsGetError, GetArtifactsArtifactsGetResponse, GetArtifactsForGlobalViewArtifactsGlobalGetError, GetArtifactsForGlobalViewArtifactsGlobalGetResponse, GetArtifactsByPipelineArtifactsPipelinePipelineNameGetData, GetArtifactsByPipelineArtifactsPipelinePipelineNameGetError, GetArtifactsByPipelineArtifactsPipelinePipelineNameGetResponse, GetNeighborsArtifactsNeighborsNameGetData, GetNeighborsArtifactsNeighborsNameGetError, GetNeighborsArtifactsNeighborsNameGetResponse, GetArtifactByNameArtifactsNameNameGetData, GetArtifactByNameArtifactsNameNameGetError, GetArtifactByNameArtifactsNameNameGetResponse, RemoveArtifactByNameArtifactsNameNameDeleteData, RemoveArtifactByNameArtifactsNameNameDeleteError, RemoveArtifactByNameArtifactsNameNameDeleteResponse, GetPipelinesPipelinesGetError, GetPipelinesPipelinesGetResponse, GetPipelinesByArtifactPipelinesArtifactArtifactNameGetData, GetPipelinesByArtifactPipelinesArtifactArtifactNameGetError, GetPipelinesByArtifactPipelinesArtifactArtifactNameGetResponse, GetResultsArtifactsByPipelinePipelinesResultsPipelineNameGetData, GetResultsArtifactsByPipelinePipelinesResultsPipelineNameGetError, GetResultsArtifactsByPipelinePipelinesResultsPipelineNameGetResponse, GetConnectionsByPipelineConnectionsPipelinePipelineNameGetData, GetConnectionsByPipelineConnectionsPipelinePipelineNameGetError, GetConnectionsByPipelineConnectionsPipelinePipelineNameGetResponse, CreateConnectionConnectionsCreatePostData, CreateConnectionConnectionsCreatePostError, CreateConnectionConnectionsCreatePostResponse, GetConnectionsConnectionsGetError, GetConnectionsConnectionsGetResponse, RootGetError, RootGetResponse } from './types.gen';
+import type { RegisterCodeArtifactRegisterCodePostData, RegisterCodeArtifactRegisterCodePostError, RegisterCodeArtifactRegisterCodePostResponse, RegisterHyperparametersArtifactRegisterHyperparametersPostData, RegisterHyperparametersArtifactRegisterHyperparametersPostError, RegisterHyperparametersArtifactRegisterHyperparametersPostResponse, RegisterDatasetArtifactRegisterDatasetPostData, RegisterDatasetArtifactRegisterDatasetPostError, RegisterDatasetArtifactRegisterDatasetPostResponse, RegisterModelArtifactRegisterModelPostData, RegisterModelArtifactRegisterModelPostError, RegisterModelArtifactRegisterModelPostResponse, RegisterParametersArtifactRegisterParametersPostData, RegisterParametersArtifactRegisterParametersPostError, RegisterParametersArtifactRegisterParametersPostResponse, RegisterResultsArtifactRegisterResultsPostData, RegisterResultsArtifactRegisterResultsPostError, RegisterResultsArtifactRegisterResultsPostResponse, GetArtifactsArtifactsGetError, GetArtifactsArtifactsGetResponse, GetArtifactsForGlobalViewArtifactsGlobalGetError, GetArtifactsForGlobalViewArtifactsGlobalGetResponse, GetArtifactsByPipelineArtifactsPipelinePipelineNameGetData, GetArtifactsByPipelineArtifactsPipelinePipelineNameGetError, GetArtifactsByPipelineArtifactsPipelinePipelineNameGetResponse, GetNeighborsArtifactsNeighborsNameGetData, GetNeighborsArtifactsNeighborsNameGetError, GetNeighborsArtifactsNeighborsNameGetResponse, GetArtifactByNameArtifactsNameNameGetData, GetArtifactByNameArtifactsNameNameGetError, GetArtifactByNameArtifactsNameNameGetResponse, RemoveArtifactByNameArtifactsNameNameDeleteData, RemoveArtifactByNameArtifactsNameNameDeleteError, RemoveArtifactByNameArtifactsNameNameDeleteResponse, GetPipelinesPipelinesGetError, GetPipelinesPipelinesGetResponse, GetPipelinesByArtifactPipelinesArtifactArtifactNameGetData, GetPipelinesByArtifactPipelinesArtifactArtifactNameGetError, GetPipelinesByArtifactPipelinesArtifactArtifactNameGetResponse, GetResultsArtifactsByPipelinePipelinesResultsPipelineNameGetData, GetResultsArtifactsByPipelinePipelinesResultsPipelineNameGetError, GetResultsArtifactsByPipelinePipelinesResultsPipelineNameGetResponse, GetPipelineLayoutPipelinesPipelineNameLayoutGetData, GetPipelineLayoutPipelinesPipelineNameLayoutGetError, GetPipelineLayoutPipelinesPipelineNameLayoutGetResponse, GetConnectionsByPipelineConnectionsPipelinePipelineNameGetData, GetConnectionsByPipelineConnectionsPipelinePipelineNameGetError, GetConnectionsByPipelineConnectionsPipelinePipelineNameGetResponse, CreateConnectionConnectionsCreatePostData, CreateConnectionConnectionsCreatePostError, CreateConnectionConnectionsCreatePostResponse, GetConnectionsConnectionsGetError, GetConnectionsConnectionsGetResponse, GetGraphGraphGetError, GetGraphGraphGetResponse, GetGraphLayoutGraphLayoutGetError, GetGraphLayoutGraphLayoutGetResponse, RootGetError, RootGetResponse } from './types.gen';
 
 export const client = createClient(createConfig());
 
@@ -140,6 +140,15 @@ export const getResultsArtifactsByPipelinePipelinesResultsPipelineNameGet = <Thr
     url: '/pipelines/results/{pipeline_name}'
 }); };
 
+/**
+ * Get Pipeline Layout
+ * Get the positions of the artifacts for drawing a pipeline. Computed once per version of the DAG.
+ */
+export const getPipelineLayoutPipelinesPipelineNameLayoutGet = <ThrowOnError extends boolean = false>(options: Options<GetPipelineLayoutPipelinesPipelineNameLayoutGetData, ThrowOnError>) => { return (options?.client ?? client).get<GetPipelineLayoutPipelinesPipelineNameLayoutGetResponse, GetPipelineLayoutPipelinesPipelineNameLayoutGetError, ThrowOnError>({
+    ...options,
+    url: '/pipelines/{pipeline_name}/layout'
+}); };
+
 /**
  * Get Connections By Pipeline
  * Get all connections in a pipeline
@@ -167,6 +176,24 @@ export const getConnectionsConnectionsGet = <ThrowOnError extends boolean = fals
     url: '/connections/'
 }); };
 
+/**
+ * Get Graph
+ * Get the complete DAG (pipelines, artifacts with their pipeline memberships and connections) at once
+ */
+export const getGraphGraphGet = <ThrowOnError extends boolean = false>(options?: Options<unknown, ThrowOnError>) => { return (options?.client ?? client).get<GetGraphGraphGetResponse, GetGraphGraphGetError, ThrowOnError>({
+    ...options,
+    url: '/graph'
+}); };
+
+/**
+ * Get Graph Layout
+ * Get the positions of all artifacts for drawing the complete DAG. Computed once per version of the DAG.
+ */
+export const getGraphLayoutGraphLayoutGet = <ThrowOnError extends boolean = false>(options?: Options<unknown, ThrowOnError>) => { return (options?.client ?? client).get<GetGraphLayoutGraphLayoutGetResponse, GetGraphLayoutGraphLayoutGetError, ThrowOnError>({
+    ...options,
+    url: '/graph/layout'
+}); };
+
 /**
  * Root
  * Base route with welcome message.
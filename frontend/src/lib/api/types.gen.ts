@@ -77,6 +77,28 @@ export enum artifact_type2 {
     DATASET = 'dataset'
 }
 
+export type GraphArtifactResponse = {
+    id: number;
+    name: string;
+    artifact_type: string;
+    pipelines: Array<(number)>;
+};
+
+export type GraphConnectionResponse = {
+    source: number;
+    target: number;
+    pipeline: number;
+};
+
+/**
+ * The complete DAG (all pipelines, artifacts and connections) in one payload
+ */
+export type GraphResponse = {
+    pipelines: Array<PipelineResponse>;
+    artifacts: Array<GraphArtifactResponse>;
+    connections: Array<GraphConnectionResponse>;
+};
+
 export type HTTPValidationError = {
     detail?: Array<ValidationError>;
 };
@@ -109,6 +131,26 @@ export enum artifact_type3 {
     HYPERPARAMETERS = 'hyperparameters'
 }
 
+export type LayoutArtifactResponse = {
+    id: number;
+    name: string;
+    artifact_type: string;
+    /**
+     * Column of the artifact, counted from the left. Connections always point to a higher level.
+     */
+    level: number;
+    x: number;
+    y: number;
+};
+
+/**
+ * Artifacts with their positions in the drawing of a DAG, and the connections between them
+ */
+export type LayoutResponse = {
+    artifacts: Array<LayoutArtifactResponse>;
+    connections: Array<GraphConnectionResponse>;
+};
+
 /**
  * Schema for a model artifact
  */
@@ -151,6 +193,11 @@ export enum artifact_type5 {
     PARAMETERS = 'parameters'
 }
 
+export type PipelineResponse = {
+    id: number;
+    name: string;
+};
+
 /**
  * Schema for an input/output format used in PyTorch model artifacts.
  */
@@ -361,6 +408,16 @@ export type GetResultsArtifactsByPipelinePipelinesResultsPipelineNameGetResponse
 
 export type GetResultsArtifactsByPipelinePipelinesResultsPipelineNameGetError = (HTTPValidationError);
 
+export type GetPipelineLayoutPipelinesPipelineNameLayoutGetData = {
+    path: {
+        pipeline_name: string;
+    };
+};
+
+export type GetPipelineLayoutPipelinesPipelineNameLayoutGetResponse = (LayoutResponse);
+
+export type GetPipelineLayoutPipelinesPipelineNameLayoutGetError = (HTTPValidationError);
+
 export type GetConnectionsByPipelineConnectionsPipelinePipelineNameGetData = {
     path: {
         pipeline_name: string;
@@ -389,6 +446,14 @@ export type GetConnectionsConnectionsGetResponse = (Array<ConnectionResponse>);
 
 export type GetConnectionsConnectionsGetError = unknown;
 
+export type GetGraphGraphGetResponse = (GraphResponse);
+
+export type GetGraphGraphGetError = unknown;
+
+export type GetGraphLayoutGraphLayoutGetResponse = (LayoutResponse);
+
+export type GetGraphLayoutGraphLayoutGetError = unknown;
+
 export type RootGetResponse = (unknown);
 
 export type RootGetError = unknown;
\ No newline at end of file
@@ -1,19 +1,102 @@
+import gzip
+from collections import OrderedDict
+from datetime import datetime
+from json import dumps
 from urllib.parse import urljoin
+
+import msgpack
 from requests import Response, Session
+from requests.utils import default_headers
 
 from ._user_config import user_config
 
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+ACCEPT = f"{MSGPACK_MEDIA_TYPE}, application/json;q=0.9"
+"""Ask the API for MessagePack, which is smaller and faster to decode than JSON, and accept JSON otherwise"""
+
+ACCEPT_ENCODING = default_headers()["Accept-Encoding"]
+"""The compressions of responses that requests can decode, e.g., gzip and deflate"""
+
+COMPRESSION_MINIMUM_SIZE = 1024
+"""JSON request bodies of at least this many bytes are sent gzip compressed, e.g., models with their dependencies"""
+
+ETAG_CACHE_SIZE = 256
+"""Number of responses kept for revalidation per client, the least recently used are dropped first"""
+
+
+def to_isoformat(container: dict | list) -> dict | list:
+    """Replace the datetimes in a decoded map or array by ISO 8601 strings in place, as they are sent in JSON"""
+
+    items = container.items() if isinstance(container, dict) else enumerate(container)
+    for key, value in items:
+        if isinstance(value, datetime):
+            container[key] = value.isoformat()
+    return container
+
+
+def decode_msgpack(response: Response) -> Response:
+    """
+    Let `response.json()` decode MessagePack bodies, so that callers do not depend on the format the API chose.
+    Datetimes are decoded as the same ISO 8601 strings as in JSON.
+    """
+
+    if response.headers.get("Content-Type", "").startswith(MSGPACK_MEDIA_TYPE):
+        content = response.content
+        response.json = lambda **kwargs: msgpack.unpackb(
+            content, timestamp=3, object_hook=to_isoformat, list_hook=to_isoformat
+        )
+    return response
+
+
 class ApiClient(Session):
     def __init__(self, base_url: str = "", headers: dict[str, str] = None) -> None:
         super().__init__()
         self.base_url = base_url
         self.headers = headers
+        self.etag_cache: OrderedDict[str, Response] = OrderedDict()
+        """
+        Last response with an ETag per GET url, which is reused when the API answers 304 Not Modified. Holds at most
+        `ETAG_CACHE_SIZE` responses.
+        """
 
     def request(self, method: str | bytes, url: str, json: dict | None = None, *args, **kwargs) -> Response:
         url = url.lstrip("/")
         joined_url = urljoin(self.base_url, url)
 
-        return super().request(method, joined_url, json=json, *args, **kwargs)
+        if kwargs.get("stream"):
+            return super().request(method, joined_url, json=json, *args, **kwargs)
+        kwargs["headers"] = {"Accept": ACCEPT, "Accept-Encoding": ACCEPT_ENCODING, **(kwargs.get("headers") or {})}
+
+        if json is not None:
+            # encode the body here instead of in requests to compress it
+            body = dumps(json, allow_nan=False).encode("utf-8")
+            kwargs["headers"].setdefault("Content-Type", "application/json")
+            if len(body) >= COMPRESSION_MINIMUM_SIZE:
+                body = gzip.compress(body)
+                kwargs["headers"]["Content-Encoding"] = "gzip"
+            kwargs["data"] = body
+            json = None
+
+        if method.upper() != "GET" or args or kwargs.get("params"):
+            return decode_msgpack(super().request(method, joined_url, json=json, *args, **kwargs))
+
+        # revalidate the cached response instead of downloading it again
+        cached = self.etag_cache.get(joined_url)
+        if cached is not None:
+            kwargs["headers"]["If-None-Match"] = cached.headers["ETag"]
+
+        response = decode_msgpack(super().request(method, joined_url, json=json, **kwargs))
+
+        if response.status_code == 304 and cached is not None:
+            self.etag_cache.move_to_end(joined_url)
+            return cached
+        if response.ok and "ETag" in response.headers:
+            self.etag_cache[joined_url] = response
+            self.etag_cache.move_to_end(joined_url)
+            if len(self.etag_cache) > ETAG_CACHE_SIZE:
+                self.etag_cache.popitem(last=False)
+        return response
 
 client = ApiClient(base_url=user_config.api_base)
 """Client for non identified API access"""
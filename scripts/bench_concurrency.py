@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+
+"""
+This script measures the request latency of a running e-SparX API under concurrent load.
+It fires a fixed number of GET requests against the given routes while keeping a configurable
+number of requests in flight and reports latency percentiles and throughput per route.
+Run it once before and once after a change to compare the p99 latency of the API.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Get the q-th percentile (0 <= q <= 100) of a list of values"""
+
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def run_route(client: httpx.AsyncClient, route: str, requests: int, concurrency: int) -> dict:
+    """Request a route `requests` times with at most `concurrency` requests in flight"""
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def request():
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                failed = (await client.get(route)).status_code >= 400
+            except httpx.TimeoutException:
+                # counted with the time waited, such that an overloaded API raises the percentiles instead of
+                # aborting the run
+                failed = True
+            latencies.append(time.perf_counter() - start)
+            errors += failed
+
+    start = time.perf_counter()
+    await asyncio.gather(*(request() for _ in range(requests)))
+    duration = time.perf_counter() - start
+
+    return {
+        "route": route,
+        "throughput": requests / duration,
+        "mean": statistics.mean(latencies),
+        "p50": percentile(latencies, 50),
+        "p90": percentile(latencies, 90),
+        "p99": percentile(latencies, 99),
+        "errors": errors,
+    }
+
+
+async def run(base_url: str, routes: list[str], requests: int, concurrency: int, timeout: float) -> list[dict]:
+    """Benchmark all routes one after another"""
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+        # warm up connections and database pools before measuring
+        await asyncio.gather(*(client.get(route) for route in routes), return_exceptions=True)
+        return [await run_route(client, route, requests, concurrency) for route in routes]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure latency percentiles of a running e-SparX API under concurrent load."
+    )
+    parser.add_argument("--url", type=str, default="http://localhost:8080", help="Base URL of the running API")
+    parser.add_argument(
+        "--routes",
+        nargs="*",
+        default=["/graph", "/artifacts/global", "/pipelines/", "/connections/", "/artifacts/"],
+        help="Routes to request",
+    )
+    parser.add_argument("-n", "--requests", type=int, default=500, help="Number of requests per route")
+    parser.add_argument("-c", "--concurrency", type=int, default=50, help="Number of requests in flight")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Timeout of a single request in seconds")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.url, args.routes, args.requests, args.concurrency, args.timeout))
+
+    print(f"{'route':<30} {'req/s':>8} {'mean ms':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for result in results:
+        print(
+            f"{result['route']:<30} {result['throughput']:>8.1f} {result['mean'] * 1000:>8.1f} "
+            f"{result['p50'] * 1000:>8.1f} {result['p90'] * 1000:>8.1f} {result['p99'] * 1000:>8.1f} "
+            f"{result['errors']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
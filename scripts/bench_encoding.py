@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+
+"""
+This script compares the encoding of the two largest payloads of the e-SparX API, the global graph (/graph)
+and the full artifact dump (/artifacts/), with FastAPI's default encoding (jsonable_encoder and the json module),
+orjson and MessagePack. It reports the encode time and the payload size of synthetic payloads of a given size.
+With --url, it also requests both routes of a running API as JSON and as MessagePack.
+"""
+
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import msgpack
+import orjson
+from fastapi.encoders import jsonable_encoder
+
+
+def encode_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+ENCODERS = {
+    "fastapi default": lambda content: json.dumps(jsonable_encoder(content)).encode("utf-8"),
+    "json": lambda content: json.dumps(content, default=encode_default, separators=(",", ":")).encode("utf-8"),
+    "orjson": lambda content: orjson.dumps(content, default=encode_default),
+    "msgpack": lambda content: msgpack.packb(content, default=encode_default, datetime=True),
+}
+
+
+def generate_graph(artifacts: int, pipelines: int, seed: int) -> dict:
+    """Generate a payload in the format of `GraphResponse` with about two connections per artifact"""
+
+    rng = random.Random(seed)
+    types = ["dataset", "code", "model", "hyperparameters", "parameters", "results"]
+    return {
+        "pipelines": [{"id": i, "name": f"pipeline_{i}"} for i in range(1, pipelines + 1)],
+        "artifacts": [
+            {
+                "id": i,
+                "name": f"artifact_{i}",
+                "artifact_type": rng.choice(types),
+                "pipelines": sorted(rng.sample(range(1, pipelines + 1), k=min(pipelines, rng.randint(1, 3)))),
+            }
+            for i in range(1, artifacts + 1)
+        ],
+        "connections": [
+            {"source": rng.randint(1, i - 1), "target": i, "pipeline": rng.randint(1, pipelines)}
+            for i in range(2, artifacts + 1)
+            for _ in range(2)
+        ],
+    }
+
+
+def generate_artifact_dump(artifacts: int, seed: int) -> dict:
+    """Generate a payload in the format of GET /artifacts/ with documents like the ones of registered code"""
+
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return {
+        "entries": [
+            {
+                "name": f"artifact_{i}",
+                "description": " ".join(rng.choices(["trains", "a", "model", "on", "weather", "data", "for"], k=12)),
+                "artifact_type": "code",
+                "file_type": "PY",
+                "created_at": start + timedelta(seconds=rng.randint(0, 10**7)),
+                "source_url": f"https://github.com/example/repo/blob/main/artifact_{i}.py",
+                "download_url": None,
+            }
+            for i in range(1, artifacts + 1)
+        ]
+    }
+
+
+def measure(encode, content, repeat: int) -> tuple[float, int]:
+    """Get the best encode time in seconds out of `repeat` runs and the payload size in bytes"""
+
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = encode(content)
+        best = min(best, time.perf_counter() - start)
+    return best, len(body)
+
+
+def request(url: str, route: str, accept: str, repeat: int) -> tuple[float, int]:
+    """Get the best response time in seconds out of `repeat` requests and the payload size in bytes"""
+
+    best = float("inf")
+    with httpx.Client(base_url=url, timeout=120) as client:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            response = client.get(route, headers={"Accept": accept})
+            best = min(best, time.perf_counter() - start)
+            response.raise_for_status()
+    return best, len(response.content)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare JSON and MessagePack encoding of large API payloads.")
+    parser.add_argument("-n", "--artifacts", type=int, default=50_000, help="Number of artifacts")
+    parser.add_argument("-p", "--pipelines", type=int, default=100, help="Number of pipelines")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="Number of runs, the best one is reported")
+    parser.add_argument("--url", type=str, default=None, help="Base URL of a running API to request as well")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    payloads = {
+        "/graph": generate_graph(args.artifacts, args.pipelines, args.seed),
+        "/artifacts/": generate_artifact_dump(args.artifacts, args.seed),
+    }
+
+    print(f"{'payload':<14} {'encoder':<16} {'encode ms':>10} {'size KiB':>10}")
+    for route, content in payloads.items():
+        for name, encode in ENCODERS.items():
+            seconds, size = measure(encode, content, args.repeat)
+            print(f"{route:<14} {name:<16} {seconds * 1000:>10.1f} {size / 1024:>10.1f}")
+
+    if args.url:
+        print(f"\n{'route':<14} {'accept':<22} {'request ms':>10} {'size KiB':>10}")
+        for route in payloads:
+            for accept in ["application/json", "application/msgpack"]:
+                seconds, size = request(args.url, route, accept, args.repeat)
+                print(f"{route:<14} {accept:<22} {seconds * 1000:>10.1f} {size / 1024:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+
+"""
+This script checks the cold start of the e-SparX API against a time budget. Every run starts a fresh Python
+process, which imports the API and runs its startup (creating tables and indexes), just as a new replica would.
+Warming up the caches happens in the background after the startup and is therefore not part of the budget.
+
+The API uses the databases configured for it (see `backend/esparx_api/settings.py`), or, with `--embedded`,
+the embedded storage in a temporary directory. In addition, the script checks that the OpenAPI spec can be generated
+without any database, as `gen_tsAPIclientcode.py` does. It exits with status 1 if the median cold start exceeds
+the budget or the OpenAPI spec cannot be generated.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+BACKEND_DIRECTORY = Path(__file__).parents[1] / "backend"
+
+START_API = """
+import asyncio, json, time
+start = time.perf_counter()
+from esparx_api import app
+imported = time.perf_counter()
+
+async def start_up():
+    async with app.router.lifespan_context(app):
+        return time.perf_counter()
+
+started = asyncio.run(start_up())
+print(json.dumps({"import": imported - start, "startup": started - imported}))
+"""
+
+GENERATE_OPENAPI = """
+from esparx_api import app
+app.openapi()
+"""
+
+UNREACHABLE_DATABASES = {
+    "STORAGE": "server",
+    "ARTIFACTDB_ENDPOINT": "unreachable.invalid:27017",
+    "DAGDB_CONNECTSTRING": "postgresql://unreachable.invalid:5432/dagdb",
+}
+"""Databases which cannot be connected to, such that generating the OpenAPI spec fails if it connects"""
+
+
+def run_python(code: str, env: dict, timeout: float) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=BACKEND_DIRECTORY,
+        env={**os.environ, **env},
+        capture_output=True,
+        text=True,
+        timeout=timeout,
+    )
+
+
+def measure_cold_start(env: dict, timeout: float) -> dict:
+    """Get the import and startup time of the API in a fresh process, in seconds"""
+
+    process = run_python(START_API, env, timeout)
+    if process.returncode != 0:
+        sys.exit(f"The API failed to start:\n{process.stderr}")
+    # the API logs to stdout as well, the measurement is the last line
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the cold start of the API against a time budget.")
+    parser.add_argument("--budget", type=float, default=1.0, help="Budget of import and startup in seconds")
+    parser.add_argument("-n", "--runs", type=int, default=5, help="Number of cold starts, the median is checked")
+    parser.add_argument("--embedded", action="store_true", help="Use the embedded storage in a temporary directory")
+    parser.add_argument("--timeout", type=float, default=60, help="Timeout of every run in seconds")
+    args = parser.parse_args()
+
+    failed = False
+    process = run_python(GENERATE_OPENAPI, UNREACHABLE_DATABASES, args.timeout)
+    if process.returncode == 0:
+        print("The OpenAPI spec was generated without databases.")
+    else:
+        failed = True
+        print(f"Generating the OpenAPI spec without databases FAILED:\n{process.stderr}")
+
+    with tempfile.TemporaryDirectory(prefix="esparx-startup-") as directory:
+        env = {"STORAGE": "embedded", "EMBEDDED_STORAGE_PATH": directory} if args.embedded else {}
+        runs = [measure_cold_start(env, args.timeout) for _ in range(args.runs)]
+
+    print(f"{'':<10} {'median':>8} {'min':>8} {'max':>8}")
+    for phase in ("import", "startup", "total"):
+        durations = [run["import"] + run["startup"] if phase == "total" else run[phase] for run in runs]
+        print(f"{phase:<10} {statistics.median(durations):>7.3f}s {min(durations):>7.3f}s {max(durations):>7.3f}s")
+    median = statistics.median(run["import"] + run["startup"] for run in runs)
+    if median > args.budget:
+        failed = True
+        print(f"The median cold start of {median:.3f}s exceeds the budget of {args.budget:.3f}s.")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()